@@ -0,0 +1,30 @@
+"""Add per-user daily request limit
+
+Revision ID: 3f1c2a7b8d40
+Revises: 9d57d0398cd1
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b8d40'
+down_revision = '9d57d0398cd1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    if 'users' not in inspector.get_table_names():
+        return
+    if 'daily_request_limit' in [c['name'] for c in inspector.get_columns('users')]:
+        return
+    op.add_column('users', sa.Column('daily_request_limit', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'daily_request_limit')
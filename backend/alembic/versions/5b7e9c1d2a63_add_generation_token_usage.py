@@ -0,0 +1,34 @@
+"""Add token usage columns to content generations
+
+Revision ID: 5b7e9c1d2a63
+Revises: 3f1c2a7b8d40
+Create Date: 2026-10-19 14:03:27.219845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e9c1d2a63'
+down_revision = '3f1c2a7b8d40'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['prompt_tokens', 'completion_tokens', 'total_tokens']
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    if 'content_generations' not in inspector.get_table_names():
+        return
+    existing = [c['name'] for c in inspector.get_columns('content_generations')]
+    for name in COLUMNS:
+        if name not in existing:
+            op.add_column('content_generations', sa.Column(name, sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    for name in reversed(COLUMNS):
+        op.drop_column('content_generations', name)
@@ -0,0 +1,71 @@
+"""Link marketing plans and SEO analyses to generations, add content tags
+
+Revision ID: 8c4d2e6f1a90
+Revises: 5b7e9c1d2a63
+Create Date: 2026-10-19 15:41:08.532107
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a90'
+down_revision = '5b7e9c1d2a63'
+branch_labels = None
+depends_on = None
+
+
+def _add_column(inspector, table: str, column: str, references: str):
+    """Add a nullable, indexed foreign key column"""
+    if column in [c['name'] for c in inspector.get_columns(table)]:
+        return
+    # Batch mode so the foreign key can be added on SQLite as well
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.add_column(sa.Column(column, sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(f'fk_{table}_{column}', references.split('.')[0], [column], ['id'])
+        batch_op.create_index(f'ix_{table}_{column}', [column])
+
+
+def _drop_column(table: str, column: str):
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.drop_index(f'ix_{table}_{column}')
+        batch_op.drop_constraint(f'fk_{table}_{column}', type_='foreignkey')
+        batch_op.drop_column(column)
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'content_generations' not in tables:
+        return
+
+    if 'marketing_plans' in tables:
+        _add_column(inspector, 'marketing_plans', 'generation_id', 'content_generations.id')
+    if 'seo_analyses' in tables:
+        _add_column(inspector, 'seo_analyses', 'user_id', 'users.id')
+        _add_column(inspector, 'seo_analyses', 'generation_id', 'content_generations.id')
+
+    if 'content_tags' not in tables:
+        op.create_table(
+            'content_tags',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=True),
+            sa.Column('generation_id', sa.Integer(), sa.ForeignKey('content_generations.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('kind', sa.Enum('HASHTAG', 'KEYWORD', name='tagkind'), nullable=False),
+            sa.Column('value', sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_content_tags_generation_id', 'content_tags', ['generation_id'])
+        op.create_index('ix_content_tags_project_kind_value', 'content_tags', ['project_id', 'kind', 'value'])
+        op.create_index('ix_content_tags_user_kind_value', 'content_tags', ['user_id', 'kind', 'value'])
+
+
+def downgrade() -> None:
+    op.drop_table('content_tags')
+    sa.Enum(name='tagkind').drop(op.get_bind(), checkfirst=True)
+    _drop_column('seo_analyses', 'generation_id')
+    _drop_column('seo_analyses', 'user_id')
+    _drop_column('marketing_plans', 'generation_id')
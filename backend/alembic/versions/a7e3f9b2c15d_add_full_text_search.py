@@ -0,0 +1,65 @@
+"""Add full-text search columns to generations and projects
+
+Revision ID: a7e3f9b2c15d
+Revises: 8c4d2e6f1a90
+Create Date: 2026-10-19 17:22:54.908361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3f9b2c15d'
+down_revision = '8c4d2e6f1a90'
+branch_labels = None
+depends_on = None
+
+# Owner columns that search (and the listing endpoints) filter on
+OWNER_INDEXES = {
+    'content_generations': 'user_id',
+    'projects': 'owner_id',
+}
+
+# Stored generated tsvector columns, Postgres only; frozen copy of app.models.search
+SEARCH_VECTORS = {
+    'content_generations': (
+        "setweight(to_tsvector('english'::regconfig, left(coalesce(prompt, ''), 100000)), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, left(coalesce(generated_content, ''), 100000)), 'B')"
+    ),
+    'projects': (
+        "setweight(to_tsvector('english'::regconfig, left(coalesce(name, ''), 100000)), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, left(coalesce(description, ''), 100000)), 'B')"
+    ),
+}
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, column in OWNER_INDEXES.items():
+        if table not in tables:
+            continue
+        if f'ix_{table}_{column}' not in [i['name'] for i in inspector.get_indexes(table)]:
+            op.create_index(f'ix_{table}_{column}', table, [column])
+
+    if bind.dialect.name != 'postgresql':
+        return
+    for table, vector in SEARCH_VECTORS.items():
+        if table not in tables or 'search_vector' in [c['name'] for c in inspector.get_columns(table)]:
+            continue
+        # Rewrites the table once to compute the column for existing rows
+        op.execute(f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED")
+        op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in SEARCH_VECTORS:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+    for table, column in OWNER_INDEXES.items():
+        op.drop_index(f'ix_{table}_{column}', table_name=table)
@@ -0,0 +1,44 @@
+"""Add project soft delete and project_id indexes
+
+Revision ID: b6d4e8a2f519
+Revises: f3a9c6d2b417
+Create Date: 2026-10-19 22:41:08.530217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d4e8a2f519'
+down_revision = 'f3a9c6d2b417'
+branch_labels = None
+depends_on = None
+
+# Batched cleanup of a deleted project looks its rows up by project_id
+PROJECT_INDEXES = [
+    ('ix_content_generations_project_id', 'content_generations'),
+    ('ix_product_images_project_id', 'product_images'),
+]
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'projects' not in tables:
+        return
+
+    if 'deleted_at' not in [c['name'] for c in inspector.get_columns('projects')]:
+        op.add_column('projects', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    for index_name, table in PROJECT_INDEXES:
+        if table in tables and index_name not in [i['name'] for i in inspector.get_indexes(table)]:
+            op.create_index(index_name, table, ['project_id'])
+
+
+def downgrade() -> None:
+    for index_name, table in PROJECT_INDEXES:
+        op.drop_index(index_name, table_name=table)
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.drop_column('deleted_at')
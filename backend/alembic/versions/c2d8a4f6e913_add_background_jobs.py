@@ -0,0 +1,53 @@
+"""Add background jobs and product image thumbnails
+
+Revision ID: c2d8a4f6e913
+Revises: a7e3f9b2c15d
+Create Date: 2026-10-19 18:05:37.214590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d8a4f6e913'
+down_revision = 'a7e3f9b2c15d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'users' not in tables:
+        return
+
+    if 'product_images' in tables and 'thumbnail_path' not in [c['name'] for c in inspector.get_columns('product_images')]:
+        op.add_column('product_images', sa.Column('thumbnail_path', sa.String(), nullable=True))
+
+    if 'background_jobs' not in tables:
+        op.create_table(
+            'background_jobs',
+            sa.Column('id', sa.String(length=32), nullable=False),
+            sa.Column('kind', sa.String(length=50), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('project_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', name='jobstatus'), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=True),
+            sa.Column('processed', sa.Integer(), nullable=False),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_background_jobs_user_id', 'background_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('background_jobs')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
+    with op.batch_alter_table('product_images') as batch_op:
+        batch_op.drop_column('thumbnail_path')
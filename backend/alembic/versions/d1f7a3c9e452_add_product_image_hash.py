@@ -0,0 +1,31 @@
+"""Add product image content hash
+
+Revision ID: d1f7a3c9e452
+Revises: b6d4e8a2f519
+Create Date: 2026-10-19 23:26:51.904371
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f7a3c9e452'
+down_revision = 'b6d4e8a2f519'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    if 'product_images' not in inspector.get_table_names():
+        return
+
+    if 'content_hash' not in [c['name'] for c in inspector.get_columns('product_images')]:
+        op.add_column('product_images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('product_images') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,60 @@
+"""Add the generation archive table
+
+Revision ID: e5f1b7c3d820
+Revises: c2d8a4f6e913
+Create Date: 2026-10-19 19:12:46.381027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1b7c3d820'
+down_revision = 'c2d8a4f6e913'
+branch_labels = None
+depends_on = None
+
+# The enum types already exist for content_generations
+CONTENT_TYPES = ('TEXT_TO_IMAGE', 'PRODUCT_3D_RENDER', 'PROFESSIONAL_PRODUCT', 'SEO_CAPTION', 'CONTENT_PLAN', 'MARKETING_PLAN')
+GENERATION_STATUSES = ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED')
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'content_generations' not in tables or 'content_generations_archive' in tables:
+        return
+
+    op.create_table(
+        'content_generations_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('source_image_id', sa.Integer(), nullable=True),
+        sa.Column('content_type', postgresql.ENUM(*CONTENT_TYPES, name='contenttype', create_type=False), nullable=False),
+        sa.Column('status', postgresql.ENUM(*GENERATION_STATUSES, name='generationstatus', create_type=False), nullable=True),
+        sa.Column('prompt', sa.Text(), nullable=True),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('generated_content', sa.Text(), nullable=True),
+        sa.Column('generated_image_path', sa.String(), nullable=True),
+        sa.Column('generation_metadata', sa.JSON(), nullable=True),
+        sa.Column('model_used', sa.String(), nullable=True),
+        sa.Column('api_key_used', sa.String(), nullable=True),
+        sa.Column('processing_time', sa.Integer(), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.Column('total_tokens', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_content_generations_archive_user_id', 'content_generations_archive', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('content_generations_archive')
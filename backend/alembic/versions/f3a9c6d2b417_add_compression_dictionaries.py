@@ -0,0 +1,76 @@
+"""Add compression dictionaries, keep compressed content out of the search index
+
+Revision ID: f3a9c6d2b417
+Revises: e5f1b7c3d820
+Create Date: 2026-10-19 20:31:09.745118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c6d2b417'
+down_revision = 'e5f1b7c3d820'
+branch_labels = None
+depends_on = None
+
+# Frozen copies of app.models.search output for content_generations
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, left(coalesce(prompt, ''), 100000)), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, CASE WHEN left(generated_content, 1) = chr(30) THEN '' "
+    "ELSE left(coalesce(generated_content, ''), 100000) END), 'B')"
+)
+PREVIOUS_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, left(coalesce(prompt, ''), 100000)), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, left(coalesce(generated_content, ''), 100000)), 'B')"
+)
+
+
+def _search_vector_expression(bind):
+    return bind.execute(sa.text(
+        "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d "
+        "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+        "WHERE d.adrelid = 'content_generations'::regclass AND a.attname = 'search_vector'"
+    )).scalar()
+
+
+def _replace_search_vector(vector: str):
+    # Rewrites the table once to recompute the column
+    op.execute("DROP INDEX IF EXISTS ix_content_generations_search_vector")
+    op.execute("ALTER TABLE content_generations DROP COLUMN IF EXISTS search_vector")
+    op.execute(f"ALTER TABLE content_generations ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED")
+    op.execute("CREATE INDEX ix_content_generations_search_vector ON content_generations USING gin (search_vector)")
+
+
+def upgrade() -> None:
+    # Tables are created from the models on fresh databases
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+    if 'content_generations' not in tables:
+        return
+
+    if 'compression_dictionaries' not in tables:
+        op.create_table(
+            'compression_dictionaries',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('content_type', sa.String(length=50), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('sample_count', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if bind.dialect.name != 'postgresql':
+        return
+    expression = _search_vector_expression(bind)
+    if expression is not None and 'chr(30)' not in expression:
+        _replace_search_vector(SEARCH_VECTOR)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and _search_vector_expression(bind) is not None:
+        _replace_search_vector(PREVIOUS_SEARCH_VECTOR)
+    op.drop_table('compression_dictionaries')
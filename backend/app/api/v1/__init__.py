@@ -1,9 +1,18 @@
 from fastapi import APIRouter
 from app.api.v1 import auth, content, projects, admin
+from app.core.metrics import register_route_templates
+from app.core.responses import ORJSONResponse
 
-api_router = APIRouter()
+API_PREFIX = "/api/v1"
 
-api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
-api_router.include_router(content.router, prefix="/content", tags=["content generation"])
-api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
-api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
\ No newline at end of file
+api_router = APIRouter(default_response_class=ORJSONResponse)
+
+for router, prefix, tags in (
+    (auth.router, "/auth", ["authentication"]),
+    (content.router, "/content", ["content generation"]),
+    (projects.router, "/projects", ["projects"]),
+    (admin.router, "/admin", ["admin"]),
+):
+    api_router.include_router(router, prefix=prefix, tags=tags)
+    # Metric labels need the full template (see route_template)
+    register_route_templates(router, API_PREFIX + prefix)
@@ -1,11 +1,19 @@
-from typing import List, Annotated
+from typing import List, Optional, Annotated
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from ...core.database import get_db
 from ...models.user import User
-from ...services.api_key_manager import api_key_manager
+from ...core.hashing import password_hash_executor
+from ...services.api_key_manager import get_api_key_manager
+from ...services.generation_events import get_event_broker
+from ...services.generation_repository import get_generation_write_queue
+from ...services.job_service import create_job, submit_job
+from ...services.quota_service import get_quota_status
+from ...services.retention import RETENTION_JOB, run_retention
+from ...services.text_compression import train_dictionaries
+from ...services.similarity_cache import get_similarity_cache
 from .auth import get_current_active_user
 
 router = APIRouter()
@@ -17,6 +25,10 @@ class APIKeyStatus(BaseModel):
     error_keys: int
     keys: List[dict]
 
+class QuotaUpdate(BaseModel):
+    daily_limit: Optional[int] = None  # None = platform default, 0 = unlimited
+    reset_usage: bool = False
+
 class SystemStats(BaseModel):
     total_users: int
     active_users: int
@@ -35,7 +47,7 @@ def get_api_key_status(
     admin_user: Annotated[User, Depends(get_admin_user)]
 ):
     """Get status of all API keys"""
-    status = api_key_manager.get_status_summary()
+    status = get_api_key_manager().get_status_summary()
     return APIKeyStatus(**status)
 
 @router.post("/api-keys/rotate")
@@ -43,6 +55,7 @@ def rotate_api_key(
     admin_user: Annotated[User, Depends(get_admin_user)]
 ):
     """Force rotation to next available API key"""
+    api_key_manager = get_api_key_manager()
     current_key = api_key_manager.get_current_key()
     next_key = api_key_manager.get_next_key()
     
@@ -61,6 +74,7 @@ def reset_api_key_status(
     admin_user: Annotated[User, Depends(get_admin_user)]
 ):
     """Reset status of a specific API key"""
+    api_key_manager = get_api_key_manager()
     if key_index < 1 or key_index > len(api_key_manager.api_keys):
         raise HTTPException(status_code=400, detail="Invalid key index")
     
@@ -73,6 +87,53 @@ def reset_api_key_status(
     
     return {"message": f"API key {key_index} status reset successfully"}
 
+@router.get("/password-hashing/status")
+def get_password_hashing_status(
+    admin_user: Annotated[User, Depends(get_admin_user)]
+):
+    """Get queue metrics of the password hashing pool"""
+    return password_hash_executor.get_stats()
+
+@router.get("/generation-writes/status")
+def get_generation_writes_status(
+    admin_user: Annotated[User, Depends(get_admin_user)]
+):
+    """Get metrics of the generation write-behind queue"""
+    return get_generation_write_queue().get_stats()
+
+@router.get("/generation-events/status")
+def get_generation_events_status(
+    admin_user: Annotated[User, Depends(get_admin_user)]
+):
+    """Get metrics of the generation event broker in this worker"""
+    return get_event_broker().get_stats()
+
+@router.get("/similarity-cache/status")
+def get_similarity_cache_status(
+    admin_user: Annotated[User, Depends(get_admin_user)]
+):
+    """Get metrics of the near-duplicate prompt cache in this worker"""
+    return get_similarity_cache().get_stats()
+
+@router.post("/compression/train")
+def train_compression_dictionaries(
+    admin_user: Annotated[User, Depends(get_admin_user)],
+    db: Session = Depends(get_db)
+):
+    """Train new zstd dictionaries for generated content, one per text content type"""
+    return train_dictionaries(db)
+
+@router.post("/retention/run", status_code=202)
+def start_retention(
+    admin_user: Annotated[User, Depends(get_admin_user)],
+    db: Session = Depends(get_db),
+    dry_run: bool = False
+):
+    """Archive old generations and compact inline images in the background"""
+    job = create_job(db, RETENTION_JOB, admin_user.id)
+    submit_job(job, run_retention, dry_run)
+    return {"job_id": job.id}
+
 @router.get("/stats", response_model=SystemStats)
 def get_system_stats(
     admin_user: Annotated[User, Depends(get_admin_user)],
@@ -87,13 +148,13 @@ def get_system_stats(
     active_users = db.query(User).filter(User.is_active == True).count()
     
     # Get project stats
-    total_projects = db.query(Project).count()
+    total_projects = db.query(Project).filter(Project.deleted_at.is_(None)).count()
     
     # Get generation stats
     total_generations = db.query(ContentGeneration).count()
     
     # Get API key status
-    api_key_status = api_key_manager.get_status_summary()
+    api_key_status = get_api_key_manager().get_status_summary()
     
     return SystemStats(
         total_users=total_users,
@@ -123,7 +184,8 @@ def get_all_users(
             "is_superuser": user.is_superuser,
             "created_at": user.created_at,
             "daily_requests_count": user.daily_requests_count,
-            "last_request_date": user.last_request_date
+            "last_request_date": user.last_request_date,
+            "daily_request_limit": user.daily_request_limit
         }
         for user in users
     ]
@@ -145,4 +207,29 @@ def toggle_user_active(
     return {
         "message": f"User {user.username} {'activated' if user.is_active else 'deactivated'}",
         "is_active": user.is_active
+    }
+
+@router.put("/users/{user_id}/quota")
+def set_user_quota(
+    user_id: int,
+    quota: QuotaUpdate,
+    admin_user: Annotated[User, Depends(get_admin_user)],
+    db: Session = Depends(get_db)
+):
+    """Set a user's daily generation limit"""
+    if quota.daily_limit is not None and quota.daily_limit < 0:
+        raise HTTPException(status_code=400, detail="Daily limit must be 0 (unlimited) or positive")
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user.daily_request_limit = quota.daily_limit
+    if quota.reset_usage:
+        user.daily_requests_count = 0
+    db.commit()
+    
+    return {
+        "message": f"Quota updated for user {user.username}",
+        **get_quota_status(user)
     }
\ No newline at end of file
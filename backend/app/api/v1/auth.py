@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -6,7 +7,10 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from ...core.database import get_db
-from ...core.security import verify_password, get_password_hash, create_access_token, verify_token
+from ...core.security import (
+    verify_password_async, get_password_hash_async, password_needs_rehash,
+    create_access_token, verify_token
+)
 from ...models.user import User
 from ...core.config import settings
 
@@ -64,20 +68,39 @@ async def get_current_active_user(current_user: Annotated[User, Depends(get_curr
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
+# Database calls of the async handlers below run on a thread, so neither they
+# nor the password hashing (on its own pool) block the event loop
+
+def _find_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+def _find_registered(db: Session, email: str, username: str):
+    return db.query(User).filter(
+        (User.email == email) | (User.username == username)
+    ).first()
+
+def _save_user(db: Session, user: User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await asyncio.to_thread(_find_user, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
+    
+    # Upgrade hashes made with an older bcrypt cost factor
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await asyncio.to_thread(db.commit)
     return user
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
+    db_user = await asyncio.to_thread(_find_registered, db, user.email, user.username)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -85,22 +108,20 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password,
         full_name=user.full_name
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await asyncio.to_thread(_save_user, db, db_user)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: Session = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,14 +1,22 @@
-from typing import List, Optional, Annotated
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from typing import List, Literal, Optional, Annotated
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import json
 from datetime import datetime
 
 from ...core.database import get_db
+from ...core.tracing import span
+from ...core.tuning import tuning
 from ...models.user import User
-from ...models.content import ContentGeneration, ContentType, GenerationStatus
-from ...services.ai_service import ai_service
+from ...models.content import ContentGeneration, ContentType
+from ...services.generation_events import event_stream
+from ...services.export_service import FORMATS, ExportFilters, export_generations
+from ...services.generation_pipeline import GenerationFailedError, run_pipeline
+from ...services.project_cleanup import not_in_deleted_project
+from ...services.quota_service import QuotaExceededError, get_quota_status
+from ...services.search_service import search
 from .auth import get_current_active_user
 
 router = APIRouter()
@@ -19,6 +27,7 @@ class TextToImageRequest(BaseModel):
     style: str = "Realistic"
     aspect_ratio: str = "Square (1:1)"
     project_id: Optional[int] = None
+    allow_reuse: bool = True  # Accept a near-duplicate earlier result (SIMILARITY_CACHE_ENABLED)
 
 class ProductRenderRequest(BaseModel):
     render_type: str = "3d_render"  # or "professional_product"
@@ -30,6 +39,7 @@ class SEOContentRequest(BaseModel):
     target_keywords: List[str] = []
     platform: str = "general"
     project_id: Optional[int] = None
+    allow_reuse: bool = True  # Accept a near-duplicate earlier result (SIMILARITY_CACHE_ENABLED)
 
 class ContentPlanRequest(BaseModel):
     product_info: str
@@ -37,6 +47,7 @@ class ContentPlanRequest(BaseModel):
     goals: List[str]
     timeframe: str = "monthly"
     project_id: Optional[int] = None
+    allow_reuse: bool = True  # Accept a near-duplicate earlier result (SIMILARITY_CACHE_ENABLED)
 
 class MarketingPlanRequest(BaseModel):
     product_info: str
@@ -45,6 +56,8 @@ class MarketingPlanRequest(BaseModel):
     budget_range: str
     timeline: str
     project_id: Optional[int] = None
+    allow_reuse: bool = True  # Accept a near-duplicate earlier result (SIMILARITY_CACHE_ENABLED)
+    sectioned: Optional[bool] = None  # One concurrent call per section; defaults to MARKETING_PLAN_SECTIONED
 
 class ContentGenerationResponse(BaseModel):
     id: int
@@ -55,11 +68,42 @@ class ContentGenerationResponse(BaseModel):
     generation_metadata: Optional[dict] = None  # FIXED: Added this field
     model_used: Optional[str]
     processing_time: Optional[int]
+    total_tokens: Optional[int] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class SearchResultResponse(BaseModel):
+    kind: str  # generation | project
+    id: int
+    title: Optional[str]
+    snippet: str  # HTML-escaped, matches wrapped in <mark></mark>
+    rank: float
+    content_type: Optional[str]
+    project_id: Optional[int]
+    created_at: datetime
+
+async def _run_generation(
+    pipeline: str,
+    inputs: dict,
+    current_user: User,
+    db: Session,
+    project_id: Optional[int],
+    allow_reuse: bool = True
+):
+    """Run a generation pipeline, translating quota and upstream failures to HTTP errors"""
+    try:
+        return await run_pipeline(pipeline, inputs, current_user, db, project_id=project_id, allow_reuse=allow_reuse)
+    except QuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except GenerationFailedError as e:
+        raise HTTPException(status_code=500, detail=e.error)
+
 @router.post("/text-to-image", response_model=ContentGenerationResponse)
 async def generate_text_to_image(
     request: TextToImageRequest,
@@ -67,61 +111,7 @@ async def generate_text_to_image(
     db: Session = Depends(get_db)
 ):
     """Generate image from text prompt"""
-    
-    # Create generation record
-    generation = ContentGeneration(
-        user_id=current_user.id,
-        project_id=request.project_id,
-        content_type=ContentType.TEXT_TO_IMAGE,
-        status=GenerationStatus.PROCESSING,
-        prompt=request.prompt,
-        parameters={
-            "style": request.style,
-            "aspect_ratio": request.aspect_ratio
-        },
-        started_at=datetime.utcnow()
-    )
-    db.add(generation)
-    db.commit()
-    db.refresh(generation)
-    
-    try:
-        # Call AI service
-        result = await ai_service.generate_text_to_image(
-            prompt=request.prompt,
-            style=request.style,
-            aspect_ratio=request.aspect_ratio,
-            user_id=current_user.id
-        )
-        
-        if result['success']:
-            # Update generation record with results
-            generation.status = GenerationStatus.COMPLETED
-            generation.generated_content = result.get('content')
-            generation.model_used = result.get('model_used')
-            generation.processing_time = int(result.get('processing_time', 0))
-            generation.completed_at = datetime.utcnow()
-            generation.generation_metadata = {
-                "images": result.get('images', []),
-                "api_key_used": result.get('api_key_used')
-            }
-        else:
-            generation.status = GenerationStatus.FAILED
-            generation.generation_metadata = {"error": result.get('error')}
-        
-        db.commit()
-        db.refresh(generation)
-        
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error'))
-        
-        return generation
-        
-    except Exception as e:
-        generation.status = GenerationStatus.FAILED
-        generation.generation_metadata = {"error": str(e)}
-        db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _run_generation("text_to_image", request.model_dump(), current_user, db, request.project_id, request.allow_reuse)
 
 @router.post("/product-render", response_model=ContentGenerationResponse)
 async def generate_product_render(
@@ -139,63 +129,16 @@ async def generate_product_render(
         raise HTTPException(status_code=400, detail="File must be an image")
     
     # Read image data
-    image_data = await image.read()
-    
-    # Create generation record
-    content_type = ContentType.PRODUCT_3D_RENDER if render_type == "3d_render" else ContentType.PROFESSIONAL_PRODUCT
+    with span("read_upload"):
+        image_data = await image.read()
     
-    generation = ContentGeneration(
-        user_id=current_user.id,
-        project_id=project_id,
-        content_type=content_type,
-        status=GenerationStatus.PROCESSING,
-        prompt=instructions,
-        parameters={
-            "render_type": render_type,
-            "original_filename": image.filename
-        },
-        started_at=datetime.utcnow()
-    )
-    db.add(generation)
-    db.commit()
-    db.refresh(generation)
-    
-    try:
-        # Call AI service
-        result = await ai_service.generate_product_render(
-            image_data=image_data,
-            render_type=render_type,
-            instructions=instructions,
-            user_id=current_user.id
-        )
-        
-        if result['success']:
-            generation.status = GenerationStatus.COMPLETED
-            generation.generated_content = result.get('content')
-            generation.model_used = result.get('model_used')
-            generation.processing_time = int(result.get('processing_time', 0))
-            generation.completed_at = datetime.utcnow()
-            generation.generation_metadata = {
-                "images": result.get('images', []),
-                "api_key_used": result.get('api_key_used')
-            }
-        else:
-            generation.status = GenerationStatus.FAILED
-            generation.generation_metadata = {"error": result.get('error')}
-        
-        db.commit()
-        db.refresh(generation)
-        
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error'))
-        
-        return generation
-        
-    except Exception as e:
-        generation.status = GenerationStatus.FAILED
-        generation.generation_metadata = {"error": str(e)}
-        db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
+    inputs = {
+        "render_type": render_type,
+        "instructions": instructions,
+        "image_data": image_data,
+        "original_filename": image.filename
+    }
+    return await _run_generation("product_render", inputs, current_user, db, project_id)
 
 @router.post("/seo-content", response_model=ContentGenerationResponse)
 async def generate_seo_content(
@@ -204,57 +147,7 @@ async def generate_seo_content(
     db: Session = Depends(get_db)
 ):
     """Generate SEO-optimized content"""
-    
-    generation = ContentGeneration(
-        user_id=current_user.id,
-        project_id=request.project_id,
-        content_type=ContentType.SEO_CAPTION,
-        status=GenerationStatus.PROCESSING,
-        prompt=request.product_description,
-        parameters={
-            "target_keywords": request.target_keywords,
-            "platform": request.platform
-        },
-        started_at=datetime.utcnow()
-    )
-    db.add(generation)
-    db.commit()
-    db.refresh(generation)
-    
-    try:
-        result = await ai_service.generate_seo_content(
-            product_description=request.product_description,
-            target_keywords=request.target_keywords,
-            platform=request.platform,
-            user_id=current_user.id
-        )
-        
-        if result['success']:
-            generation.status = GenerationStatus.COMPLETED
-            generation.generated_content = result.get('content')
-            generation.model_used = result.get('model_used')
-            generation.processing_time = int(result.get('processing_time', 0))
-            generation.completed_at = datetime.utcnow()
-            generation.generation_metadata = {
-                "api_key_used": result.get('api_key_used')
-            }
-        else:
-            generation.status = GenerationStatus.FAILED
-            generation.generation_metadata = {"error": result.get('error')}
-        
-        db.commit()
-        db.refresh(generation)
-        
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error'))
-        
-        return generation
-        
-    except Exception as e:
-        generation.status = GenerationStatus.FAILED
-        generation.generation_metadata = {"error": str(e)}
-        db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _run_generation("seo_content", request.model_dump(), current_user, db, request.project_id, request.allow_reuse)
 
 @router.post("/content-plan", response_model=ContentGenerationResponse)
 async def generate_content_plan(
@@ -263,59 +156,7 @@ async def generate_content_plan(
     db: Session = Depends(get_db)
 ):
     """Generate content calendar and plan"""
-    
-    generation = ContentGeneration(
-        user_id=current_user.id,
-        project_id=request.project_id,
-        content_type=ContentType.CONTENT_PLAN,
-        status=GenerationStatus.PROCESSING,
-        prompt=request.product_info,
-        parameters={
-            "target_audience": request.target_audience,
-            "goals": request.goals,
-            "timeframe": request.timeframe
-        },
-        started_at=datetime.utcnow()
-    )
-    db.add(generation)
-    db.commit()
-    db.refresh(generation)
-    
-    try:
-        result = await ai_service.generate_content_plan(
-            product_info=request.product_info,
-            target_audience=request.target_audience,
-            goals=request.goals,
-            timeframe=request.timeframe,
-            user_id=current_user.id
-        )
-        
-        if result['success']:
-            generation.status = GenerationStatus.COMPLETED
-            generation.generated_content = result.get('content')
-            generation.model_used = result.get('model_used')
-            generation.processing_time = int(result.get('processing_time', 0))
-            generation.completed_at = datetime.utcnow()
-            generation.generation_metadata = {
-                "api_key_used": result.get('api_key_used')
-            }
-        else:
-            generation.status = GenerationStatus.FAILED
-            generation.generation_metadata = {"error": result.get('error')}
-        
-        db.commit()
-        db.refresh(generation)
-        
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error'))
-        
-        return generation
-        
-    except Exception as e:
-        generation.status = GenerationStatus.FAILED
-        generation.generation_metadata = {"error": str(e)}
-        db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _run_generation("content_plan", request.model_dump(), current_user, db, request.project_id, request.allow_reuse)
 
 @router.post("/marketing-plan", response_model=ContentGenerationResponse)
 async def generate_marketing_plan(
@@ -324,61 +165,31 @@ async def generate_marketing_plan(
     db: Session = Depends(get_db)
 ):
     """Generate comprehensive marketing plan"""
-    
-    generation = ContentGeneration(
-        user_id=current_user.id,
-        project_id=request.project_id,
-        content_type=ContentType.MARKETING_PLAN,
-        status=GenerationStatus.PROCESSING,
-        prompt=request.product_info,
-        parameters={
-            "target_audience": request.target_audience,
-            "goal": request.goal,
-            "budget_range": request.budget_range,
-            "timeline": request.timeline
-        },
-        started_at=datetime.utcnow()
+    sectioned = tuning.MARKETING_PLAN_SECTIONED if request.sectioned is None else request.sectioned
+    pipeline = "marketing_plan_sectioned" if sectioned else "marketing_plan"
+    return await _run_generation(pipeline, request.model_dump(), current_user, db, request.project_id, request.allow_reuse)
+
+@router.get("/quota")
+def get_my_quota(
+    current_user: Annotated[User, Depends(get_current_active_user)]
+):
+    """Get the current user's daily generation quota"""
+    return get_quota_status(current_user)
+
+@router.get("/events")
+async def stream_generation_events(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    """Server-sent events for the user's generations as they run (queued, model_selected, retrying, fallback, completed, failed)"""
+    user_id = current_user.id
+    # The stream stays open for as long as the client listens; don't hold a pooled connection meanwhile
+    db.close()
+    return StreamingResponse(
+        event_stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    db.add(generation)
-    db.commit()
-    db.refresh(generation)
-    
-    try:
-        result = await ai_service.generate_marketing_plan(
-            product_info=request.product_info,
-            target_audience=request.target_audience,
-            goal=request.goal,
-            budget_range=request.budget_range,
-            timeline=request.timeline,
-            user_id=current_user.id
-        )
-        
-        if result['success']:
-            generation.status = GenerationStatus.COMPLETED
-            generation.generated_content = result.get('content')
-            generation.model_used = result.get('model_used')
-            generation.processing_time = int(result.get('processing_time', 0))
-            generation.completed_at = datetime.utcnow()
-            generation.generation_metadata = {
-                "api_key_used": result.get('api_key_used')
-            }
-        else:
-            generation.status = GenerationStatus.FAILED
-            generation.generation_metadata = {"error": result.get('error')}
-        
-        db.commit()
-        db.refresh(generation)
-        
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error'))
-        
-        return generation
-        
-    except Exception as e:
-        generation.status = GenerationStatus.FAILED
-        generation.generation_metadata = {"error": str(e)}
-        db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/generations", response_model=List[ContentGenerationResponse])
 def get_user_generations(
@@ -389,11 +200,52 @@ def get_user_generations(
 ):
     """Get user's content generations"""
     generations = db.query(ContentGeneration).filter(
-        ContentGeneration.user_id == current_user.id
+        ContentGeneration.user_id == current_user.id,
+        not_in_deleted_project()
     ).order_by(ContentGeneration.created_at.desc()).offset(skip).limit(limit).all()
     
     return generations
 
+@router.get("/search", response_model=List[SearchResultResponse])
+def search_history(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: Literal["all", "generations", "projects"] = "all",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over the user's generations and projects, best matches first"""
+    with span("search", scope=scope):
+        return search(db, current_user.id, q, scope=scope, limit=limit, offset=offset)
+
+@router.get("/generations/export")
+def export_user_generations(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    project_id: Optional[int] = None,
+    content_type: Optional[ContentType] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[int] = Query(None, ge=0, description="Resume after this generation id"),
+    include_metadata: bool = False,
+    gzip: bool = False
+):
+    """Stream the user's whole generation history, oldest first"""
+    filters = ExportFilters(
+        project_id=project_id,
+        content_type=content_type,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+    )
+    filename = f"generations-{datetime.utcnow():%Y%m%d}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_generations(current_user.id, filters, format, include_metadata, compress=gzip),
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get("/generations/{generation_id}", response_model=ContentGenerationResponse)
 def get_generation(
     generation_id: int,
@@ -403,7 +255,8 @@ def get_generation(
     """Get specific generation by ID"""
     generation = db.query(ContentGeneration).filter(
         ContentGeneration.id == generation_id,
-        ContentGeneration.user_id == current_user.id
+        ContentGeneration.user_id == current_user.id,
+        not_in_deleted_project()
     ).first()
     
     if not generation:
@@ -1,17 +1,29 @@
-from typing import List, Optional, Annotated
+from typing import Any, List, Optional, Annotated
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+import asyncio
 import os
+import time
 import uuid
+from datetime import datetime
 from pathlib import Path
-from PIL import Image
-import io
 
 from ...core.database import get_db
 from ...core.config import settings
+from ...core.tuning import tuning
+from ...core.metrics import observe_image_processing
 from ...models.user import User
 from ...models.project import Project, ProductImage
+from ...models.content import ContentTag, TagKind
+from ...models.job import JobStatus
+from ...services.image_import import (
+    IMPORT_JOB, InvalidImportError, claim_staged, discard_staged, import_images, insert_uploads, parse_manifest,
+    save_uploads, stage_upload
+)
+from ...services.job_service import create_job, get_job, submit_job
+from ...services.project_cleanup import PROJECT_DELETE_JOB, delete_project_data
 from .auth import get_current_active_user
 
 router = APIRouter()
@@ -38,8 +50,8 @@ class ProjectResponse(BaseModel):
     product_category: Optional[str]
     target_audience: Optional[str]
     brand_guidelines: Optional[dict]
-    created_at: str
-    updated_at: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
     
     class Config:
         from_attributes = True
@@ -53,8 +65,10 @@ class ProductImageResponse(BaseModel):
     mime_type: str
     width: Optional[int]
     height: Optional[int]
+    thumbnail_path: Optional[str] = None
+    content_hash: Optional[str] = None
     is_primary: bool
-    uploaded_at: str
+    uploaded_at: datetime
     
     class Config:
         from_attributes = True
@@ -62,6 +76,41 @@ class ProductImageResponse(BaseModel):
 class ProjectWithImagesResponse(ProjectResponse):
     product_images: List[ProductImageResponse] = []
 
+class ImageUploadResult(BaseModel):
+    filename: str
+    status: str  # created | duplicate | failed
+    image: Optional[ProductImageResponse] = None  # For duplicates, the image the project already has
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[ImageUploadResult]
+
+class TagCountResponse(BaseModel):
+    value: str
+    count: int
+
+class ImportJobResponse(BaseModel):
+    job_id: str
+    project_id: int
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    project_id: Optional[int]
+    status: JobStatus
+    total: Optional[int]
+    processed: int
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
 def save_uploaded_file(file: UploadFile, project_id: int) -> tuple:
     """Save uploaded file and return file info"""
     
@@ -81,12 +130,15 @@ def save_uploaded_file(file: UploadFile, project_id: int) -> tuple:
         buffer.write(content)
     
     # Get image dimensions
+    from PIL import Image
+    started = time.perf_counter()
     width, height = None, None
     try:
         with Image.open(file_path) as img:
             width, height = img.size
     except Exception:
         pass
+    observe_image_processing("read_dimensions", started)
     
     return str(file_path), len(content), width, height
 
@@ -123,11 +175,85 @@ def get_projects(
     """Get user's projects"""
     
     projects = db.query(Project).filter(
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).offset(skip).limit(limit).all()
     
     return projects
 
+@router.post("/import", response_model=ImportJobResponse, status_code=202)
+async def import_project(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+    archive: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    manifest: Optional[str] = Form(None),
+    project_id: Optional[int] = Form(None)
+):
+    """Import a ZIP archive, or files plus a manifest, as project images in the background"""
+    
+    files = files or []
+    if archive is None and not files:
+        raise HTTPException(status_code=400, detail="Upload a ZIP archive or image files")
+    if len(files) > tuning.IMPORT_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {tuning.IMPORT_MAX_FILES} files per import")
+    
+    if project_id is not None:
+        # Verify project ownership
+        project = db.query(Project).filter(
+            Project.id == project_id,
+            Project.owner_id == current_user.id,
+            Project.deleted_at.is_(None)
+        ).first()
+        
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+    
+    try:
+        # Copies the spooled upload to disk in chunks, off the event loop
+        staged = await asyncio.to_thread(
+            stage_upload,
+            archive.file if archive is not None else None,
+            [(upload.file, upload.filename or "") for upload in files],
+            parse_manifest(manifest)
+        )
+    except InvalidImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if project_id is None:
+        details = staged.manifest.get('project') or {}
+        fallback = Path(archive.filename).stem if archive is not None and archive.filename else "Imported project"
+        project = Project(
+            name=details.get('name') or fallback,
+            description=details.get('description'),
+            product_category=details.get('product_category'),
+            target_audience=details.get('target_audience'),
+            brand_guidelines=details.get('brand_guidelines'),
+            owner_id=current_user.id
+        )
+        db.add(project)
+        db.commit()
+    
+    job = create_job(db, IMPORT_JOB, current_user.id, project.id)
+    claim_staged(staged, job.id)
+    submit_job(job, import_images, project.id, staged, on_cancel=lambda: discard_staged(staged))
+    
+    return {"job_id": job.id, "project_id": project.id}
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job_status(
+    job_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    """Progress and result of a background job"""
+    
+    job = get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
 @router.get("/{project_id}", response_model=ProjectWithImagesResponse)
 def get_project(
     project_id: int,
@@ -138,7 +264,8 @@ def get_project(
     
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -157,7 +284,8 @@ def update_project(
     
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -173,32 +301,31 @@ def update_project(
     
     return project
 
-@router.delete("/{project_id}")
+@router.delete("/{project_id}", status_code=202)
 def delete_project(
     project_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
     db: Session = Depends(get_db)
 ):
-    """Delete project"""
+    """Delete project; rows and files are removed in the background"""
     
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Delete associated files
-    project_dir = Path(settings.UPLOAD_DIR) / f"project_{project_id}"
-    if project_dir.exists():
-        import shutil
-        shutil.rmtree(project_dir)
-    
-    db.delete(project)
+    # Hidden from here on; the job deletes images and generations in batches
+    project.deleted_at = func.now()
     db.commit()
     
-    return {"message": "Project deleted successfully"}
+    job = create_job(db, PROJECT_DELETE_JOB, current_user.id, project_id)
+    submit_job(job, delete_project_data, project_id)
+    
+    return {"message": "Project scheduled for deletion", "job_id": job.id, "project_id": project_id}
 
 @router.post("/{project_id}/images", response_model=ProductImageResponse)
 async def upload_product_image(
@@ -213,7 +340,8 @@ async def upload_product_image(
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -266,6 +394,48 @@ async def upload_product_image(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
+@router.post("/{project_id}/images/batch", response_model=BatchUploadResponse)
+async def upload_product_images(
+    project_id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+    files: List[UploadFile] = File(...),
+    primary_index: Optional[int] = Form(None),
+    skip_duplicates: bool = Form(True)
+):
+    """Upload several product images at once; reports the outcome per file"""
+    
+    if len(files) > tuning.UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {tuning.UPLOAD_MAX_FILES} files per upload")
+    
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    # Files are written and inspected on a worker pool, off the event loop
+    outcomes = await asyncio.to_thread(
+        save_uploads,
+        project_id,
+        [(upload.file, upload.filename or "", upload.content_type) for upload in files]
+    )
+    insert_uploads(db, project_id, outcomes, primary_index, skip_duplicates)
+    
+    return {
+        "created": sum(outcome.status == "created" for outcome in outcomes),
+        "duplicates": sum(outcome.status == "duplicate" for outcome in outcomes),
+        "failed": sum(outcome.status == "failed" for outcome in outcomes),
+        "results": [
+            {"filename": outcome.filename, "status": outcome.status, "image": outcome.image, "error": outcome.error}
+            for outcome in outcomes
+        ]
+    }
+
 @router.get("/{project_id}/images", response_model=List[ProductImageResponse])
 def get_project_images(
     project_id: int,
@@ -277,7 +447,8 @@ def get_project_images(
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -289,6 +460,34 @@ def get_project_images(
     
     return images
 
+@router.get("/{project_id}/tags", response_model=List[TagCountResponse])
+def get_project_tags(
+    project_id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    kind: TagKind = TagKind.HASHTAG,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Hashtags or keywords from all of a project's generations, most used first"""
+    
+    # Verify project ownership
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
+    ).first()
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    count = func.count(ContentTag.id).label("count")
+    rows = db.query(ContentTag.value, count).filter(
+        ContentTag.project_id == project_id,
+        ContentTag.kind == kind
+    ).group_by(ContentTag.value).order_by(count.desc(), ContentTag.value).limit(min(limit, 1000)).all()
+    
+    return [{"value": value, "count": total} for value, total in rows]
+
 @router.delete("/{project_id}/images/{image_id}")
 def delete_product_image(
     project_id: int,
@@ -301,7 +500,8 @@ def delete_product_image(
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -341,7 +541,8 @@ def set_primary_image(
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
-        Project.owner_id == current_user.id
+        Project.owner_id == current_user.id,
+        Project.deleted_at.is_(None)
     ).first()
     
     if not project:
@@ -1,31 +1,85 @@
 """
 Database configuration and session management
+
+Engines are created on first use rather than at import time, so processes
+that never touch one of them (e.g. the async engine, or a cold worker still
+answering /health) don't pay for the driver imports.
 """
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
 
 # Sync database setup
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+_engine: Optional[Engine] = None
 
 # Async database setup
 ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
-async_engine = create_async_engine(ASYNC_DATABASE_URL)
-AsyncSessionLocal = sessionmaker(
-    async_engine, class_=AsyncSession, expire_on_commit=False
-)
+_async_engine = None
+_async_session_local = None
 
 Base = declarative_base()
 
+def get_engine() -> Engine:
+    """Get the sync engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        from app.core.metrics import instrument_engine
+        _engine = create_engine(SQLALCHEMY_DATABASE_URL)
+        instrument_engine(_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_async_engine():
+    """Get the async engine, creating it on first use"""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    return _async_engine
+
+def get_async_sessionmaker():
+    """Get the async session factory, creating it on first use"""
+    global _async_session_local
+    if _async_session_local is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+        _async_session_local = sessionmaker(
+            get_async_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _async_session_local
+
+def dispose_engines(close: bool = True):
+    """Drop pooled connections; use close=False in a forked child so the
+    parent's sockets are left alone and fresh ones are opened on demand"""
+    if _engine is not None:
+        _engine.dispose(close=close)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=close)
+
+def open_session() -> Session:
+    """Open a sync session bound to the (lazily created) engine"""
+    get_engine()
+    return SessionLocal()
+
+def __getattr__(name: str):
+    """Keep `engine`, `async_engine` and `AsyncSessionLocal` importable while building them lazily"""
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "AsyncSessionLocal":
+        return get_async_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Dependency to get DB session
 def get_db():
     """Get database session"""
-    db = SessionLocal()
+    db = open_session()
     try:
         yield db
     finally:
@@ -34,5 +88,5 @@ def get_db():
 # Async dependency to get DB session
 async def get_async_db():
     """Get async database session"""
-    async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+    async with get_async_sessionmaker()() as session:
+        yield session
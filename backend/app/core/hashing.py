@@ -0,0 +1,162 @@
+"""
+Dedicated executor for CPU-bound password hashing
+
+bcrypt is deliberately slow, so running it on the shared Starlette threadpool
+lets a burst of logins starve every other sync endpoint. Hashing is sent to a
+small, size-limited pool instead (a process pool by default, so it does not
+contend for the GIL) with its own queue accounting.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from .tracing import span
+from .tuning import tuning
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[Any, float]:
+    """Run fn in the worker and report how long it spent executing"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHashExecutor:
+    """Size-limited executor with queue metrics for password hashing"""
+
+    def __init__(self, max_workers: int, max_queue: int, use_processes: bool = True):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.restarts = 0
+
+    def _get_executor(self) -> Executor:
+        """Create the pool lazily so it is built after any worker fork"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        try:
+                            self._executor = ProcessPoolExecutor(
+                                max_workers=self.max_workers,
+                                mp_context=multiprocessing.get_context("spawn")
+                            )
+                        except (OSError, NotImplementedError) as e:
+                            logger.warning(f"Process pool unavailable for password hashing, using threads: {e}")
+                            self.use_processes = False
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="password-hash"
+                        )
+                    logger.info(
+                        f"Password hashing pool started with {self.max_workers} "
+                        f"{'processes' if self.use_processes else 'threads'}"
+                    )
+        return self._executor
+
+    def _discard_executor(self, executor: Executor):
+        """Drop a broken pool so the next call builds a new one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+                logger.warning("Password hashing pool broken (a worker process died), restarting it")
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a hashing function on the pool, rejecting work when the queue is full"""
+        with self._stats_lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service busy, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.submitted += 1
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        started = time.perf_counter()
+        try:
+            with span("password_hash"):
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                try:
+                    result, run_time = await loop.run_in_executor(executor, _timed_call, fn, *args)
+                except BrokenProcessPool:
+                    # Retry once on a fresh pool
+                    self._discard_executor(executor)
+                    result, run_time = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        except Exception:
+            with self._stats_lock:
+                self.failed += 1
+                self.pending -= 1
+            raise
+
+        with self._stats_lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_run_time += run_time
+            self.total_wait_time += max(0.0, time.perf_counter() - started - run_time)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and timing metrics for the pool"""
+        completed = self.completed or 1
+        return {
+            'mode': 'process' if self.use_processes else 'thread',
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'bcrypt_rounds': tuning.BCRYPT_ROUNDS,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'pending': self.pending,
+            'restarts': self.restarts,
+            'peak_pending': self.peak_pending,
+            'avg_wait_ms': round(self.total_wait_time / completed * 1000, 2),
+            'avg_run_ms': round(self.total_run_time / completed * 1000, 2),
+        }
+
+    def reset_after_fork(self):
+        """Forget a pool inherited from the parent process; a new one is created on demand"""
+        self._executor = None
+        self.pending = 0
+
+    def shutdown(self):
+        """Stop the pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+password_hash_executor = PasswordHashExecutor(
+    max_workers=tuning.PASSWORD_HASH_WORKERS,
+    max_queue=tuning.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=tuning.PASSWORD_HASH_USE_PROCESSES,
+)
@@ -0,0 +1,198 @@
+"""
+Prometheus metrics
+
+Metric objects are module-level and cheap to update on the hot path. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this), every worker
+writes to shared files and /metrics aggregates across workers.
+"""
+import os
+import time
+from typing import Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_CALL_DURATION = Histogram(
+    "upstream_call_duration_seconds",
+    "OpenRouter call latency by model, API key index and HTTP status",
+    ["model", "key_index", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_FALLBACKS = Counter(
+    "upstream_fallbacks_total",
+    "Times an upstream call moved on to another key or model",
+    ["reason"],
+)
+API_KEY_ACTIVE = Gauge(
+    "api_key_active",
+    "Whether an API key is currently usable (1) or benched (0), per worker",
+    ["key_index"],
+    multiprocess_mode="liveall",
+)
+API_KEY_REQUESTS_REMAINING = Gauge(
+    "api_key_requests_remaining",
+    "Requests remaining reported by the upstream rate-limit headers",
+    ["key_index"],
+    multiprocess_mode="livemin",
+)
+API_KEY_ERROR_COUNT = Gauge(
+    "api_key_error_count",
+    "Consecutive errors recorded for an API key, per worker",
+    ["key_index"],
+    multiprocess_mode="liveall",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ["operation"],
+    buckets=DB_BUCKETS,
+)
+GENERATION_DURATION = Histogram(
+    "generation_duration_seconds",
+    "End-to-end content generation time by pipeline and outcome",
+    ["pipeline", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+SIMILARITY_LOOKUPS = Counter(
+    "similarity_cache_lookups_total",
+    "Near-duplicate prompt lookups by pipeline and result (hit = previous generation reused)",
+    ["pipeline", "result"],
+)
+IMAGE_PROCESSING_DURATION = Histogram(
+    "image_processing_duration_seconds",
+    "Time spent decoding/re-encoding images",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_template(scope), str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+# Full templates of routes in included routers, by id(route): depending on the
+# FastAPI version, the matched route's path is relative to its own router
+_route_templates: Dict[int, str] = {}
+
+
+def register_route_templates(router, prefix: str):
+    """Record the full template of every route of a router included under `prefix`"""
+    for route in router.routes:
+        if getattr(route, "path", None) is not None:
+            _route_templates[id(route)] = prefix + route.path
+
+
+def route_template(scope) -> str:
+    """The matched route template (e.g. /api/v1/projects/{project_id}), so label cardinality stays bounded.
+
+    The router leaves the matched route in the shared scope; its path is
+    relative to the mount it lives under, if any, and to its router unless it
+    was registered with register_route_templates.
+    """
+    mount_prefix = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+    route = scope.get("route")
+    if route is not None:
+        return mount_prefix + _route_templates.get(id(route), route.path)
+    if mount_prefix:
+        # Mounted apps without routes (static uploads) only keep their mount prefix
+        return mount_prefix + "/{path}"
+    return "unmatched"
+
+
+def observe_image_processing(operation: str, started: float):
+    """Record an image-processing duration measured from a perf_counter() start"""
+    IMAGE_PROCESSING_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+
+def record_key_state(api_key_manager):
+    """Mirror the key manager's per-key state into gauges"""
+    for index, status in api_key_manager.key_status.items():
+        label = str(index + 1)
+        API_KEY_ACTIVE.labels(label).set(1 if status['active'] else 0)
+        API_KEY_ERROR_COUNT.labels(label).set(status['error_count'])
+        if status['requests_remaining'] is not None:
+            API_KEY_REQUESTS_REMAINING.labels(label).set(status['requests_remaining'])
+
+
+def instrument_engine(engine):
+    """Attach query timing and pool gauges to a SQLAlchemy engine"""
+    from sqlalchemy import event
+
+    pool = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def render_metrics() -> bytes:
+    """Render all metrics, aggregated across workers in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead(pid: int):
+    """Clean up a dead worker's live gauges (gunicorn child_exit hook)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
@@ -0,0 +1,127 @@
+"""
+Startup database migrations
+
+Every worker runs this on boot, so the common case - schema already at head -
+is answered in-process from the alembic_version table without spawning
+`alembic upgrade head`. When an upgrade is needed, a Postgres advisory lock
+makes sure only one worker runs it while the others wait and re-check.
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .database import get_engine, Base
+from .tuning import tuning
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arbitrary constant shared by all workers for pg_advisory_lock
+MIGRATION_LOCK_KEY = 727_001_028
+
+
+def _alembic_config():
+    """Load alembic.ini with an absolute script location"""
+    from alembic.config import Config
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+
+def get_head_revisions() -> Set[str]:
+    """Revisions at the head of the migration scripts"""
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+def get_current_revisions(connection: Connection) -> Set[str]:
+    """Revisions recorded in the database"""
+    from alembic.runtime.migration import MigrationContext
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+@contextmanager
+def migration_lock(connection: Connection):
+    """Hold a session-level advisory lock on Postgres; no-op elsewhere"""
+    if connection.dialect.name != "postgresql":
+        yield
+        return
+
+    started = time.perf_counter()
+    connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    connection.commit()
+    logger.info(f"Acquired migration lock in {(time.perf_counter() - started) * 1000:.0f} ms")
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+
+
+def _upgrade_subprocess() -> bool:
+    """Run `alembic upgrade head` in a subprocess"""
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        logger.error(f"Migration failed: {result.stderr}")
+        return False
+    return True
+
+
+def _create_tables(engine):
+    """Create missing tables from the models (existing tables are untouched)"""
+    from .. import models  # noqa: F401 - registers every table on Base.metadata
+    Base.metadata.create_all(bind=engine)
+
+
+def run_migrations():
+    """Bring the schema to head, skipping all work when it is already there"""
+    if not tuning.RUN_MIGRATIONS:
+        logger.info("Skipping database migrations (RUN_MIGRATIONS disabled)")
+        return
+
+    engine = get_engine()
+    try:
+        heads = get_head_revisions()
+        with engine.connect() as connection:
+            current = get_current_revisions(connection)
+            connection.rollback()
+            if current == heads:
+                logger.info(f"Database schema already at head ({', '.join(sorted(heads))})")
+                return
+
+            with migration_lock(connection):
+                # Another worker may have migrated while we waited for the lock
+                current = get_current_revisions(connection)
+                connection.rollback()
+                if current == heads:
+                    logger.info("Database schema migrated by another worker")
+                    return
+
+                logger.info("Running database migrations...")
+                if _upgrade_subprocess():
+                    # The initial revision is empty, so fresh databases get
+                    # their tables from the models (existing tables untouched)
+                    _create_tables(engine)
+                    logger.info("Database migrations completed successfully")
+                    return
+
+        logger.info("Falling back to create_all...")
+        _create_tables(engine)
+
+    except Exception as e:
+        logger.error(f"Error running migrations: {e}")
+        logger.info("Falling back to create_all...")
+        _create_tables(engine)
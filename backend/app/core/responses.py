@@ -0,0 +1,201 @@
+"""
+Response encoding: orjson bodies and negotiated compression
+
+ORJSONResponse is the default response class of the API router. Routes
+still validate their return value against the response model; only the
+final dump of the validated data goes through orjson instead of json.dumps.
+That takes about a third of the CPU time of json.dumps for a 50-item
+generations page, which is on par with FastAPI's own pydantic
+serialization of response models. Routes that return plain dicts get the
+same speed-up (see benchmarks/response_encoding.py).
+
+CompressionMiddleware compresses response bodies with brotli or gzip,
+whichever the client prefers in Accept-Encoding (brotli wins ties, and is
+skipped when the package is not installed). Bodies below
+RESPONSE_COMPRESSION_MIN_BYTES, responses that already carry a
+Content-Encoding, images and other compressed media, and everything under
+/uploads are sent as-is. Streaming responses are compressed chunk by chunk
+and flushed after every chunk, so clients keep receiving data as it is
+produced.
+"""
+import gzip
+import logging
+import zlib
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from .tracing import span
+from .tuning import tuning
+
+logger = logging.getLogger(__name__)
+
+# Media that is compressed already, or must reach the client unbuffered
+SKIPPED_CONTENT_TYPES = ("image/", "video/", "audio/", "text/event-stream")
+SKIPPED_MEDIA_TYPES = {
+    "application/gzip", "application/zip", "application/zstd", "application/x-brotli",
+    "application/octet-stream", "application/pdf",
+}
+SKIPPED_PATH_PREFIXES = ("/uploads/",)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _load_brotli():
+    try:
+        import brotli
+    except ImportError:
+        logger.warning("brotli is not installed; responses are compressed with gzip only")
+        return None
+    return brotli
+
+
+def negotiate_encoding(accept_encoding: str, brotli_available: bool) -> Optional[str]:
+    """'br', 'gzip' or None for an Accept-Encoding header value"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip()] = quality
+
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = weights.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _is_compressible(headers) -> bool:
+    content_type = ""
+    for key, value in headers:
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value.decode("latin-1").partition(";")[0].strip().lower()
+    if not content_type:
+        return False
+    return not content_type.startswith(SKIPPED_CONTENT_TYPES) and content_type not in SKIPPED_MEDIA_TYPES
+
+
+class _Encoder:
+    """Incremental brotli/gzip encoder"""
+
+    def __init__(self, encoding: str, brotli):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=tuning.RESPONSE_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(tuning.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)  # gzip container
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + (self._compressor.finish() if last else self._compressor.flush())
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(body: bytes, encoding: str, brotli=None) -> bytes:
+    """One-shot compression of a complete body"""
+    if encoding == "br":
+        return brotli.compress(body, quality=tuning.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=tuning.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: brotli/gzip response bodies negotiated from Accept-Encoding"""
+
+    def __init__(self, app):
+        self.app = app
+        self.brotli = _load_brotli()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tuning.RESPONSE_COMPRESSION_ENABLED \
+                or scope["path"].startswith(SKIPPED_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding, self.brotli is not None) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if not _is_compressible(message.get("headers", [])):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether compression pays
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                if not more_body and len(body) < tuning.RESPONSE_COMPRESSION_MIN_BYTES:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers = [
+                    (key, value) for key, value in start_message.get("headers", [])
+                    if key not in (b"content-length", b"vary")
+                ]
+                vary = [value for key, value in start_message.get("headers", []) if key == b"vary"]
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+                if not more_body:
+                    # Complete body: compress in one go and send an exact Content-Length
+                    with span("compress", encoding=encoding, bytes_in=len(body)) as current:
+                        compressed = compress_body(body, encoding, self.brotli)
+                        if current is not None:
+                            current.set_attribute("bytes_out", len(compressed))
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                encoder = _Encoder(encoding, self.brotli)
+                await send({**start_message, "headers": headers})
+
+            chunk = encoder.compress(body, last=not more_body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,26 +2,53 @@
 Security utilities for authentication and authorization
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 from app.core.config import settings
+from app.core.tuning import tuning
+from app.core.hashing import password_hash_executor
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """Password hashing context, built on first use (passlib/bcrypt are slow to import).
+
+    min/max rounds are pinned to the configured cost so that hashes made with
+    an older cost factor are flagged for rehash on login.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=tuning.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=tuning.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=tuning.BCRYPT_ROUNDS,
+    )
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check if a hash was made with an outdated scheme or cost factor"""
+    return get_pwd_context().needs_update(hashed_password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the dedicated hashing pool"""
+    return await password_hash_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the dedicated hashing pool"""
+    return await password_hash_executor.run(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -34,6 +61,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         return payload
@@ -0,0 +1,202 @@
+"""
+Lightweight request tracing
+
+Each HTTP request gets a trace held in a context variable; code wraps its
+stages in `with span("name"):`. The middleware reports stage durations in a
+`Server-Timing` response header and hands sampled (or slow) traces to an
+exporter as OpenTelemetry-shaped span records. Outside a request, span() is
+a no-op.
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .tuning import tuning
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("app.trace")
+
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9_.\-]")
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    root: Span
+    spans: List[Span] = field(default_factory=list)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(hex_chars: int) -> str:
+    return os.urandom(hex_chars // 2).hex()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a stage of the current request; yields the Span (or None outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get() or trace.root
+    current = Span(name, _new_id(16), parent.span_id, time.time_ns(), attributes=attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_attribute("error", type(e).__name__)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def server_timing_header(trace: Trace) -> str:
+    """Wall-clock time covered by the spans of each name, as a Server-Timing header value.
+
+    Spans of one name that ran concurrently (e.g. the sections of a sectioned
+    plan) are merged as intervals rather than summed, so no stage reports more
+    than the request took.
+    """
+    intervals: Dict[str, List[Tuple[int, int]]] = {}
+    for item in trace.spans:
+        if item.end_ns is None:
+            continue
+        intervals.setdefault(_TOKEN_RE.sub("_", item.name), []).append((item.start_ns, item.end_ns))
+    parts = [f"{name};dur={_covered_ns(spans) / 1_000_000:.1f}" for name, spans in intervals.items()]
+    parts.append(f"total;dur={trace.root.duration_ms:.1f}")
+    return ", ".join(parts)
+
+
+def _covered_ns(intervals: List[Tuple[int, int]]) -> int:
+    """Length of the union of [start, end) intervals"""
+    covered = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                covered += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        covered += current_end - current_start
+    return covered
+
+
+def to_otel_records(trace: Trace) -> List[Dict[str, Any]]:
+    """Convert a trace to OpenTelemetry-style span dicts"""
+    records = []
+    for item in [trace.root] + trace.spans:
+        records.append({
+            'traceId': trace.trace_id,
+            'spanId': item.span_id,
+            'parentSpanId': item.parent_id,
+            'name': item.name,
+            'kind': 'SPAN_KIND_SERVER' if item is trace.root else 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': item.start_ns,
+            'endTimeUnixNano': item.end_ns,
+            'attributes': item.attributes,
+        })
+    return records
+
+
+class NoopExporter:
+    """Default exporter: drops traces"""
+
+    def export(self, trace: Trace):
+        pass
+
+
+class LogExporter:
+    """Writes one JSON line per trace to the `app.trace` logger"""
+
+    def export(self, trace: Trace):
+        trace_logger.info(json.dumps({'spans': to_otel_records(trace)}, default=str))
+
+
+def _build_exporter():
+    if tuning.TRACE_EXPORTER == "log":
+        return LogExporter()
+    if tuning.TRACE_EXPORTER not in ("", "none"):
+        logger.warning(f"Unknown TRACE_EXPORTER '{tuning.TRACE_EXPORTER}', traces will not be exported")
+    return NoopExporter()
+
+
+exporter = _build_exporter()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware: starts a trace per request and adds Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tuning.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id = None, None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                match = _TRACEPARENT_RE.match(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_id = match.group(1), match.group(2)
+                break
+
+        root = Span(f"{scope['method']} {scope['path']}", _new_id(16), parent_id, time.time_ns())
+        trace = Trace(trace_id or _new_id(32), root)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(trace).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            root.end_ns = time.time_ns()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            if root.duration_ms >= tuning.TRACE_SLOW_REQUEST_MS or random.random() < tuning.TRACE_SAMPLE_RATE:
+                try:
+                    exporter.export(trace)
+                except Exception as e:
+                    logger.error(f"Error exporting trace: {e}")
@@ -0,0 +1,102 @@
+"""
+Runtime tuning settings for performance-sensitive subsystems
+"""
+from typing import Dict, List
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class TuningSettings(BaseSettings):
+    """Knobs for executors, limits and background jobs, read from the environment / .env"""
+
+    # Startup
+    RUN_MIGRATIONS: bool = True  # Disable for rolling restarts (--no-migrate)
+    # Fail stale imports and finish stale project deletions (see job_service.recover_interrupted_jobs)
+    RECOVER_INTERRUPTED_JOBS: bool = True
+    INTERRUPTED_JOB_MINUTES: float = 60.0  # A pending/running job without progress this long belongs to a dead worker
+
+    # Production server (gunicorn + uvicorn workers, see gunicorn.conf.py)
+    WEB_CONCURRENCY: int = 0  # 0 = size from CPU count
+    MAX_WORKERS: int = 8
+    KEEPALIVE_SECONDS: int = 5
+    BACKLOG: int = 2048
+    MAX_REQUESTS: int = 2000  # Recycle workers after N requests, 0 = never
+    MAX_REQUESTS_JITTER: int = 200
+
+    # Upstream AI calls
+    UPSTREAM_TIMEOUT_SECONDS: float = 60.0
+    # max_tokens per pipeline, overriding the pipeline defaults, e.g. {"marketing_plan": 4000}
+    GENERATION_TOKEN_BUDGETS: Dict[str, int] = {}
+    # Models that accept response_format={"type": "json_object"}
+    JSON_MODE_MODELS: List[str] = ["google/gemini-2.5-flash-image-preview:free"]
+    # Sectioned marketing plans: one concurrent upstream call per section
+    MARKETING_PLAN_SECTIONED: bool = False  # Default when the request does not say
+    SECTION_CONCURRENCY: int = 8
+    SECTION_RETRIES: int = 1  # Extra attempts for a failed section, each on another key
+    # Near-duplicate prompt reuse: serve a previous generation when the prompt is this similar (cosine)
+    SIMILARITY_CACHE_ENABLED: bool = False
+    SIMILARITY_THRESHOLD: float = 0.92
+    SIMILARITY_MAX_MEMORY_MB: int = 256  # All indexes of a worker (~550 bytes per entry); least recently used dropped
+    SIMILARITY_LOAD_LIMIT: int = 10_000  # Most recent generations indexed per user/pipeline when first used
+
+    # Request tracing (Server-Timing header + sampled span export)
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_SLOW_REQUEST_MS: float = 5000.0  # Always export requests slower than this
+    TRACE_EXPORTER: str = "none"  # none | log
+
+    # Response compression (brotli/gzip negotiated from Accept-Encoding)
+    RESPONSE_COMPRESSION_ENABLED: bool = True  # Disable when a reverse proxy compresses already
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Smaller bodies are sent as-is
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0-11; higher levels cost too much CPU for dynamic responses
+
+    # Generation persistence: batch lifecycle UPDATEs from concurrent requests
+    GENERATION_WRITE_BEHIND: bool = False  # A GET right after the response may still read `processing`
+    GENERATION_FLUSH_INTERVAL_MS: float = 50.0  # Max delay before a queued update is written
+    GENERATION_FLUSH_MAX_BATCH: int = 100
+
+    # Background jobs (bulk imports, ...)
+    BACKGROUND_JOB_WORKERS: int = 2  # Jobs running at once per worker process
+    IMPORT_WORKERS: int = 4  # Threads per import / multi-file upload reading dimensions and writing thumbnails
+    IMPORT_MAX_FILES: int = 1000
+    IMPORT_MAX_ARCHIVE_SIZE: int = 2 * 1024 ** 3
+    IMPORT_THUMBNAIL_SIZE: int = 256  # Longest edge in pixels
+    UPLOAD_MAX_FILES: int = 50  # Files per multi-file upload request (POST /projects/{id}/images/batch)
+    PROJECT_DELETE_BATCH_SIZE: int = 1000  # Rows per DELETE when a deleted project is cleaned up
+
+    # Generation lifecycle events (GET /content/events, server-sent events)
+    EVENTS_BACKEND: str = "memory"  # memory (per worker) | postgres (LISTEN/NOTIFY across workers)
+    EVENTS_QUEUE_SIZE: int = 100  # Events buffered per connection; the oldest are dropped beyond this
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0  # Comment line sent on an idle stream to keep proxies from closing it
+
+    # Retention of content_generations (POST /admin/retention/run or `python -m app.services.retention`)
+    RETENTION_ARCHIVE_DAYS: int = 0  # Archive finished generations older than this, 0 = keep forever
+    RETENTION_ARCHIVE_TARGET: str = "table"  # table (content_generations_archive) | files (gzipped NDJSON)
+    RETENTION_ARCHIVE_DIR: str = "archive"
+    RETENTION_STRIP_IMAGES_DAYS: int = 30  # Move inline base64 images of older generations to files, 0 = never
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_BATCH_PAUSE_MS: float = 100.0
+
+    # zstd compression of generated_content at rest (dictionaries: POST /admin/compression/train)
+    # Existing rows are read either way. Compressed content is not full-text indexed:
+    # search finds those generations by prompt only. Content with inline images stays plain.
+    TEXT_COMPRESSION_ENABLED: bool = False
+    TEXT_COMPRESSION_LEVEL: int = 6
+    TEXT_COMPRESSION_MIN_BYTES: int = 1024  # Shorter values are stored plain
+    TEXT_COMPRESSION_DICT_SIZE: int = 32 * 1024
+    TEXT_COMPRESSION_TRAINING_SAMPLES: int = 2000  # Most recent generations per content type
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_USE_PROCESSES: bool = True
+
+    # Per-user generation quota (0 = unlimited), overridable per user by admins
+    DAILY_GENERATION_LIMIT: int = 50
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+tuning = TuningSettings()
@@ -0,0 +1,49 @@
+"""
+Uvicorn worker class and per-worker hooks for the gunicorn production server
+"""
+import importlib.util
+import logging
+import os
+import time
+
+from uvicorn.workers import UvicornWorker
+
+logger = logging.getLogger(__name__)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """Uvicorn worker using uvloop/httptools when installed"""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "lifespan": "on",
+        "proxy_headers": True,
+    }
+
+
+def init_worker_after_fork():
+    """Reset process-local pools inherited from the gunicorn master"""
+    from .database import dispose_engines
+    from .hashing import password_hash_executor
+
+    dispose_engines(close=False)
+    password_hash_executor.reset_after_fork()
+
+
+def warm_worker_pools():
+    """Open the worker's own DB pool so the first request doesn't pay for it"""
+    from sqlalchemy import text
+    from .database import get_engine
+
+    started = time.perf_counter()
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+        logger.info(f"Worker {os.getpid()} DB pool ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.warning(f"Worker {os.getpid()} could not warm DB pool: {e}")
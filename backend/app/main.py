@@ -1,58 +1,58 @@
 """
 FastAPI application for AI Marketing Platform
 """
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import logging
-import subprocess
-import sys
-import os
 
 # Import core modules - using absolute imports
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api.v1 import api_router
+from app.core.hashing import password_hash_executor
+from app.core.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE_LATEST
+from app.core.responses import CompressionMiddleware
+from app.core.tracing import TracingMiddleware
+from app.core.migrations import run_migrations
+from app.api.v1 import API_PREFIX, api_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_migrations():
-    """Run Alembic migrations on startup"""
-    try:
-        logger.info("Running database migrations...")
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        result = subprocess.run(
-            [sys.executable, "-m", "alembic", "upgrade", "head"],
-            cwd=current_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            logger.info("Database migrations completed successfully")
-        else:
-            logger.error(f"Migration failed: {result.stderr}")
-            logger.info("Falling back to create_all...")
-            Base.metadata.create_all(bind=engine)
-            
-    except Exception as e:
-        logger.error(f"Error running migrations: {e}")
-        logger.info("Falling back to create_all...")
-        Base.metadata.create_all(bind=engine)
+_import_duration = time.perf_counter() - _import_started
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("Starting up AI Marketing Platform API")
+    startup_started = time.perf_counter()
+    logger.info(f"Startup phase 'imports' took {_import_duration * 1000:.0f} ms")
+    
+    phase_started = time.perf_counter()
     run_migrations()
+    logger.info(f"Startup phase 'migrations' took {(time.perf_counter() - phase_started) * 1000:.0f} ms")
+
+    phase_started = time.perf_counter()
+    from app.services.job_service import recover_interrupted_jobs
+    recover_interrupted_jobs()
+    logger.info(f"Startup phase 'job recovery' took {(time.perf_counter() - phase_started) * 1000:.0f} ms")
+    
+    logger.info(f"Startup completed in {(time.perf_counter() - startup_started) * 1000:.0f} ms")
     yield
     # Shutdown
     logger.info("Shutting down AI Marketing Platform API")
+    from app.services.generation_repository import close_generation_write_queue
+    await close_generation_write_queue()
+    from app.services.generation_events import close_event_broker
+    await close_event_broker()
+    from app.services.job_service import shutdown_job_executor
+    shutdown_job_executor()
+    password_hash_executor.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -71,8 +71,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli/gzip for large responses (inside tracing, so compression shows up as a stage)
+app.add_middleware(CompressionMiddleware)
+
+# Per-request stage timing (Server-Timing header, sampled trace export)
+app.add_middleware(TracingMiddleware)
+
+# Record request latency per route (outermost, so it sees the final status)
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
-app.include_router(api_router, prefix="/api/v1")
+app.include_router(api_router, prefix=API_PREFIX)
 
 # Serve uploaded files
 try:
@@ -97,6 +106,11 @@ async def health_check():
         "version": settings.APP_VERSION
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
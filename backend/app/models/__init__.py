@@ -1,15 +1,25 @@
 from .user import User
 from .project import Project, ProductImage
-from .content import ContentGeneration, MarketingPlan, SEOAnalysis, ContentType, GenerationStatus, MarketingGoal
+from .job import BackgroundJob, JobStatus
+from .compression import CompressionDictionary
+from .content import (
+    ContentGeneration, ArchivedGeneration, MarketingPlan, SEOAnalysis, ContentTag, ContentType, GenerationStatus, MarketingGoal, TagKind
+)
 
 __all__ = [
     "User",
     "Project", 
     "ProductImage",
+    "BackgroundJob",
+    "JobStatus",
+    "CompressionDictionary",
     "ContentGeneration",
+    "ArchivedGeneration",
     "MarketingPlan", 
     "SEOAnalysis",
+    "ContentTag",
     "ContentType",
     "GenerationStatus", 
-    "MarketingGoal"
+    "MarketingGoal",
+    "TagKind"
 ]
\ No newline at end of file
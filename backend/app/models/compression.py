@@ -0,0 +1,155 @@
+"""
+Optional zstd compression of large text columns
+
+CompressedText stores a value either as plain text or as a text-safe
+envelope, so it stays a regular TEXT column (full-text search, LIKE and
+backups keep working on plain rows):
+
+    \\x1ezstd:<dictionary id>:<base64 zstd frame>
+
+Anything without the leading record-separator character is read as-is, so
+existing rows need no migration and compression can be switched on and off
+at any time. Dictionaries are trained per content type from stored
+generations (see app.services.text_compression) and kept in
+compression_dictionaries. Old dictionaries are never deleted, because rows
+encoded with them still refer to their id. New values are compressed with
+the newest dictionary of every content type, and the smallest frame wins.
+Generation content is written once, after a multi-second upstream call,
+so the extra compressions are cheap, and the codec needs no knowledge of
+the row it is in.
+
+Values containing inline base64 images (`data:image/`) are stored plain, so
+retention can still find them with LIKE and move the images to files.
+Compressed values are not full-text indexed (see app.models.search).
+"""
+import base64
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, Text
+from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+
+from ..core.database import Base, open_session
+from ..core.tuning import tuning
+
+logger = logging.getLogger(__name__)
+
+ENCODED_PREFIX = "\x1ezstd:"
+NO_DICTIONARY = 0
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True)
+    content_type = Column(String(50), nullable=False)  # ContentType value the samples came from
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+_dictionaries: Optional[Dict[int, Any]] = None  # id -> ZstdCompressionDict
+_current: List[Tuple[int, Any]] = []  # Newest dictionary per content type
+_load_lock = threading.Lock()
+_local = threading.local()  # Per-thread compressors/decompressors; they are not thread-safe
+
+
+def load_dictionaries(reload: bool = False):
+    """Read all dictionaries into memory (once, or again after training)"""
+    global _dictionaries, _current
+    if _dictionaries is not None and not reload:
+        return
+    import zstandard
+
+    with _load_lock:
+        if _dictionaries is not None and not reload:
+            return
+        db = open_session()
+        try:
+            rows = db.query(CompressionDictionary).order_by(CompressionDictionary.id).all()
+        finally:
+            db.close()
+        dictionaries = {}
+        newest: Dict[str, int] = {}
+        for row in rows:
+            dictionary = zstandard.ZstdCompressionDict(row.data)
+            dictionary.precompute_compress(level=tuning.TEXT_COMPRESSION_LEVEL)
+            dictionaries[row.id] = dictionary
+            newest[row.content_type] = row.id
+        _current = [(dictionary_id, dictionaries[dictionary_id]) for dictionary_id in newest.values()]
+        _dictionaries = dictionaries
+        logger.info(f"Loaded {len(dictionaries)} compression dictionaries")
+
+
+def encode_text(value: str) -> str:
+    """Compressed envelope of `value`, or `value` itself when compression is off or doesn't pay"""
+    if not tuning.TEXT_COMPRESSION_ENABLED or value.startswith(ENCODED_PREFIX):
+        return value
+    if "data:image/" in value:
+        # Kept plain for retention, which offloads inline images
+        return value
+    data = value.encode("utf-8")
+    if len(data) < tuning.TEXT_COMPRESSION_MIN_BYTES:
+        return value
+    load_dictionaries()
+
+    best_id, best = NO_DICTIONARY, _compressor(NO_DICTIONARY).compress(data)
+    for dictionary_id, _ in _current:
+        frame = _compressor(dictionary_id).compress(data)
+        if len(frame) < len(best):
+            best_id, best = dictionary_id, frame
+    encoded = f"{ENCODED_PREFIX}{best_id}:{base64.b64encode(best).decode('ascii')}"
+    return encoded if len(encoded) < len(value) else value
+
+
+def decode_text(value: Optional[str]) -> Optional[str]:
+    """Plain text of a stored value, encoded or not"""
+    if not value or not value.startswith(ENCODED_PREFIX):
+        return value
+    header, _, payload = value[len(ENCODED_PREFIX):].partition(":")
+    return _decompressor(int(header)).decompress(base64.b64decode(payload)).decode("utf-8")
+
+
+def _dictionary(dictionary_id: int):
+    load_dictionaries()
+    if dictionary_id not in _dictionaries:
+        # Trained by another worker since this one loaded
+        load_dictionaries(reload=True)
+    return _dictionaries[dictionary_id]
+
+
+def _compressor(dictionary_id: int):
+    import zstandard
+
+    compressors = _local.__dict__.setdefault('compressors', {})
+    if dictionary_id not in compressors:
+        dictionary = _dictionary(dictionary_id) if dictionary_id != NO_DICTIONARY else None
+        compressors[dictionary_id] = zstandard.ZstdCompressor(level=tuning.TEXT_COMPRESSION_LEVEL, dict_data=dictionary)
+    return compressors[dictionary_id]
+
+
+def _decompressor(dictionary_id: int):
+    import zstandard
+
+    decompressors = _local.__dict__.setdefault('decompressors', {})
+    if dictionary_id not in decompressors:
+        dictionary = _dictionary(dictionary_id) if dictionary_id != NO_DICTIONARY else None
+        decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[dictionary_id]
+
+
+class CompressedText(TypeDecorator):
+    """TEXT column holding plain or zstd-compressed values, always read back as plain text"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_text(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value)
+
+    def coerce_compared_value(self, op, value):
+        # LIKE patterns and other comparison operands are plain text
+        return Text()
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Enum, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
+from .compression import CompressedText
+from .search import add_search_vector
 import enum
 
 class ContentType(enum.Enum):
@@ -22,8 +24,8 @@ class ContentGeneration(Base):
     __tablename__ = "content_generations"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     source_image_id = Column(Integer, ForeignKey("product_images.id"), nullable=True)
     
     # Generation details
@@ -33,7 +35,7 @@ class ContentGeneration(Base):
     parameters = Column(JSON)  # Store generation parameters (style, aspect ratio, etc.)
     
     # Results
-    generated_content = Column(Text)  # For text content
+    generated_content = Column(CompressedText)  # For text content; zstd-compressed when TEXT_COMPRESSION_ENABLED
     generated_image_path = Column(String)  # For image content
     generation_metadata = Column(JSON)  # Store additional metadata
     
@@ -41,6 +43,9 @@ class ContentGeneration(Base):
     model_used = Column(String)
     api_key_used = Column(String)  # Track which API key was used
     processing_time = Column(Integer)  # Processing time in seconds
+    prompt_tokens = Column(Integer)  # Token usage reported by the upstream
+    completion_tokens = Column(Integer)
+    total_tokens = Column(Integer)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -52,6 +57,35 @@ class ContentGeneration(Base):
     project = relationship("Project", back_populates="generations")
     source_image = relationship("ProductImage", back_populates="generations")
 
+add_search_vector(ContentGeneration.__table__, {"prompt": "A", "generated_content": "B"}, encoded=["generated_content"])
+
+class ArchivedGeneration(Base):
+    """Generations moved out of content_generations by the retention job"""
+    __tablename__ = "content_generations_archive"
+    
+    # Same ids and columns as content_generations, without foreign keys so archived rows outlive their owners
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, index=True)
+    project_id = Column(Integer)
+    source_image_id = Column(Integer)
+    content_type = Column(Enum(ContentType), nullable=False)
+    status = Column(Enum(GenerationStatus))
+    prompt = Column(Text)
+    parameters = Column(JSON)
+    generated_content = Column(CompressedText)
+    generated_image_path = Column(String)
+    generation_metadata = Column(JSON)
+    model_used = Column(String)
+    api_key_used = Column(String)
+    processing_time = Column(Integer)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    total_tokens = Column(Integer)
+    created_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class MarketingGoal(enum.Enum):
     OUTREACH = "outreach"
     SALES = "sales"
@@ -63,6 +97,7 @@ class MarketingPlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     project_id = Column(Integer, ForeignKey("projects.id"))
+    generation_id = Column(Integer, ForeignKey("content_generations.id"), index=True)  # Source generation
     
     # Plan details
     goal = Column(Enum(MarketingGoal), nullable=False)
@@ -88,7 +123,9 @@ class SEOAnalysis(Base):
     __tablename__ = "seo_analyses"
     
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     project_id = Column(Integer, ForeignKey("projects.id"))
+    generation_id = Column(Integer, ForeignKey("content_generations.id"), index=True)  # Source generation
     
     # SEO data
     keywords = Column(JSON)  # Primary and secondary keywords
@@ -102,4 +139,27 @@ class SEOAnalysis(Base):
     competition_level = Column(JSON)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    project = relationship("Project", back_populates="seo_analyses")
+
+class TagKind(enum.Enum):
+    HASHTAG = "hashtag"
+    KEYWORD = "keyword"
+
+class ContentTag(Base):
+    """One hashtag or keyword from a parsed generation, for indexed lookups by project or user"""
+    __tablename__ = "content_tags"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    generation_id = Column(Integer, ForeignKey("content_generations.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(Enum(TagKind), nullable=False)
+    value = Column(String(100), nullable=False)  # Lowercase, hashtags without '#'
+    
+    __table_args__ = (
+        Index("ix_content_tags_project_kind_value", "project_id", "kind", "value"),
+        Index("ix_content_tags_user_kind_value", "user_id", "kind", "value"),
+    )
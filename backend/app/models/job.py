@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Enum
+from sqlalchemy.sql import func
+from ..core.database import Base
+import enum
+
+class JobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class BackgroundJob(Base):
+    """Progress of long-running work started by a request (imports, ...)"""
+    __tablename__ = "background_jobs"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex, handed to the client
+    kind = Column(String(50), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    project_id = Column(Integer)  # Not a foreign key: the job outlives a deleted project
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    
+    # Progress
+    total = Column(Integer)
+    processed = Column(Integer, default=0, nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
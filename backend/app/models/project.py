@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
+from .search import add_search_vector
 
 class Project(Base):
     __tablename__ = "projects"
@@ -9,9 +10,10 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True))  # Hidden from now on; rows and files are removed by a background job
     
     # Project metadata
     product_category = Column(String)
@@ -23,12 +25,15 @@ class Project(Base):
     product_images = relationship("ProductImage", back_populates="project")
     generations = relationship("ContentGeneration", back_populates="project")
     marketing_plans = relationship("MarketingPlan", back_populates="project")
+    seo_analyses = relationship("SEOAnalysis", back_populates="project")
+
+add_search_vector(Project.__table__, {"name": "A", "description": "B"})
 
 class ProductImage(Base):
     __tablename__ = "product_images"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     filename = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
@@ -39,6 +44,8 @@ class ProductImage(Base):
     # Image metadata
     width = Column(Integer)
     height = Column(Integer)
+    thumbnail_path = Column(String)
+    content_hash = Column(String(64))  # SHA-256 of the file, for skipping re-uploads
     is_primary = Column(Boolean, default=False)  # Main product image
     
     # Relationships
@@ -0,0 +1,41 @@
+"""
+Full-text search columns (Postgres only)
+
+Searchable tables get a stored generated `search_vector` tsvector column and
+a GIN index on it. Postgres recomputes the column on every INSERT/UPDATE, so
+no application code has to keep it in sync. Other databases don't get the
+column; search falls back to LIKE matching there.
+"""
+from typing import Dict, Iterable, List
+
+from sqlalchemy import DDL, Table, event
+
+# Text search configuration used for both indexing and queries
+SEARCH_CONFIG = "english"
+# Only the start of very long texts is indexed (tsvector values are capped at 1 MB)
+SEARCH_MAX_CHARS = 100_000
+
+
+def searchable_text(column: str, encoded: bool = False) -> str:
+    """SQL for the indexed text of a column; compressed values (see app.models.compression) index as empty"""
+    text = f"left(coalesce({column}, ''), {SEARCH_MAX_CHARS})"
+    return f"CASE WHEN left({column}, 1) = chr(30) THEN '' ELSE {text} END" if encoded else text
+
+
+def search_vector_ddl(table: str, weighted_columns: Dict[str, str], encoded: Iterable[str] = ()) -> List[str]:
+    """Statements adding the search_vector column and its GIN index to `table`"""
+    encoded = set(encoded)
+    vector = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, {searchable_text(column, column in encoded)}), '{weight}')"
+        for column, weight in weighted_columns.items()
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)",
+    ]
+
+
+def add_search_vector(table: Table, weighted_columns: Dict[str, str], encoded: Iterable[str] = ()):
+    """Create the search column along with `table` on Postgres; columns map to weights A-D"""
+    for statement in search_vector_ddl(table.name, weighted_columns, encoded):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
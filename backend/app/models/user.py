@@ -19,6 +19,7 @@ class User(Base):
     # API usage tracking
     daily_requests_count = Column(Integer, default=0)
     last_request_date = Column(DateTime(timezone=True))
+    daily_request_limit = Column(Integer, nullable=True)  # None = platform default
     
     # Relationships
     projects = relationship("Project", back_populates="owner")
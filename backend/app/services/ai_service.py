@@ -2,14 +2,20 @@ import asyncio
 import logging
 import json
 import base64
+import re
+import time
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-import httpx
-from PIL import Image
 import io
 
 from ..core.config import settings, PRIMARY_MODEL, BACKUP_MODELS, FREE_VISION_MODELS
-from .api_key_manager import api_key_manager
+from ..core.tuning import tuning
+from ..core.metrics import (
+    UPSTREAM_CALL_DURATION, UPSTREAM_FALLBACKS, observe_image_processing, record_key_state
+)
+from ..core.tracing import span
+from .api_key_manager import get_api_key_manager
+from .generation_events import publish_upstream_event
 
 logger = logging.getLogger(__name__)
 
@@ -21,252 +27,55 @@ class AIService:
         self.site_url = settings.OPENROUTER_SITE_URL
         self.site_name = settings.OPENROUTER_SITE_NAME
     
-    async def generate_text_to_image(
-        self, 
-        prompt: str, 
-        style: str = "Realistic", 
-        aspect_ratio: str = "Square (1:1)",
-        user_id: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """Generate image from text prompt - EXACT SAME AS STREAMLIT"""
-        
-        # Use EXACT same prompt format as working Streamlit app
-        full_prompt = f"Generate an image: {prompt}. Style: {style}. Aspect ratio: {aspect_ratio}."
-        
-        messages = [{"role": "user", "content": full_prompt}]
-        
-        result = await self._make_api_call(messages, user_id=user_id)
-        
-        if result and result.get('success'):
-            return {
-                'success': True,
-                'content': result.get('content'),
-                'images': result.get('images', []),
-                'model_used': result.get('model_used'),
-                'processing_time': result.get('processing_time')
-            }
-        
-        return {'success': False, 'error': result.get('error', 'Unknown error')}
-    
-    async def generate_product_render(
-        self, 
-        image_data: bytes, 
-        render_type: str = "3d_render",
-        instructions: str = "",
-        user_id: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """Generate 3D render or professional product image"""
-        
-        # Convert image to base64
-        image_base64 = self._encode_image_to_base64(image_data)
-        
-        if render_type == "3d_render":
-            prompt = f"Generate a professional 3D render of this product. Make it look modern, clean, and suitable for e-commerce. {instructions}"
-        else:
-            prompt = f"Generate a professional product photograph of this item. Use professional lighting, clean background, and commercial photography style. {instructions}"
-        
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_base64}}
-                ]
-            }
-        ]
-        
-        result = await self._make_api_call(messages, user_id=user_id)
-        
-        if result and result.get('success'):
-            return {
-                'success': True,
-                'content': result.get('content'),
-                'images': result.get('images', []),
-                'model_used': result.get('model_used'),
-                'processing_time': result.get('processing_time')
-            }
-        
-        return {'success': False, 'error': result.get('error', 'Unknown error')}
-    
-    async def generate_seo_content(
-        self, 
-        product_description: str,
-        target_keywords: List[str] = None,
-        platform: str = "general",
-        user_id: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """Generate SEO-optimized captions and content"""
-        
-        keywords_text = ", ".join(target_keywords) if target_keywords else ""
-        
-        prompt = f"""
-        Create SEO-optimized content for this product: {product_description}
-        
-        Target keywords: {keywords_text}
-        Platform: {platform}
-        
-        Please provide:
-        1. SEO-optimized title (60 characters max)
-        2. Meta description (160 characters max)
-        3. Product description with natural keyword integration
-        4. 5-10 relevant hashtags
-        5. Alt text for images
-        6. Social media captions for different platforms
-        
-        Format the response as JSON with clear sections.
-        """
-        
-        messages = [{"role": "user", "content": prompt}]
-        
-        result = await self._make_api_call(messages, user_id=user_id)
-        
-        if result and result.get('success'):
-            return {
-                'success': True,
-                'content': result.get('content'),
-                'model_used': result.get('model_used'),
-                'processing_time': result.get('processing_time')
-            }
-        
-        return {'success': False, 'error': result.get('error', 'Unknown error')}
-    
-    async def generate_content_plan(
+    async def complete(
         self,
-        product_info: str,
-        target_audience: str,
-        goals: List[str],
-        timeframe: str = "monthly",
-        user_id: Optional[int] = None
+        messages: List[Dict],
+        user_id: Optional[int] = None,
+        json_mode: bool = False,
+        key_slot: Optional[int] = None,
+        **params
     ) -> Dict[str, Any]:
-        """Generate content calendar and plan"""
-        
-        prompt = f"""
-        Create a comprehensive content plan for:
-        
-        Product/Service: {product_info}
-        Target Audience: {target_audience}
-        Goals: {', '.join(goals)}
-        Timeframe: {timeframe}
-        
-        Please provide:
-        1. Content calendar with specific post ideas for each week
-        2. Content types and formats (images, videos, stories, etc.)
-        3. Posting schedule and frequency
-        4. Key themes and messaging
-        5. Seasonal/event-based content opportunities
-        6. Engagement strategies
-        7. Performance metrics to track
-        
-        Format as a detailed JSON structure with dates and specific content ideas.
+        """Run a chat completion with key rotation and model fallback; extra params go to the upstream request.
+
+        key_slot spreads concurrent calls across keys (see APIKeyManager.get_key_for_slot).
         """
-        
-        messages = [{"role": "user", "content": prompt}]
-        
-        result = await self._make_api_call(messages, user_id=user_id)
-        
-        if result and result.get('success'):
-            return {
-                'success': True,
-                'content': result.get('content'),
-                'model_used': result.get('model_used'),
-                'processing_time': result.get('processing_time')
-            }
-        
-        return {'success': False, 'error': result.get('error', 'Unknown error')}
+        return await self._make_api_call(
+            messages, user_id=user_id, params=params, json_mode=json_mode, key_slot=key_slot
+        )
     
-    async def generate_marketing_plan(
-        self,
-        product_info: str,
-        target_audience: str,
-        goal: str,  # outreach, sales, branding
-        budget_range: str,
-        timeline: str,
-        user_id: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """Generate comprehensive marketing plan"""
-        
-        prompt = f"""
-        Create a comprehensive marketing plan for:
-        
-        Product/Service: {product_info}
-        Target Audience: {target_audience}
-        Primary Goal: {goal}
-        Budget Range: {budget_range}
-        Timeline: {timeline}
-        
-        Please provide a detailed marketing strategy including:
-        
-        1. SITUATION ANALYSIS
-           - Market overview
-           - Competitor analysis
-           - SWOT analysis
-        
-        2. MARKETING OBJECTIVES
-           - Specific, measurable goals
-           - KPIs to track
-        
-        3. TARGET AUDIENCE ANALYSIS
-           - Demographics and psychographics
-           - Customer personas
-           - Pain points and motivations
-        
-        4. MARKETING MIX STRATEGY
-           - Product positioning
-           - Pricing strategy
-           - Distribution channels
-           - Promotional tactics
-        
-        5. DIGITAL MARKETING STRATEGY
-           - Social media strategy
-           - Content marketing
-           - SEO/SEM approach
-           - Email marketing
-           - Influencer partnerships
-        
-        6. BUDGET ALLOCATION
-           - Channel-wise budget distribution
-           - Expected ROI
-        
-        7. IMPLEMENTATION TIMELINE
-           - Phase-wise execution plan
-           - Milestones and deadlines
-        
-        8. MEASUREMENT & ANALYTICS
-           - Success metrics
-           - Tracking methods
-           - Reporting schedule
-        
-        Format as a comprehensive JSON structure with actionable recommendations.
-        """
-        
-        messages = [{"role": "user", "content": prompt}]
-        
-        result = await self._make_api_call(messages, user_id=user_id)
-        
-        if result and result.get('success'):
-            return {
-                'success': True,
-                'content': result.get('content'),
-                'model_used': result.get('model_used'),
-                'processing_time': result.get('processing_time')
-            }
-        
-        return {'success': False, 'error': result.get('error', 'Unknown error')}
+    def encode_image(self, image_data: bytes) -> str:
+        """Convert uploaded image bytes to a PNG data URL for the upstream request"""
+        with span("encode_image", bytes_in=len(image_data)):
+            return self._encode_image_to_base64(image_data)
     
     async def _make_api_call(
         self, 
         messages: List[Dict], 
         max_retries: int = 3,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json_mode: bool = False,
+        key_slot: Optional[int] = None
     ) -> Dict[str, Any]:
         """Make API call with automatic key rotation and retry logic - EXACT SAME AS STREAMLIT"""
         
+        import httpx
+        
+        api_key_manager = get_api_key_manager()
         models_to_try = [PRIMARY_MODEL] + BACKUP_MODELS
         start_time = datetime.now()
+        last_error = None
         
-        for model in models_to_try:
+        for index, model in enumerate(models_to_try):
+            if index == 0:
+                publish_upstream_event("model_selected", model=model)
+            else:
+                publish_upstream_event("fallback", model=model, previous_model=models_to_try[index - 1], reason=last_error)
             for attempt in range(max_retries):
-                api_key = api_key_manager.get_current_key()
+                if key_slot is None:
+                    api_key = api_key_manager.get_current_key()
+                else:
+                    api_key = api_key_manager.get_key_for_slot(key_slot)
                 
                 if not api_key:
                     logger.error("No available API keys")
@@ -283,15 +92,30 @@ class AIService:
                     data = {
                         "model": model,
                         "messages": messages,
-                        "max_tokens": 1000
+                        "max_tokens": 1000,
+                        **(params or {})
                     }
+                    if json_mode and model in tuning.JSON_MODE_MODELS:
+                        data["response_format"] = {"type": "json_object"}
                     
-                    async with httpx.AsyncClient(timeout=60.0) as client:
-                        response = await client.post(
-                            self.base_url,
-                            headers=headers,
-                            json=data
-                        )
+                    key_index = str(api_key_manager.get_key_index(api_key))
+                    call_started = time.perf_counter()
+                    call_status = "error"
+                    with span("upstream_call", model=model, key_index=key_index, attempt=attempt + 1) as call_span:
+                        try:
+                            async with httpx.AsyncClient(timeout=tuning.UPSTREAM_TIMEOUT_SECONDS) as client:
+                                response = await client.post(
+                                    self.base_url,
+                                    headers=headers,
+                                    json=data
+                                )
+                            call_status = str(response.status_code)
+                        finally:
+                            UPSTREAM_CALL_DURATION.labels(model, key_index, call_status).observe(
+                                time.perf_counter() - call_started
+                            )
+                            if call_span is not None:
+                                call_span.set_attribute("http.status_code", call_status)
                     
                     # Update key status from response headers
                     api_key_manager.update_key_status(api_key, dict(response.headers))
@@ -304,12 +128,18 @@ class AIService:
                             api_key_manager.mark_key_rate_limited(api_key)
                             
                             # Try next key
+                            UPSTREAM_FALLBACKS.labels("key_rate_limited").inc()
                             next_key = api_key_manager.get_next_key()
                             if not next_key:
                                 return {'success': False, 'error': 'All API keys rate limited'}
+                            last_error = "API key rate limited"
+                            if attempt < max_retries - 1:
+                                publish_upstream_event("retrying", model=model, attempt=attempt + 2, reason=last_error)
                             continue
                         else:
                             # Model-specific rate limit, try next model
+                            UPSTREAM_FALLBACKS.labels("model_rate_limited").inc()
+                            last_error = "Model rate limited"
                             break
                     
                     response.raise_for_status()
@@ -319,24 +149,30 @@ class AIService:
                     processing_time = (datetime.now() - start_time).total_seconds()
                     
                     # Log which model was used (like Streamlit)
-                    model_name = next((name for name, id in FREE_VISION_MODELS.items() if id == model), model)
-                    logger.info(f"✅ Using model: {model_name}")
+                    logger.info(f"✅ Using model: {self._model_display_name(model)}")
+                    
+                    with span("extract_result"):
+                        content = self._extract_content(result)
+                        images = self._extract_images(result)
                     
                     return {
                         'success': True,
-                        'content': self._extract_content(result),
-                        'images': self._extract_images(result),
+                        'content': content,
+                        'images': images,
                         'model_used': model,
                         'api_key_used': api_key[-8:],  # Last 8 chars for logging
-                        'processing_time': processing_time
+                        'processing_time': processing_time,
+                        'usage': result.get('usage')
                     }
                 
                 except httpx.HTTPStatusError as e:
                     logger.error(f"HTTP error with key {api_key[-8:]}: {e}")
                     api_key_manager.mark_key_error(api_key, str(e))
+                    last_error = f"HTTP error: {e}"
                     
                     if attempt == max_retries - 1:
                         # Try next key
+                        UPSTREAM_FALLBACKS.labels("key_http_error").inc()
                         next_key = api_key_manager.get_next_key()
                         if not next_key:
                             return {'success': False, 'error': f'HTTP error: {e}'}
@@ -344,17 +180,30 @@ class AIService:
                 except Exception as e:
                     logger.error(f"Unexpected error with key {api_key[-8:]}: {e}")
                     api_key_manager.mark_key_error(api_key, str(e))
+                    last_error = f"Unexpected error: {e}"
                     
                     if attempt == max_retries - 1:
                         return {'success': False, 'error': f'Unexpected error: {e}'}
                 
+                finally:
+                    record_key_state(api_key_manager)
+                
                 # Wait before retry
-                await asyncio.sleep(1)
+                if attempt < max_retries - 1:
+                    publish_upstream_event("retrying", model=model, attempt=attempt + 2, reason=last_error)
+                with span("retry_backoff"):
+                    await asyncio.sleep(1)
         
         return {'success': False, 'error': 'All models and keys exhausted'}
     
+    def _model_display_name(self, model: str) -> str:
+        """Reverse lookup of the display name for a model id"""
+        return next((name for name, id in FREE_VISION_MODELS.items() if id == model), model)
+    
     def _encode_image_to_base64(self, image_data: bytes) -> str:
         """Convert image bytes to base64 string - EXACT SAME AS STREAMLIT"""
+        from PIL import Image
+        started = time.perf_counter()
         try:
             # Verify it's a valid image
             image = Image.open(io.BytesIO(image_data))
@@ -369,6 +218,8 @@ class AIService:
         except Exception as e:
             logger.error(f"Error encoding image to base64: {e}")
             raise
+        finally:
+            observe_image_processing("encode_base64", started)
     
     def _extract_content(self, result: Dict) -> Optional[str]:
         """Extract text content from API response - EXACT SAME AS STREAMLIT"""
@@ -401,7 +252,6 @@ class AIService:
                 content = message.get('content', '')
                 if content and 'data:image' in content:
                     # Extract base64 image data from content
-                    import re
                     image_pattern = r'data:image/[^;]+;base64,[A-Za-z0-9+/=]+'
                     found_images = re.findall(image_pattern, content)
                     for img_url in found_images:
@@ -415,5 +265,12 @@ class AIService:
             logger.error(f"Result structure: {result}")
         return images
 
-# Global instance
-ai_service = AIService()
\ No newline at end of file
+# Global instance, created on first use
+_ai_service: Optional[AIService] = None
+
+def get_ai_service() -> AIService:
+    """Get the shared AI service"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
\ No newline at end of file
@@ -1,18 +1,16 @@
-import asyncio
 import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-import httpx
-import json
 from ..core.config import settings
+from ..core.tracing import span
 
 logger = logging.getLogger(__name__)
 
 class APIKeyManager:
     """Manages multiple OpenRouter API keys with automatic fallback"""
     
-    def __init__(self):
-        self.api_keys = settings.openrouter_api_keys
+    def __init__(self, api_keys: Optional[List[str]] = None):
+        self.api_keys = settings.openrouter_api_keys if api_keys is None else api_keys
         self.current_key_index = 0
         self.key_status = {}  # Track rate limits and errors for each key
         self.last_check = {}  # Last time we checked each key
@@ -32,12 +30,30 @@ class APIKeyManager:
         if not self.api_keys:
             return None
         
-        # Find the first active key
-        for i in range(len(self.api_keys)):
-            key_index = (self.current_key_index + i) % len(self.api_keys)
-            if self._is_key_available(key_index):
-                self.current_key_index = key_index
-                return self.api_keys[key_index]
+        with span("key_select"):
+            # Find the first active key
+            for i in range(len(self.api_keys)):
+                key_index = (self.current_key_index + i) % len(self.api_keys)
+                if self._is_key_available(key_index):
+                    self.current_key_index = key_index
+                    return self.api_keys[key_index]
+        
+        return None
+    
+    def get_key_for_slot(self, slot: int) -> Optional[str]:
+        """Get the first active key at or after `slot` positions past the current one.
+
+        Concurrent calls for one request pass different slots so they go out on
+        different keys; the current key is left unchanged.
+        """
+        if not self.api_keys:
+            return None
+        
+        with span("key_select"):
+            for i in range(len(self.api_keys)):
+                key_index = (self.current_key_index + slot + i) % len(self.api_keys)
+                if self._is_key_available(key_index):
+                    return self.api_keys[key_index]
         
         return None
     
@@ -86,13 +102,15 @@ class APIKeyManager:
         try:
             key_index = self.api_keys.index(key)
             status = self.key_status[key_index]
+            # Header names are case-insensitive (httpx hands them over lowercased)
+            headers = {name.lower(): value for name, value in headers.items()}
             
             # Update rate limit info from headers
-            if 'X-RateLimit-Remaining' in headers:
-                status['requests_remaining'] = int(headers['X-RateLimit-Remaining'])
+            if 'x-ratelimit-remaining' in headers:
+                status['requests_remaining'] = int(headers['x-ratelimit-remaining'])
             
-            if 'X-RateLimit-Reset' in headers:
-                reset_timestamp = int(headers['X-RateLimit-Reset']) / 1000
+            if 'x-ratelimit-reset' in headers:
+                reset_timestamp = int(headers['x-ratelimit-reset']) / 1000
                 status['rate_limit_reset'] = datetime.fromtimestamp(reset_timestamp)
             
             # Reset error count on successful request
@@ -102,17 +120,25 @@ class APIKeyManager:
         except (ValueError, KeyError) as e:
             logger.error(f"Error updating key status: {e}")
     
+    def get_key_index(self, key: str) -> Optional[int]:
+        """Get the 1-based index of a key, for logging and metrics"""
+        try:
+            return self.api_keys.index(key) + 1
+        except ValueError:
+            return None
+    
     def get_next_key(self) -> Optional[str]:
         """Get the next available API key"""
         original_index = self.current_key_index
         
         # Try next key
-        for i in range(1, len(self.api_keys)):
-            next_index = (self.current_key_index + i) % len(self.api_keys)
-            if self._is_key_available(next_index):
-                self.current_key_index = next_index
-                logger.info(f"Switched to API key {next_index + 1}")
-                return self.api_keys[next_index]
+        with span("key_rotate"):
+            for i in range(1, len(self.api_keys)):
+                next_index = (self.current_key_index + i) % len(self.api_keys)
+                if self._is_key_available(next_index):
+                    self.current_key_index = next_index
+                    logger.info(f"Switched to API key {next_index + 1}")
+                    return self.api_keys[next_index]
         
         return None
     
@@ -148,5 +174,12 @@ class APIKeyManager:
         
         return summary
 
-# Global instance
-api_key_manager = APIKeyManager()
\ No newline at end of file
+# Global instance, created on first use
+_api_key_manager: Optional[APIKeyManager] = None
+
+def get_api_key_manager() -> APIKeyManager:
+    """Get the shared API key manager"""
+    global _api_key_manager
+    if _api_key_manager is None:
+        _api_key_manager = APIKeyManager()
+    return _api_key_manager
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+Per-user stream of generation lifecycle events
+
+run_pipeline and AIService publish events while a generation runs:
+
+    queued          generation row created, upstream work about to start
+    model_selected  first upstream attempt on a model
+    retrying        an attempt failed and is retried (same model, maybe another key)
+    fallback        moving on to the next model, with the reason
+    section         a section of a sectioned generation finished or failed
+                    (upstream events of sectioned generations carry the section too)
+    completed       generation stored (also for reused generations)
+    failed          generation marked failed, with the error
+
+AIService doesn't know which generation it is serving: run_pipeline binds
+the generation to the request context (a ContextVar, as tracing does), and
+upstream events are attributed from there.
+
+Clients subscribe with GET /content/events (server-sent events). Each
+connection gets a bounded queue, and when a client can't keep up the oldest
+events are dropped. Events are not replayed; after reconnecting, clients
+re-read the generations they are waiting for. With EVENTS_BACKEND=postgres
+every event is also sent with NOTIFY and each worker LISTENs, so a client
+connected to one worker sees generations running on any other.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from ..core.tuning import tuning
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "generation_events"
+# NOTIFY payloads are limited to 8000 bytes
+MAX_ERROR_CHARS = 500
+OUTBOX_SIZE = 10_000
+LISTEN_RETRY_SECONDS = 5.0
+
+_current_generation: ContextVar[Optional[Tuple[int, int, Dict[str, Any]]]] = ContextVar("current_generation", default=None)
+
+
+@contextmanager
+def generation_context(user_id: int, generation_id: int, **attrs):
+    """Attribute upstream events published inside the block to this generation, with attrs added to each"""
+    token = _current_generation.set((user_id, generation_id, attrs))
+    try:
+        yield
+    finally:
+        _current_generation.reset(token)
+
+
+def publish_event(event: str, user_id: int, generation_id: int, **data):
+    """Send a lifecycle event to the user's subscribers; call from the event loop"""
+    if isinstance(data.get('error'), str):
+        data['error'] = data['error'][:MAX_ERROR_CHARS]
+    get_event_broker().publish(user_id, {
+        'event': event,
+        'generation_id': generation_id,
+        **data,
+        'at': datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def publish_upstream_event(event: str, **data):
+    """Event for the generation bound to the current context; a no-op outside one"""
+    current = _current_generation.get()
+    if current is not None:
+        user_id, generation_id, attrs = current
+        publish_event(event, user_id, generation_id, **attrs, **data)
+
+
+class EventBroker:
+    """In-process fan-out of events to per-user subscriber queues, optionally bridged over Postgres NOTIFY"""
+
+    def __init__(self, backend: str, queue_size: int):
+        self.backend = backend
+        self.queue_size = max(1, queue_size)
+        self.origin = uuid.uuid4().hex  # Skips this worker's own notifications
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """A new queue receiving the user's events"""
+        if self.backend == "postgres" and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: Dict[str, Any]):
+        self.published += 1
+        self._deliver(user_id, event)
+        if self.backend != "postgres":
+            return
+        if self._sender is None or self._sender.done():
+            self._outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+            self._sender = asyncio.get_running_loop().create_task(self._send())
+        try:
+            self._outbox.put_nowait(json.dumps({'origin': self.origin, 'user_id': user_id, 'event': event}, default=str))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _deliver(self, user_id: int, event: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # Slow client: drop its oldest event
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    async def _send(self):
+        """NOTIFY queued events, everything waiting at that moment in one transaction"""
+        from sqlalchemy import text
+        from ..core.database import get_async_engine
+
+        statement = text("SELECT pg_notify(:channel, :payload)")
+        while True:
+            payloads = [await self._outbox.get()]
+            while not self._outbox.empty():
+                payloads.append(self._outbox.get_nowait())
+            try:
+                async with get_async_engine().connect() as connection:
+                    for payload in payloads:
+                        await connection.execute(statement, {'channel': CHANNEL, 'payload': payload})
+                    await connection.commit()
+            except Exception as e:
+                self.dropped += len(payloads)
+                logger.error(f"Could not publish {len(payloads)} generation events: {e}")
+
+    async def _listen(self):
+        """Hold a LISTEN connection for the process, reconnecting after failures"""
+        from ..core.database import get_async_engine
+
+        while True:
+            try:
+                async with get_async_engine().connect() as connection:
+                    raw = (await connection.get_raw_connection()).driver_connection
+                    lost = asyncio.Event()
+                    raw.add_termination_listener(lambda _: lost.set())
+                    await raw.add_listener(CHANNEL, self._on_notify)
+                    logger.info(f"Listening for generation events on {CHANNEL}")
+                    try:
+                        await lost.wait()
+                    finally:
+                        # Never hand a LISTENing connection back to the pool
+                        await connection.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Generation event listener failed: {e}")
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get('origin') != self.origin:
+            self._deliver(message['user_id'], message['event'])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get broker metrics (this worker)"""
+        return {
+            'backend': self.backend,
+            'users': len(self._subscribers),
+            'subscribers': sum(len(queues) for queues in self._subscribers.values()),
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'listening': self._listener is not None and not self._listener.done(),
+        }
+
+    async def close(self):
+        """Stop the sender and listener tasks"""
+        for task in (self._sender, self._listener):
+            if task is not None:
+                task.cancel()
+        self._sender = self._listener = None
+
+
+async def event_stream(user_id: int) -> AsyncIterator[str]:
+    """Server-sent events for one client, with comment lines as keepalive"""
+    broker = get_event_broker()
+    queue = broker.subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=tuning.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+# Global instance, created on first use
+_event_broker: Optional[EventBroker] = None
+
+def get_event_broker() -> EventBroker:
+    """Get the shared event broker"""
+    global _event_broker
+    if _event_broker is None:
+        _event_broker = EventBroker(backend=tuning.EVENTS_BACKEND, queue_size=tuning.EVENTS_QUEUE_SIZE)
+    return _event_broker
+
+async def close_event_broker():
+    """Stop background tasks on shutdown"""
+    if _event_broker is not None:
+        await _event_broker.close()
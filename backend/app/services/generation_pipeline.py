@@ -0,0 +1,703 @@
+"""
+Declarative content generation pipelines
+
+Each content type registers a PipelineSpec: how to build the upstream
+messages from the request inputs, which upstream parameters to send, how to
+map the AI result onto the generation row, and which prompt/parameters to
+store, plus the content type's token budget (overridable per pipeline with
+GENERATION_TOKEN_BUDGETS) and whether it asks for JSON output.
+run_pipeline() applies the shared lifecycle once for all of them:
+quota, generation row, prompt building, upstream call, persistence, quota
+refund on failure, and timing.
+
+A spec with `sections` is generated as one upstream call per section, run
+concurrently on different API keys with a retry per section. The merged
+document is saved as sections finish and the generation completes once
+every section has either succeeded or run out of attempts.
+
+Pipelines marked `reusable` can answer a near-duplicate prompt with the
+user's previous generation instead of calling upstream (see
+similarity_cache; opt-in with SIMILARITY_CACHE_ENABLED). A reused generation
+gets its own row with `reused_from` in its metadata and uses no quota; its
+structured rows (store_result) are only written when it lands in another
+project than the generation it reuses.
+
+A spec's `store_result` runs after completion to write the parsed result
+into its structured tables; a failure there is logged and does not fail
+the generation.
+"""
+import asyncio
+import json
+import logging
+import textwrap
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.metrics import GENERATION_DURATION, SIMILARITY_LOOKUPS
+from ..core.tracing import span
+from ..core.tuning import tuning
+from ..models.content import ContentGeneration, ContentType, GenerationStatus
+from ..models.user import User
+from .ai_service import get_ai_service
+from .generation_events import generation_context, publish_event
+from .generation_repository import GenerationRecord, GenerationRepository
+from .project_cleanup import not_in_deleted_project
+from .quota_service import consume_generation_quota, refund_generation_quota
+from .result_parser import parse_json_result
+from .similarity_cache import get_similarity_cache
+from .structured_results import store_marketing_plan, store_seo_analysis, store_tags
+
+logger = logging.getLogger(__name__)
+
+Inputs = Dict[str, Any]
+
+
+class GenerationFailedError(Exception):
+    """Raised when a generation could not be completed; the generation row is marked failed"""
+
+    def __init__(self, generation_id: int, error: Optional[str]):
+        self.generation_id = generation_id
+        self.error = error
+        super().__init__(error or "Generation failed")
+
+
+def text_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an AI result for text content onto generation fields"""
+    return {
+        'content': result.get('content'),
+        'model_used': result.get('model_used'),
+        'processing_time': int(result.get('processing_time', 0)),
+        'metadata': {"api_key_used": result.get('api_key_used')},
+        'usage': result.get('usage'),
+    }
+
+
+def image_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an AI result for image content onto generation fields"""
+    fields = text_result(result)
+    fields['metadata'] = {"images": result.get('images', []), **fields['metadata']}
+    return fields
+
+
+def sectioned_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a merged sectioned result onto generation fields"""
+    fields = text_result(result)
+    fields['metadata'] = {**fields['metadata'], "sections": result.get('sections', {})}
+    return fields
+
+
+@dataclass(frozen=True)
+class PipelineSpec:
+    """How one content type is generated and stored"""
+    name: str
+    content_type: Callable[[Inputs], ContentType]
+    build_messages: Callable[[Inputs], List[Dict[str, Any]]]
+    stored_prompt: Callable[[Inputs], Optional[str]]
+    stored_parameters: Callable[[Inputs], Dict[str, Any]]
+    post_process: Callable[[Dict[str, Any]], Dict[str, Any]] = text_result
+    # Upper bound on completion tokens; sized to what the content type actually needs
+    max_tokens: int = 1000
+    # Ask for a JSON object response on models that support response_format
+    json_output: bool = False
+    upstream_params: Dict[str, Any] = field(default_factory=dict)
+    # Generate these sections concurrently; build_messages gets inputs['section']
+    # and max_tokens applies to each section call
+    sections: Tuple[str, ...] = ()
+    # Write the parsed result to structured tables once the generation completed
+    store_result: Optional[Callable[[Session, GenerationRecord, Inputs], None]] = None
+    # Output depends only on the stored prompt and parameters, so near-duplicates may be reused
+    reusable: bool = False
+    # Build messages on a worker thread (CPU-heavy builders such as image encoding)
+    offload_build: bool = False
+
+
+_pipelines: Dict[str, PipelineSpec] = {}
+
+def register_pipeline(spec: PipelineSpec) -> PipelineSpec:
+    """Register a content type's pipeline under its name"""
+    if spec.name in _pipelines:
+        raise ValueError(f"Pipeline '{spec.name}' is already registered")
+    _pipelines[spec.name] = spec
+    return spec
+
+def get_pipeline(name: str) -> PipelineSpec:
+    """Get a registered pipeline"""
+    return _pipelines[name]
+
+def list_pipelines() -> List[str]:
+    """Names of all registered pipelines"""
+    return list(_pipelines)
+
+
+async def run_pipeline(
+    name: str,
+    inputs: Inputs,
+    user: User,
+    db: Session,
+    project_id: Optional[int] = None,
+    allow_reuse: bool = True
+) -> GenerationRecord:
+    """Run a generation end to end and return the completed generation.
+
+    Raises QuotaExceededError before anything is written when the user is out
+    of quota, and GenerationFailedError (after marking the row failed and
+    refunding the quota) when the generation did not succeed.
+    """
+    spec = get_pipeline(name)
+    started = time.perf_counter()
+    status = "failed"
+    reuse = spec.reusable and allow_reuse and tuning.SIMILARITY_CACHE_ENABLED
+    if reuse:
+        reused = await _reuse_similar(spec, inputs, user, db, project_id)
+        if reused is not None:
+            GENERATION_DURATION.labels(name, "reused").observe(time.perf_counter() - started)
+            return reused
+    charged_at = datetime.now(timezone.utc)
+    consume_generation_quota(db, user, now=charged_at)
+
+    repository = GenerationRepository(db)
+    try:
+        with span("db_insert"):
+            generation = repository.create(
+                user_id=user.id,
+                project_id=project_id,
+                content_type=spec.content_type(inputs),
+                prompt=spec.stored_prompt(inputs),
+                parameters=spec.stored_parameters(inputs)
+            )
+        publish_event("queued", user.id, generation.id, content_type=generation.content_type.value, project_id=project_id)
+
+        # Upstream events (model choice, retries, fallbacks) are attributed to this generation
+        with generation_context(user.id, generation.id):
+            try:
+                if spec.sections:
+                    result = await _run_sections(spec, inputs, user.id, repository, generation)
+                else:
+                    messages = await _build_messages(spec, inputs)
+                    with span("ai_call"):
+                        result = await _call_upstream(spec, messages, user.id)
+
+                if result.get('success'):
+                    with span("db_update"):
+                        await repository.complete(generation, **spec.post_process(result))
+                    status = "completed"
+                    publish_event("completed", user.id, generation.id, model_used=generation.model_used,
+                                  processing_time=generation.processing_time)
+                    if spec.store_result is not None:
+                        _store_result(spec, db, generation, inputs)
+                    if reuse and generation.prompt:
+                        get_similarity_cache().add(user.id, name, generation.id, generation.prompt, generation.parameters)
+                    return generation
+                error = result.get('error', 'Unknown error')
+
+            except Exception as e:
+                logger.error(f"Error in {name} pipeline for generation {generation.id}: {e}")
+                error = str(e)
+
+        with span("db_update"):
+            await repository.fail(generation, error)
+        publish_event("failed", user.id, generation.id, error=error)
+        refund_generation_quota(db, user.id, charged_at)
+        raise GenerationFailedError(generation.id, error)
+
+    except GenerationFailedError:
+        raise
+    except Exception:
+        # The generation row could not be written; give the quota back
+        refund_generation_quota(db, user.id, charged_at)
+        raise
+    finally:
+        GENERATION_DURATION.labels(name, status).observe(time.perf_counter() - started)
+
+
+async def _reuse_similar(
+    spec: PipelineSpec,
+    inputs: Inputs,
+    user: User,
+    db: Session,
+    project_id: Optional[int]
+) -> Optional[GenerationRecord]:
+    """Answer with a copy of the user's closest previous generation, if it is similar enough"""
+    prompt = spec.stored_prompt(inputs)
+    if not prompt:
+        return None
+    content_type = spec.content_type(inputs)
+    parameters = spec.stored_parameters(inputs)
+    with span("similarity_lookup"):
+        match = await get_similarity_cache().lookup(user.id, spec.name, content_type, prompt, parameters)
+    source = None
+    if match is not None:
+        source = db.query(ContentGeneration).filter(
+            ContentGeneration.id == match[0],
+            ContentGeneration.user_id == user.id,
+            ContentGeneration.status == GenerationStatus.COMPLETED,
+            not_in_deleted_project()
+        ).first()
+    SIMILARITY_LOOKUPS.labels(spec.name, "hit" if source is not None else "miss").inc()
+    if source is None:
+        return None
+
+    repository = GenerationRepository(db)
+    with span("db_insert"):
+        generation = repository.create(
+            user_id=user.id,
+            project_id=project_id,
+            content_type=content_type,
+            prompt=prompt,
+            parameters=parameters
+        )
+    with span("db_update"):
+        await repository.complete(
+            generation,
+            content=source.generated_content,
+            model_used=source.model_used,
+            processing_time=0,
+            metadata={**(source.generation_metadata or {}), "reused_from": source.id, "similarity": round(match[1], 4)}
+        )
+    logger.info(f"Generation {generation.id} reused generation {source.id} (similarity {match[1]:.3f})")
+    publish_event("completed", user.id, generation.id, model_used=generation.model_used, processing_time=0, reused_from=source.id)
+    # Within the same project the source's structured rows already cover it; storing again would duplicate them
+    if spec.store_result is not None and project_id != source.project_id:
+        _store_result(spec, db, generation, inputs)
+    get_similarity_cache().add(user.id, spec.name, generation.id, prompt, parameters)
+    return generation
+
+
+def _store_result(spec: PipelineSpec, db: Session, generation: GenerationRecord, inputs: Inputs):
+    with span("store_result"):
+        try:
+            spec.store_result(db, generation, inputs)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing structured result of generation {generation.id}: {e}")
+
+
+async def _build_messages(spec: PipelineSpec, inputs: Inputs) -> List[Dict[str, Any]]:
+    with span("build_prompt"):
+        if spec.offload_build:
+            # to_thread carries the request context, so spans inside the builder are kept
+            return await asyncio.to_thread(spec.build_messages, inputs)
+        return spec.build_messages(inputs)
+
+
+async def _call_upstream(
+    spec: PipelineSpec,
+    messages: List[Dict[str, Any]],
+    user_id: int,
+    key_slot: Optional[int] = None
+) -> Dict[str, Any]:
+    return await get_ai_service().complete(
+        messages,
+        user_id=user_id,
+        json_mode=spec.json_output,
+        key_slot=key_slot,
+        max_tokens=tuning.GENERATION_TOKEN_BUDGETS.get(spec.name, spec.max_tokens),
+        **spec.upstream_params
+    )
+
+
+def _section_value(content: Optional[str]) -> Any:
+    """A section's JSON value, or its raw text when no JSON can be recovered"""
+    value = parse_json_result(content)
+    return (content or "").strip() if value is None else value
+
+
+def _merge_sections(spec: PipelineSpec, results: Dict[str, Dict[str, Any]]) -> str:
+    """One JSON document with the finished sections in spec order"""
+    document = {
+        section: _section_value(results[section].get('content'))
+        for section in spec.sections
+        if results.get(section, {}).get('success')
+    }
+    return json.dumps(document, indent=2, ensure_ascii=False)
+
+
+def _sum_usage(results: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    usages = [result['usage'] for result in results if result.get('usage')]
+    if not usages:
+        return None
+    return {
+        name: sum(usage.get(name) or 0 for usage in usages)
+        for name in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+    }
+
+
+async def _run_sections(
+    spec: PipelineSpec,
+    inputs: Inputs,
+    user_id: int,
+    repository: GenerationRepository,
+    generation: GenerationRecord
+) -> Dict[str, Any]:
+    """Generate every section concurrently and merge them into one result"""
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, tuning.SECTION_CONCURRENCY))
+    results: Dict[str, Dict[str, Any]] = {}
+    sections: Dict[str, Dict[str, Any]] = {}
+
+    async def run_section(slot: int, section: str):
+        async with semaphore:
+            with span("section", section=section), generation_context(user_id, generation.id, section=section):
+                section_started = time.perf_counter()
+                messages = await _build_messages(spec, {**inputs, 'section': section})
+                attempts = 0
+                for attempt in range(1 + max(0, tuning.SECTION_RETRIES)):
+                    attempts += 1
+                    with span("ai_call", attempt=attempt + 1):
+                        # Each attempt starts on a different key
+                        result = await _call_upstream(spec, messages, user_id, key_slot=slot + attempt)
+                    if result.get('success'):
+                        break
+                    logger.warning(f"Section {section} of generation {generation.id} failed (attempt {attempts}): {result.get('error')}")
+
+        results[section] = result
+        sections[section] = {
+            "status": "completed" if result.get('success') else "failed",
+            "attempts": attempts,
+            "model_used": result.get('model_used'),
+            "processing_time": round(time.perf_counter() - section_started, 3),
+        }
+        if not result.get('success'):
+            sections[section]["error"] = result.get('error')
+        publish_event("section", user_id, generation.id, section=section, **sections[section])
+        if not result.get('success'):
+            return
+        # Persist what is done so far; the row stays in processing until all sections finish
+        with span("db_update"):
+            await repository.save_progress(generation, _merge_sections(spec, results), {"sections": sections})
+
+    tasks = [asyncio.create_task(run_section(slot, section)) for slot, section in enumerate(spec.sections)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # The caller marks the row failed next; no section may save progress after that
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    succeeded = [results[section] for section in spec.sections if results[section].get('success')]
+    if not succeeded:
+        errors = {section: results[section].get('error') for section in spec.sections}
+        return {'success': False, 'error': f"All sections failed: {errors}"}
+
+    models = list(dict.fromkeys(result['model_used'] for result in succeeded))
+    keys = list(dict.fromkeys(result['api_key_used'] for result in succeeded))
+    return {
+        'success': True,
+        'content': _merge_sections(spec, results),
+        'model_used': ", ".join(models),
+        'api_key_used': ", ".join(keys),
+        'processing_time': time.perf_counter() - started,
+        'usage': _sum_usage(succeeded),
+        'sections': {section: sections[section] for section in spec.sections},
+    }
+
+
+# Pipelines
+
+def _text_to_image_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    # Use EXACT same prompt format as working Streamlit app
+    full_prompt = f"Generate an image: {inputs['prompt']}. Style: {inputs['style']}. Aspect ratio: {inputs['aspect_ratio']}."
+    return [{"role": "user", "content": full_prompt}]
+
+register_pipeline(PipelineSpec(
+    name="text_to_image",
+    content_type=lambda inputs: ContentType.TEXT_TO_IMAGE,
+    build_messages=_text_to_image_messages,
+    stored_prompt=lambda inputs: inputs['prompt'],
+    stored_parameters=lambda inputs: {
+        "style": inputs['style'],
+        "aspect_ratio": inputs['aspect_ratio']
+    },
+    post_process=image_result,
+    max_tokens=400,
+    reusable=True,
+))
+
+
+def _product_render_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    image_base64 = get_ai_service().encode_image(inputs['image_data'])
+
+    if inputs['render_type'] == "3d_render":
+        prompt = f"Generate a professional 3D render of this product. Make it look modern, clean, and suitable for e-commerce. {inputs['instructions']}"
+    else:
+        prompt = f"Generate a professional product photograph of this item. Use professional lighting, clean background, and commercial photography style. {inputs['instructions']}"
+
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_base64}}
+            ]
+        }
+    ]
+
+register_pipeline(PipelineSpec(
+    name="product_render",
+    content_type=lambda inputs: (
+        ContentType.PRODUCT_3D_RENDER if inputs['render_type'] == "3d_render" else ContentType.PROFESSIONAL_PRODUCT
+    ),
+    build_messages=_product_render_messages,
+    stored_prompt=lambda inputs: inputs['instructions'],
+    stored_parameters=lambda inputs: {
+        "render_type": inputs['render_type'],
+        "original_filename": inputs['original_filename']
+    },
+    post_process=image_result,
+    offload_build=True,
+    max_tokens=400,
+))
+
+
+SEO_CONTENT_PROMPT = textwrap.dedent("""
+    Create SEO-optimized content for this product: {product_description}
+
+    Target keywords: {keywords}
+    Platform: {platform}
+
+    Please provide:
+    1. SEO-optimized title (60 characters max)
+    2. Meta description (160 characters max)
+    3. Product description with natural keyword integration
+    4. 5-10 relevant hashtags
+    5. Alt text for images
+    6. Social media captions for different platforms
+
+    Format the response as JSON with clear sections.
+    """).strip()
+
+def _seo_content_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    keywords_text = ", ".join(inputs['target_keywords']) if inputs['target_keywords'] else ""
+
+    prompt = SEO_CONTENT_PROMPT.format(
+        product_description=inputs['product_description'],
+        keywords=keywords_text,
+        platform=inputs['platform']
+    )
+    return [{"role": "user", "content": prompt}]
+
+register_pipeline(PipelineSpec(
+    name="seo_content",
+    content_type=lambda inputs: ContentType.SEO_CAPTION,
+    build_messages=_seo_content_messages,
+    stored_prompt=lambda inputs: inputs['product_description'],
+    stored_parameters=lambda inputs: {
+        "target_keywords": inputs['target_keywords'],
+        "platform": inputs['platform']
+    },
+    max_tokens=800,
+    json_output=True,
+    store_result=store_seo_analysis,
+    reusable=True,
+))
+
+
+CONTENT_PLAN_PROMPT = textwrap.dedent("""
+    Create a comprehensive content plan for:
+
+    Product/Service: {product_info}
+    Target Audience: {target_audience}
+    Goals: {goals}
+    Timeframe: {timeframe}
+
+    Please provide:
+    1. Content calendar with specific post ideas for each week
+    2. Content types and formats (images, videos, stories, etc.)
+    3. Posting schedule and frequency
+    4. Key themes and messaging
+    5. Seasonal/event-based content opportunities
+    6. Engagement strategies
+    7. Performance metrics to track
+
+    Format as a detailed JSON structure with dates and specific content ideas.
+    """).strip()
+
+def _content_plan_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    prompt = CONTENT_PLAN_PROMPT.format(
+        product_info=inputs['product_info'],
+        target_audience=inputs['target_audience'],
+        goals=', '.join(inputs['goals']),
+        timeframe=inputs['timeframe']
+    )
+    return [{"role": "user", "content": prompt}]
+
+register_pipeline(PipelineSpec(
+    name="content_plan",
+    content_type=lambda inputs: ContentType.CONTENT_PLAN,
+    build_messages=_content_plan_messages,
+    stored_prompt=lambda inputs: inputs['product_info'],
+    stored_parameters=lambda inputs: {
+        "target_audience": inputs['target_audience'],
+        "goals": inputs['goals'],
+        "timeframe": inputs['timeframe']
+    },
+    max_tokens=2000,
+    json_output=True,
+    store_result=store_tags,
+    reusable=True,
+))
+
+
+MARKETING_PLAN_PROMPT = textwrap.dedent("""
+    Create a comprehensive marketing plan for:
+
+    Product/Service: {product_info}
+    Target Audience: {target_audience}
+    Primary Goal: {goal}
+    Budget Range: {budget_range}
+    Timeline: {timeline}
+
+    Please provide a detailed marketing strategy including:
+
+    1. SITUATION ANALYSIS
+       - Market overview
+       - Competitor analysis
+       - SWOT analysis
+
+    2. MARKETING OBJECTIVES
+       - Specific, measurable goals
+       - KPIs to track
+
+    3. TARGET AUDIENCE ANALYSIS
+       - Demographics and psychographics
+       - Customer personas
+       - Pain points and motivations
+
+    4. MARKETING MIX STRATEGY
+       - Product positioning
+       - Pricing strategy
+       - Distribution channels
+       - Promotional tactics
+
+    5. DIGITAL MARKETING STRATEGY
+       - Social media strategy
+       - Content marketing
+       - SEO/SEM approach
+       - Email marketing
+       - Influencer partnerships
+
+    6. BUDGET ALLOCATION
+       - Channel-wise budget distribution
+       - Expected ROI
+
+    7. IMPLEMENTATION TIMELINE
+       - Phase-wise execution plan
+       - Milestones and deadlines
+
+    8. MEASUREMENT & ANALYTICS
+       - Success metrics
+       - Tracking methods
+       - Reporting schedule
+
+    Format as a comprehensive JSON structure with actionable recommendations.
+    """).strip()
+
+def _marketing_plan_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    prompt = MARKETING_PLAN_PROMPT.format(
+        product_info=inputs['product_info'],
+        target_audience=inputs['target_audience'],
+        goal=inputs['goal'],
+        budget_range=inputs['budget_range'],
+        timeline=inputs['timeline']
+    )
+    return [{"role": "user", "content": prompt}]
+
+register_pipeline(PipelineSpec(
+    name="marketing_plan",
+    content_type=lambda inputs: ContentType.MARKETING_PLAN,
+    build_messages=_marketing_plan_messages,
+    stored_prompt=lambda inputs: inputs['product_info'],
+    stored_parameters=lambda inputs: {
+        "target_audience": inputs['target_audience'],
+        "goal": inputs['goal'],
+        "budget_range": inputs['budget_range'],
+        "timeline": inputs['timeline']
+    },
+    max_tokens=3000,
+    json_output=True,
+    store_result=store_marketing_plan,
+    reusable=True,
+))
+
+
+MARKETING_PLAN_SECTIONS: Dict[str, Tuple[str, List[str]]] = {
+    "situation_analysis": ("Situation Analysis", [
+        "Market overview", "Competitor analysis", "SWOT analysis"
+    ]),
+    "marketing_objectives": ("Marketing Objectives", [
+        "Specific, measurable goals", "KPIs to track"
+    ]),
+    "target_audience_analysis": ("Target Audience Analysis", [
+        "Demographics and psychographics", "Customer personas", "Pain points and motivations"
+    ]),
+    "marketing_mix_strategy": ("Marketing Mix Strategy", [
+        "Product positioning", "Pricing strategy", "Distribution channels", "Promotional tactics"
+    ]),
+    "digital_marketing_strategy": ("Digital Marketing Strategy", [
+        "Social media strategy", "Content marketing", "SEO/SEM approach", "Email marketing",
+        "Influencer partnerships"
+    ]),
+    "budget_allocation": ("Budget Allocation", [
+        "Channel-wise budget distribution", "Expected ROI"
+    ]),
+    "implementation_timeline": ("Implementation Timeline", [
+        "Phase-wise execution plan", "Milestones and deadlines"
+    ]),
+    "measurement_analytics": ("Measurement & Analytics", [
+        "Success metrics", "Tracking methods", "Reporting schedule"
+    ]),
+}
+
+MARKETING_PLAN_SECTION_PROMPT = textwrap.dedent("""
+    Write the {title} section of a marketing plan for:
+
+    Product/Service: {product_info}
+    Target Audience: {target_audience}
+    Primary Goal: {goal}
+    Budget Range: {budget_range}
+    Timeline: {timeline}
+
+    Cover:
+    {topics}
+
+    Format the section as a JSON object with actionable recommendations.
+    """).strip()
+
+def _marketing_plan_section_messages(inputs: Inputs) -> List[Dict[str, Any]]:
+    title, topics = MARKETING_PLAN_SECTIONS[inputs['section']]
+    prompt = MARKETING_PLAN_SECTION_PROMPT.format(
+        title=title.upper(),
+        product_info=inputs['product_info'],
+        target_audience=inputs['target_audience'],
+        goal=inputs['goal'],
+        budget_range=inputs['budget_range'],
+        timeline=inputs['timeline'],
+        topics="\n".join(f"- {topic}" for topic in topics)
+    )
+    return [{"role": "user", "content": prompt}]
+
+register_pipeline(PipelineSpec(
+    name="marketing_plan_sectioned",
+    content_type=lambda inputs: ContentType.MARKETING_PLAN,
+    build_messages=_marketing_plan_section_messages,
+    stored_prompt=lambda inputs: inputs['product_info'],
+    stored_parameters=lambda inputs: {
+        "target_audience": inputs['target_audience'],
+        "goal": inputs['goal'],
+        "budget_range": inputs['budget_range'],
+        "timeline": inputs['timeline'],
+        "sectioned": True
+    },
+    post_process=sectioned_result,
+    max_tokens=700,
+    json_output=True,
+    sections=tuple(MARKETING_PLAN_SECTIONS),
+    store_result=store_marketing_plan,
+    reusable=True,
+))
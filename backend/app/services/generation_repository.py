@@ -0,0 +1,255 @@
+"""
+Persistence for the content generation lifecycle
+
+Creating a generation is one INSERT ... RETURNING (id and the server-side
+created_at come back with the insert) and every status transition is one
+UPDATE, so no refresh round trips are needed. With GENERATION_WRITE_BEHIND
+enabled, transitions from concurrent requests are queued and written in
+grouped executemany UPDATEs at most GENERATION_FLUSH_INTERVAL_MS later.
+Batches are written one at a time, in the order they were taken.
+
+The generation returned to the client is the in-memory record, so a GET of
+that generation right after the response may still read `processing` from
+the database until its batch is flushed.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..core.database import open_session
+from ..core.tuning import tuning
+from ..models.content import ContentGeneration, ContentType, GenerationStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationRecord:
+    """In-memory view of a generation row, kept in sync with the writes made through the repository"""
+    id: int
+    user_id: int
+    project_id: Optional[int]
+    content_type: ContentType
+    status: GenerationStatus
+    prompt: Optional[str]
+    parameters: Optional[Dict[str, Any]]
+    created_at: datetime
+    started_at: Optional[datetime]
+    generated_content: Optional[str] = None
+    generated_image_path: Optional[str] = None
+    generation_metadata: Optional[Dict[str, Any]] = None
+    model_used: Optional[str] = None
+    processing_time: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    completed_at: Optional[datetime] = None
+
+
+class GenerationRepository:
+    """Lifecycle writes for content generations, one statement each"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(
+        self,
+        user_id: int,
+        content_type: ContentType,
+        prompt: Optional[str],
+        parameters: Optional[Dict[str, Any]],
+        project_id: Optional[int] = None,
+        status: GenerationStatus = GenerationStatus.PROCESSING
+    ) -> GenerationRecord:
+        """Insert a generation and return it without a follow-up SELECT"""
+        values = {
+            'user_id': user_id,
+            'project_id': project_id,
+            'content_type': content_type,
+            'status': status,
+            'prompt': prompt,
+            'parameters': parameters,
+            'started_at': datetime.utcnow(),
+        }
+        row = self.db.execute(
+            insert(ContentGeneration)
+            .values(**values)
+            .returning(ContentGeneration.id, ContentGeneration.created_at)
+        ).one()
+        self.db.commit()
+        return GenerationRecord(id=row.id, created_at=row.created_at, **values)
+
+    async def complete(
+        self,
+        record: GenerationRecord,
+        content: Optional[str],
+        model_used: Optional[str],
+        processing_time: Optional[int],
+        metadata: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None
+    ):
+        """Mark a generation completed with its results and token usage"""
+        usage = usage or {}
+        await self._transition(record, {
+            'status': GenerationStatus.COMPLETED,
+            'generated_content': content,
+            'model_used': model_used,
+            'processing_time': processing_time,
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'total_tokens': usage.get('total_tokens'),
+            'completed_at': datetime.utcnow(),
+            'generation_metadata': metadata,
+        })
+
+    async def save_progress(
+        self,
+        record: GenerationRecord,
+        content: Optional[str],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Store a partial result while the generation is still processing"""
+        await self._transition(record, {
+            'generated_content': content,
+            'generation_metadata': metadata,
+        })
+
+    async def fail(self, record: GenerationRecord, error: Optional[str]):
+        """Mark a generation failed"""
+        await self._transition(record, {
+            'status': GenerationStatus.FAILED,
+            'generation_metadata': {"error": error},
+        })
+
+    async def _transition(self, record: GenerationRecord, values: Dict[str, Any]):
+        for key, value in values.items():
+            setattr(record, key, value)
+        if tuning.GENERATION_WRITE_BEHIND:
+            await get_generation_write_queue().enqueue(record.id, values)
+            return
+        self.db.execute(
+            update(ContentGeneration)
+            .where(ContentGeneration.id == record.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+
+class GenerationWriteQueue:
+    """Write-behind queue that groups generation updates into batched UPDATEs.
+
+    Updates are flushed when the batch is full or when the oldest pending one
+    has waited flush_interval seconds, whichever comes first. Later updates to
+    the same generation are merged into the pending one.
+    """
+
+    def __init__(self, flush_interval: float, max_batch: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # A newer batch must not commit before an older one holding the same generation
+        self._write_lock = asyncio.Lock()
+
+        self.batches = 0
+        self.rows_written = 0
+        self.failed_rows = 0
+
+    async def enqueue(self, generation_id: int, values: Dict[str, Any]):
+        """Queue an update; returns immediately unless the batch is full"""
+        self._ensure_started()
+        self._pending.setdefault(generation_id, {}).update(values)
+        if len(self._pending) == 1:
+            # First item of a new batch starts the flush timer
+            self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write everything pending now"""
+        if not self._pending:
+            return
+        batch = [{'id': generation_id, **values} for generation_id, values in self._pending.items()]
+        self._pending = {}
+        # The lock is FIFO, so batches are written in the order they were taken
+        async with self._write_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        db = open_session()
+        try:
+            # ORM bulk UPDATE by primary key: executemany, grouped by column set
+            db.execute(update(ContentGeneration), batch)
+            db.commit()
+            self.batches += 1
+            self.rows_written += len(batch)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Batched generation update of {len(batch)} rows failed, retrying one by one: {e}")
+            for row in batch:
+                try:
+                    db.execute(update(ContentGeneration), [row])
+                    db.commit()
+                    self.rows_written += 1
+                except Exception as row_error:
+                    db.rollback()
+                    self.failed_rows += 1
+                    logger.error(f"Error writing generation {row['id']}: {row_error}")
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue metrics"""
+        return {
+            'enabled': tuning.GENERATION_WRITE_BEHIND,
+            'pending': len(self._pending),
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'failed_rows': self.failed_rows,
+            'avg_batch_size': round(self.rows_written / self.batches, 2) if self.batches else 0,
+        }
+
+    async def close(self):
+        """Flush pending updates and stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance, created on first use
+_generation_write_queue: Optional[GenerationWriteQueue] = None
+
+def get_generation_write_queue() -> GenerationWriteQueue:
+    """Get the shared write-behind queue"""
+    global _generation_write_queue
+    if _generation_write_queue is None:
+        _generation_write_queue = GenerationWriteQueue(
+            flush_interval=tuning.GENERATION_FLUSH_INTERVAL_MS / 1000,
+            max_batch=tuning.GENERATION_FLUSH_MAX_BATCH,
+        )
+    return _generation_write_queue
+
+async def close_generation_write_queue():
+    """Flush the write-behind queue on shutdown"""
+    if _generation_write_queue is not None:
+        await _generation_write_queue.close()
@@ -0,0 +1,501 @@
+"""
+Bulk product image import from a ZIP archive or a set of uploaded files
+
+The request only stages the upload: Starlette has already spooled it to a
+temporary file, which is copied in chunks to a private staging directory
+(outside the served uploads directory). Nothing is held in memory. The
+import itself runs as a background job. Archive members are extracted one
+at a time with a size cap (protecting against zip bombs), and each file's
+dimensions and thumbnail are computed on a worker pool. Finally all
+ProductImage rows are written with a single INSERT in one transaction.
+
+Multi-file uploads (POST /projects/{id}/images/batch) are handled inline
+with the same pieces: `save_uploads` streams every file to the project
+directory and inspects it on the worker pool, `insert_uploads` writes the
+rows in one transaction and reports an outcome per file. Files are hashed
+(SHA-256) while they are copied, so re-uploads of an image the project
+already has can be skipped.
+
+An optional manifest (a `manifest.json` inside the archive, or the form
+field) describes the project and marks the primary image:
+
+    {"project": {"name": "...", "description": "...", ...},
+     "images": [{"file": "front.jpg", "is_primary": true}]}
+
+The primary `file` matches archive members by name, in any folder; a member
+whose full path matches wins over the others.
+
+Import jobs a worker never finished (killed mid-import) stay pending or
+running, with their staging directory left on disk. They are failed and
+cleaned up at startup (job_service.recover_interrupted_jobs), or by
+
+    python -m app.services.image_import [--older-than-minutes 60]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import open_session
+from ..core.metrics import observe_image_processing
+from ..core.tuning import tuning
+from ..models.job import BackgroundJob, JobStatus
+from ..models.project import ProductImage
+from .job_service import JobProgress
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB = "image_import"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_MAX_BYTES = 1024 * 1024
+COPY_CHUNK_BYTES = 1024 * 1024
+# Staged uploads live here until their job has run; each directory names its job in JOB_MARKER
+STAGING_DIR = Path(tempfile.gettempdir()) / "image-imports"
+JOB_MARKER = "job"
+
+
+class InvalidImportError(ValueError):
+    """The upload can't be imported (bad archive, manifest or size)"""
+
+
+@dataclass
+class StagedImport:
+    """An upload copied to disk, ready for the import job"""
+    directory: str
+    archive: Optional[str] = None
+    files: List[Tuple[str, str]] = field(default_factory=list)  # (staged path, original filename)
+    manifest: Dict[str, Any] = field(default_factory=dict)
+    skipped: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class UploadOutcome:
+    """What happened to one file of a multi-file upload"""
+    filename: str
+    status: str = "failed"  # created | duplicate | failed
+    error: Optional[str] = None
+    row: Optional[Dict[str, Any]] = None  # ProductImage values once the file is saved
+    image: Optional[Dict[str, Any]] = None  # Stored (or existing duplicate) image
+
+
+def parse_manifest(text: Optional[str]) -> Dict[str, Any]:
+    """Manifest JSON object, empty when not given"""
+    if not text:
+        return {}
+    try:
+        manifest = json.loads(text)
+    except ValueError as e:
+        raise InvalidImportError(f"Invalid manifest: {e}")
+    if not isinstance(manifest, dict):
+        raise InvalidImportError("Invalid manifest: expected a JSON object")
+    return manifest
+
+
+def stage_upload(
+    archive: Optional[BinaryIO],
+    files: List[Tuple[BinaryIO, str]],
+    manifest: Dict[str, Any]
+) -> StagedImport:
+    """Copy an uploaded archive or files to a new staging directory (blocking)"""
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    staged = StagedImport(directory=tempfile.mkdtemp(prefix="import-", dir=STAGING_DIR), manifest=manifest)
+    try:
+        if archive is not None:
+            staged.archive = str(Path(staged.directory) / "archive.zip")
+            _copy(archive, staged.archive, tuning.IMPORT_MAX_ARCHIVE_SIZE)
+            with _open_archive(staged.archive) as zf:
+                if not manifest and MANIFEST_NAME in zf.namelist():
+                    with zf.open(MANIFEST_NAME) as member:
+                        staged.manifest = parse_manifest(member.read(MANIFEST_MAX_BYTES).decode("utf-8", "replace"))
+        for index, (source, filename) in enumerate(files):
+            reason = _rejection(filename)
+            if reason:
+                staged.skipped.append({'file': filename, 'reason': reason})
+                continue
+            path = str(Path(staged.directory) / f"{index}{Path(filename).suffix.lower()}")
+            try:
+                _copy(source, path, settings.MAX_FILE_SIZE)
+            except InvalidImportError as e:
+                staged.skipped.append({'file': filename, 'reason': str(e)})
+                continue
+            staged.files.append((path, filename))
+    except Exception:
+        shutil.rmtree(staged.directory, ignore_errors=True)
+        raise
+    return staged
+
+
+def claim_staged(staged: StagedImport, job_id: str):
+    """Record which job the staged upload belongs to, for recover_imports"""
+    (Path(staged.directory) / JOB_MARKER).write_text(job_id)
+
+
+def discard_staged(staged: StagedImport):
+    """Remove a staged upload whose job will not run"""
+    shutil.rmtree(staged.directory, ignore_errors=True)
+
+
+def recover_imports(older_than: timedelta) -> Dict[str, int]:
+    """Fail import jobs without progress for `older_than` and remove staging directories nobody will use.
+
+    A live job writes progress at least every file, so one that stayed pending
+    or running this long belongs to a worker that died.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    db = open_session()
+    try:
+        failed = db.query(BackgroundJob).filter(
+            BackgroundJob.kind == IMPORT_JOB,
+            BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+            func.coalesce(BackgroundJob.updated_at, BackgroundJob.created_at) < cutoff
+        ).update({
+            'status': JobStatus.FAILED,
+            'error': "Interrupted before it finished; upload the images again",
+            'finished_at': datetime.now(timezone.utc),
+        }, synchronize_session=False)
+        db.commit()
+        active = set(db.execute(select(BackgroundJob.id).where(
+            BackgroundJob.kind == IMPORT_JOB,
+            BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING])
+        )).scalars().all())
+    finally:
+        db.close()
+
+    removed = 0
+    for directory in STAGING_DIR.glob("import-*") if STAGING_DIR.exists() else []:
+        marker = directory / JOB_MARKER
+        if marker.exists():
+            keep = marker.read_text().strip() in active
+        else:
+            # Not claimed yet: a request may still be staging it
+            keep = datetime.fromtimestamp(directory.stat().st_mtime, timezone.utc) >= cutoff
+        if not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+
+    logger.info(f"Import recovery: failed {failed} stale jobs, removed {removed} staging directories")
+    return {'failed_jobs': failed, 'removed_staging_dirs': removed}
+
+
+def import_images(progress: JobProgress, project_id: int, staged: StagedImport) -> Dict[str, Any]:
+    """Background job: extract, inspect and insert all images of a staged import"""
+    project_dir = Path(settings.UPLOAD_DIR) / f"project_{project_id}"
+    project_dir.mkdir(parents=True, exist_ok=True)
+    primary = _primary_file(staged.manifest)
+    skipped = list(staged.skipped)
+    saved: List[Path] = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, tuning.IMPORT_WORKERS), thread_name_prefix="image-import") as pool:
+            pending = []
+            for filename, destination in _extract(staged, project_dir, skipped, progress):
+                saved.append(destination)
+                pending.append((filename, destination, pool.submit(_inspect, destination)))
+
+            rows = []
+            paths = []
+            for filename, destination, future in pending:
+                try:
+                    details = future.result()
+                except Exception as e:
+                    logger.info(f"Import into project {project_id}: skipping {filename}: {e}")
+                    skipped.append({'file': filename, 'reason': "Not a readable image"})
+                    destination.unlink(missing_ok=True)
+                else:
+                    paths.append(_member_path(filename))
+                    rows.append({
+                        'project_id': project_id,
+                        'filename': destination.name,
+                        'original_filename': Path(filename).name,
+                        'file_path': str(destination),
+                        'is_primary': primary is not None and PurePosixPath(paths[-1]).name == PurePosixPath(primary).name,
+                        **details,
+                    })
+                progress.advance()
+
+        # Only one match becomes primary: the member with the full path, else the first one
+        flagged = [row for row in rows if row['is_primary']]
+        exact = [row for row, path in zip(rows, paths) if row['is_primary'] and path == primary]
+        for row in flagged:
+            row['is_primary'] = row is (exact or flagged)[0]
+        _insert_images(project_id, rows, replace_primary=bool(flagged))
+    except Exception:
+        for path in saved:
+            _remove_saved(path)
+        raise
+    finally:
+        shutil.rmtree(staged.directory, ignore_errors=True)
+
+    logger.info(f"Imported {len(rows)} images into project {project_id}, skipped {len(skipped)}")
+    return {'imported': len(rows), 'skipped': skipped}
+
+
+def save_uploads(project_id: int, files: List[Tuple[BinaryIO, str, Optional[str]]]) -> List[UploadOutcome]:
+    """Save (file, filename, content type) uploads under the project directory, in parallel (blocking)"""
+    project_dir = Path(settings.UPLOAD_DIR) / f"project_{project_id}"
+    project_dir.mkdir(parents=True, exist_ok=True)
+    outcomes = [UploadOutcome(filename=filename or "") for _, filename, _ in files]
+    workers = max(1, min(len(files), tuning.IMPORT_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-upload") as pool:
+        pending = []
+        for outcome, (source, filename, content_type) in zip(outcomes, files):
+            if not (content_type or "").startswith("image/"):
+                outcome.error = "File must be an image"
+                continue
+            outcome.error = _rejection(outcome.filename)
+            if outcome.error is None:
+                pending.append((outcome, pool.submit(_save_upload, source, outcome.filename, project_dir)))
+
+        for outcome, future in pending:
+            try:
+                outcome.row = future.result()
+            except InvalidImportError as e:
+                outcome.error = str(e)
+            except Exception as e:
+                logger.info(f"Upload into project {project_id}: skipping {outcome.filename}: {e}")
+                outcome.error = "Not a readable image"
+    return outcomes
+
+
+def insert_uploads(
+    db: Session,
+    project_id: int,
+    outcomes: List[UploadOutcome],
+    primary_index: Optional[int] = None,
+    skip_duplicates: bool = True
+) -> List[UploadOutcome]:
+    """Insert the saved files of a multi-file upload in one transaction"""
+    saved = [outcome for outcome in outcomes if outcome.row is not None]
+    first_by_hash: Dict[str, UploadOutcome] = {}
+    existing: Dict[str, ProductImage] = {}
+    if skip_duplicates and saved:
+        for image in db.query(ProductImage).filter(
+            ProductImage.project_id == project_id,
+            ProductImage.content_hash.in_({outcome.row['content_hash'] for outcome in saved})
+        ).order_by(ProductImage.id):
+            existing.setdefault(image.content_hash, image)
+
+    new: List[UploadOutcome] = []
+    repeated: List[Tuple[UploadOutcome, UploadOutcome]] = []
+    for index, outcome in enumerate(outcomes):
+        if outcome.row is None:
+            continue
+        content_hash = outcome.row['content_hash']
+        if skip_duplicates and (content_hash in existing or content_hash in first_by_hash):
+            _remove_saved(Path(outcome.row['file_path']))
+            outcome.status = "duplicate"
+            if content_hash in existing:
+                outcome.image = _image_values(existing[content_hash])
+            else:
+                repeated.append((outcome, first_by_hash[content_hash]))
+            continue
+        first_by_hash.setdefault(content_hash, outcome)
+        outcome.row.update({'project_id': project_id, 'is_primary': index == primary_index})
+        new.append(outcome)
+
+    try:
+        if any(outcome.row['is_primary'] for outcome in new):
+            db.query(ProductImage).filter(
+                ProductImage.project_id == project_id,
+                ProductImage.is_primary == True
+            ).update({"is_primary": False})
+        if new:
+            # One executemany for all files, returning the stored rows in parameter order
+            images = db.scalars(
+                insert(ProductImage).returning(ProductImage, sort_by_parameter_order=True),
+                [outcome.row for outcome in new]
+            ).all()
+            for outcome, image in zip(new, images):
+                outcome.status, outcome.image = "created", _image_values(image)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for outcome in new:
+            _remove_saved(Path(outcome.row['file_path']))
+        raise
+
+    for outcome, first in repeated:
+        outcome.image = first.image
+    return outcomes
+
+
+def _save_upload(source: BinaryIO, filename: str, project_dir: Path) -> Dict[str, Any]:
+    destination = project_dir / f"{uuid.uuid4()}{Path(filename).suffix.lower()}"
+    try:
+        content_hash = _copy(source, str(destination), settings.MAX_FILE_SIZE)
+        details = _inspect(destination, content_hash)
+    except Exception:
+        _remove_saved(destination)
+        raise
+    return {
+        'filename': destination.name,
+        'original_filename': Path(filename).name,
+        'file_path': str(destination),
+        **details,
+    }
+
+
+def _image_values(image: ProductImage) -> Dict[str, Any]:
+    """Column values of a row, still readable after the session commits"""
+    return {column.key: getattr(image, column.key) for column in ProductImage.__table__.columns}
+
+
+def _remove_saved(path: Path):
+    path.unlink(missing_ok=True)
+    _thumbnail_path(path).unlink(missing_ok=True)
+
+
+def _extract(staged: StagedImport, project_dir: Path, skipped: List[Dict[str, str]], progress: JobProgress):
+    """Yield (original name, saved path) per accepted file, writing each under the project directory"""
+    if staged.archive is None:
+        progress.set_total(len(staged.files))
+        for path, filename in staged.files:
+            destination = project_dir / f"{uuid.uuid4()}{Path(filename).suffix.lower()}"
+            shutil.move(path, destination)
+            yield filename, destination
+        return
+
+    with _open_archive(staged.archive) as zf:
+        members = []
+        for info in zf.infolist():
+            if info.is_dir() or info.filename == MANIFEST_NAME or _hidden(info.filename):
+                continue
+            reason = _rejection(info.filename)
+            if reason is None and info.file_size > settings.MAX_FILE_SIZE:
+                reason = "File too large"
+            if reason is None and len(members) >= tuning.IMPORT_MAX_FILES:
+                reason = f"More than {tuning.IMPORT_MAX_FILES} files"
+            if reason:
+                skipped.append({'file': info.filename, 'reason': reason})
+            else:
+                members.append(info)
+
+        progress.set_total(len(members))
+        for info in members:
+            destination = project_dir / f"{uuid.uuid4()}{Path(info.filename).suffix.lower()}"
+            try:
+                with zf.open(info) as member:
+                    # Declared sizes can lie; the cap applies to the bytes actually inflated
+                    _copy(member, str(destination), settings.MAX_FILE_SIZE)
+            except (InvalidImportError, zipfile.BadZipFile, OSError) as e:
+                destination.unlink(missing_ok=True)
+                skipped.append({'file': info.filename, 'reason': str(e)})
+                progress.advance()
+                continue
+            yield info.filename, destination
+
+
+def _inspect(path: Path, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Size, format, hash and thumbnail of a saved image (runs on the worker pool)"""
+    from PIL import Image
+
+    started = time.perf_counter()
+    if content_hash is None:
+        with open(path, "rb") as f:
+            content_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    with Image.open(path) as img:
+        width, height = img.size
+        mime_type = Image.MIME.get(img.format or "", "application/octet-stream")
+        img.thumbnail((tuning.IMPORT_THUMBNAIL_SIZE, tuning.IMPORT_THUMBNAIL_SIZE))
+        thumbnail = _thumbnail_path(path)
+        thumbnail.parent.mkdir(exist_ok=True)
+        img.convert("RGB").save(thumbnail, "JPEG", quality=85)
+    observe_image_processing("import_thumbnail", started)
+    return {
+        'file_size': path.stat().st_size,
+        'mime_type': mime_type,
+        'width': width,
+        'height': height,
+        'thumbnail_path': str(thumbnail),
+        'content_hash': content_hash,
+    }
+
+
+def _insert_images(project_id: int, rows: List[Dict[str, Any]], replace_primary: bool):
+    db = open_session()
+    try:
+        if replace_primary:
+            db.query(ProductImage).filter(
+                ProductImage.project_id == project_id,
+                ProductImage.is_primary == True
+            ).update({"is_primary": False})
+        if rows:
+            # One executemany for the whole import
+            db.execute(insert(ProductImage), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _thumbnail_path(path: Path) -> Path:
+    return path.parent / "thumbnails" / f"{path.stem}.jpg"
+
+
+def _primary_file(manifest: Dict[str, Any]) -> Optional[str]:
+    for entry in manifest.get('images') or []:
+        if isinstance(entry, dict) and entry.get('is_primary') and entry.get('file'):
+            return _member_path(str(entry['file']))
+    return None
+
+
+def _member_path(filename: str) -> str:
+    """An archive member or manifest path in one form: forward slashes, no "./" parts"""
+    return PurePosixPath(filename.replace("\\", "/")).as_posix()
+
+
+def _rejection(filename: str) -> Optional[str]:
+    extension = Path(filename).suffix.lower().lstrip(".")
+    if extension not in settings.allowed_extensions_list:
+        return f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions_list)}"
+    return None
+
+
+def _hidden(name: str) -> bool:
+    """macOS resource forks and dotfiles that archivers add"""
+    return name.startswith("__MACOSX/") or Path(name).name.startswith(".")
+
+
+def _open_archive(path: str) -> zipfile.ZipFile:
+    try:
+        return zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise InvalidImportError("Not a valid ZIP archive")
+
+
+def _copy(source: BinaryIO, destination: str, limit: int) -> str:
+    """Copy in chunks, giving up once more than `limit` bytes have been read; returns the SHA-256"""
+    written = 0
+    digest = hashlib.sha256()
+    with open(destination, "wb") as target:
+        while True:
+            chunk = source.read(COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > limit:
+                raise InvalidImportError("File too large")
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail interrupted image imports and remove their staged uploads")
+    parser.add_argument("--older-than-minutes", type=float, default=60.0,
+                        help="Only jobs without progress for this long are considered interrupted")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(recover_imports(timedelta(minutes=args.older_than_minutes)), indent=2))
@@ -0,0 +1,198 @@
+"""
+Background jobs with progress stored in the database
+
+Long-running work (bulk imports, ...) is handed to a small dedicated thread
+pool so it neither holds up the request nor takes up Starlette's threadpool.
+Progress is written to the background_jobs table, so any worker can answer
+a status poll, not just the one running the job. Jobs still queued when the
+worker shuts down are marked failed, and their `on_cancel` cleanup runs.
+Jobs of a worker that died are cleaned up at startup by
+recover_interrupted_jobs (RECOVER_INTERRUPTED_JOBS).
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.database import open_session
+from ..core.tuning import tuning
+from ..models.job import BackgroundJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Progress is written at most this often per job
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+
+def create_job(db: Session, kind: str, user_id: int, project_id: Optional[int] = None) -> BackgroundJob:
+    """Record a new pending job"""
+    job = BackgroundJob(id=uuid.uuid4().hex, kind=kind, user_id=user_id, project_id=project_id,
+                        status=JobStatus.PENDING, processed=0)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def get_job(db: Session, job_id: str, user_id: int) -> Optional[BackgroundJob]:
+    """A job of this user, if it exists"""
+    return db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id,
+        BackgroundJob.user_id == user_id
+    ).first()
+
+
+class JobProgress:
+    """Progress reporter handed to a running job; writes are throttled"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.total: Optional[int] = None
+        self.processed = 0
+        self._written_at = 0.0
+
+    def set_total(self, total: int):
+        self.total = total
+        self._write({'total': total, 'status': JobStatus.RUNNING})
+
+    def advance(self, count: int = 1):
+        self.processed += count
+        if time.monotonic() - self._written_at >= PROGRESS_INTERVAL_SECONDS:
+            self._write({'processed': self.processed})
+
+    def _write(self, values: Dict[str, Any]):
+        self._written_at = time.monotonic()
+        _update_job(self.job_id, values)
+
+
+def _update_job(job_id: str, values: Dict[str, Any]):
+    db = open_session()
+    try:
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def finish_job(job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+    """Mark a job completed with its result, or failed with an error"""
+    _update_job(job_id, {
+        'status': JobStatus.FAILED if error is not None else JobStatus.COMPLETED,
+        'result': result,
+        'error': error[:1000] if error is not None else None,
+        'finished_at': datetime.now(timezone.utc),
+    })
+
+
+def _start_job(job_id: str) -> bool:
+    """Move a pending job to running; False when it was failed meanwhile (e.g. by a recovery)"""
+    db = open_session()
+    try:
+        started = db.query(BackgroundJob).filter(
+            BackgroundJob.id == job_id,
+            BackgroundJob.status == JobStatus.PENDING
+        ).update({'status': JobStatus.RUNNING}, synchronize_session=False)
+        db.commit()
+        return started > 0
+    finally:
+        db.close()
+
+
+def _cancel(job_id: str, on_cancel: Optional[Callable[[], None]], reason: str):
+    """Mark a job that will never run as failed and release what it was given"""
+    try:
+        _update_job(job_id, {
+            'status': JobStatus.FAILED,
+            'error': reason,
+            'finished_at': datetime.now(timezone.utc),
+        })
+    except Exception as e:
+        logger.error(f"Could not mark background job {job_id} as failed: {e}")
+    if on_cancel is not None:
+        try:
+            on_cancel()
+        except Exception as e:
+            logger.error(f"Cleanup of cancelled background job {job_id} failed: {e}")
+
+
+def _run(job_id: str, fn: Callable[..., Optional[Dict[str, Any]]], args: tuple,
+         on_cancel: Optional[Callable[[], None]]):
+    if not _start_job(job_id):
+        logger.info(f"Background job {job_id} is no longer pending, skipping it")
+        if on_cancel is not None:
+            on_cancel()
+        return
+    progress = JobProgress(job_id)
+    try:
+        result = fn(progress, *args)
+    except Exception as e:
+        logger.exception(f"Background job {job_id} failed")
+        _update_job(job_id, {
+            'status': JobStatus.FAILED,
+            'processed': progress.processed,
+            'error': str(e)[:1000],
+            'finished_at': datetime.now(timezone.utc),
+        })
+        return
+    _update_job(job_id, {
+        'status': JobStatus.COMPLETED,
+        'processed': progress.processed,
+        'result': result,
+        'finished_at': datetime.now(timezone.utc),
+    })
+
+
+# Global instance, created on first use
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def submit_job(job: BackgroundJob, fn: Callable[..., Optional[Dict[str, Any]]], *args,
+               on_cancel: Optional[Callable[[], None]] = None) -> Future:
+    """Run fn(progress, *args) on the job pool; its return value becomes the job result.
+
+    on_cancel releases what the job was handed (e.g. staged files) when it
+    never runs because the pool shut down first.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, tuning.BACKGROUND_JOB_WORKERS),
+                                               thread_name_prefix="background-job")
+    job_id = job.id
+    future = _executor.submit(_run, job_id, fn, args, on_cancel)
+
+    def cancelled(done: Future):
+        if done.cancelled():
+            _cancel(job_id, on_cancel, "Cancelled by a server shutdown before it started")
+
+    future.add_done_callback(cancelled)
+    return future
+
+
+def recover_interrupted_jobs():
+    """Fail stale import jobs and finish stale project deletions left by workers that died"""
+    if not tuning.RECOVER_INTERRUPTED_JOBS:
+        logger.info("Skipping background job recovery (RECOVER_INTERRUPTED_JOBS disabled)")
+        return
+    from .image_import import recover_imports
+    from .project_cleanup import resume_deletions
+
+    older_than = timedelta(minutes=tuning.INTERRUPTED_JOB_MINUTES)
+    for name, recover in (("imports", recover_imports), ("project deletions", resume_deletions)):
+        try:
+            recover(older_than)
+        except Exception as e:
+            logger.error(f"Recovery of interrupted {name} failed: {e}")
+
+
+def shutdown_job_executor():
+    """Stop the job pool; running jobs finish, queued ones are marked failed"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,194 @@
+"""
+Background deletion of projects
+
+DELETE /projects/{id} only sets projects.deleted_at, which hides the project
+and its generations (see not_in_deleted_project) from every endpoint, and
+starts a project_delete job. The job removes the
+project's rows with set-based DELETEs of PROJECT_DELETE_BATCH_SIZE ids, each
+batch in its own short transaction: marketing plans and SEO analyses, then
+generations with their tags, then images, and finally the project row. The
+upload directory is removed on a separate thread meanwhile. Progress (rows
+deleted of the total) is read through GET /projects/jobs/{job_id}.
+
+Deletions interrupted by a restart are finished by
+
+    python -m app.services.project_cleanup [--older-than-minutes 60]
+
+which also runs at startup (job_service.recover_interrupted_jobs). It leaves
+alone projects whose delete job made progress within that time (it may still
+be running on another worker) and completes the stale jobs it takes over.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import open_session
+from ..core.tuning import tuning
+from ..models.content import ContentGeneration, ContentTag, MarketingPlan, SEOAnalysis
+from ..models.job import BackgroundJob, JobStatus
+from ..models.project import Project, ProductImage
+from .job_service import JobProgress, finish_job
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DELETE_JOB = "project_delete"
+
+
+def not_in_deleted_project():
+    """Condition keeping only generations that are not in a project being deleted"""
+    return ~exists().where(Project.id == ContentGeneration.project_id, Project.deleted_at.isnot(None))
+
+
+def delete_project_data(progress: Optional[JobProgress], project_id: int) -> Dict[str, int]:
+    """Delete a project marked as deleted, with all its rows and files"""
+    project_dir = Path(settings.UPLOAD_DIR) / f"project_{project_id}"
+    report = {'marketing_plans': 0, 'seo_analyses': 0, 'generations': 0, 'images': 0}
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="project-files") as files:
+        removed_files = files.submit(_remove_files, project_dir)
+
+        db = open_session()
+        try:
+            if progress is not None:
+                progress.set_total(_count_rows(db, project_id))
+
+            for model, key in ((MarketingPlan, 'marketing_plans'), (SEOAnalysis, 'seo_analyses')):
+                for ids in _id_batches(db, model.id, model.project_id == project_id):
+                    db.execute(delete(model).where(model.id.in_(ids)))
+                    db.commit()
+                    report[key] += len(ids)
+                    _advance(progress, len(ids))
+
+            for ids in _id_batches(db, ContentGeneration.id, ContentGeneration.project_id == project_id):
+                # Plans of other projects may point at these generations; they are kept and unlinked
+                db.execute(update(MarketingPlan).where(MarketingPlan.generation_id.in_(ids)).values(generation_id=None))
+                db.execute(update(SEOAnalysis).where(SEOAnalysis.generation_id.in_(ids)).values(generation_id=None))
+                db.execute(delete(ContentTag).where(ContentTag.generation_id.in_(ids)))
+                db.execute(delete(ContentGeneration).where(ContentGeneration.id.in_(ids)))
+                db.commit()
+                report['generations'] += len(ids)
+                _advance(progress, len(ids))
+
+            for ids in _id_batches(db, ProductImage.id, ProductImage.project_id == project_id):
+                # Generations outside the project may have used these images as their source
+                db.execute(update(ContentGeneration).where(ContentGeneration.source_image_id.in_(ids)).values(source_image_id=None))
+                db.execute(delete(ProductImage).where(ProductImage.id.in_(ids)))
+                db.commit()
+                report['images'] += len(ids)
+                _advance(progress, len(ids))
+
+            db.execute(delete(ContentTag).where(ContentTag.project_id == project_id))
+            db.execute(delete(Project).where(Project.id == project_id, Project.deleted_at.isnot(None)))
+            db.commit()
+        finally:
+            db.close()
+
+        report['files'] = removed_files.result()
+
+    logger.info(f"Deleted project {project_id}: {report}")
+    return report
+
+
+def resume_deletions(older_than: timedelta = timedelta(minutes=60)) -> List[Dict[str, int]]:
+    """Finish every project that is marked as deleted but still has its row.
+
+    Projects with a pending or running delete job that made progress within
+    `older_than` are skipped. Older jobs belong to a worker that died: this
+    run finishes their deletion and completes them with its report.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    last_progress = func.coalesce(BackgroundJob.updated_at, BackgroundJob.created_at)
+    stale_jobs: Dict[int, List[str]] = defaultdict(list)
+    live = set()
+    db = open_session()
+    try:
+        for job_id, project_id, stale in db.execute(
+            select(BackgroundJob.id, BackgroundJob.project_id, last_progress < cutoff).where(
+                BackgroundJob.kind == PROJECT_DELETE_JOB,
+                BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+                BackgroundJob.project_id.isnot(None)
+            )
+        ):
+            if stale:
+                stale_jobs[project_id].append(job_id)
+            else:
+                live.add(project_id)
+        deleted = db.execute(select(Project.id).where(Project.deleted_at.isnot(None))).scalars().all()
+        # Never delete the rows of a project that is not marked as deleted
+        kept = db.execute(select(Project.id).where(
+            Project.id.in_(list(stale_jobs)), Project.deleted_at.is_(None)
+        )).scalars().all()
+    finally:
+        db.close()
+    # A stale job's project row may already be gone while its files are not
+    project_ids = sorted((set(deleted) | set(stale_jobs)) - live - set(kept))
+
+    reports = []
+    for project_id in project_ids:
+        try:
+            report = delete_project_data(None, project_id)
+        except Exception as e:
+            logger.error(f"Resuming the deletion of project {project_id} failed: {e}")
+            for job_id in stale_jobs.get(project_id, []):
+                finish_job(job_id, error=f"Interrupted before it finished; resuming failed: {e}")
+            continue
+        for job_id in stale_jobs.get(project_id, []):
+            finish_job(job_id, result=report)
+        reports.append({'project_id': project_id, **report})
+    logger.info(f"Deletion recovery: finished {len(reports)} projects, took over {sum(map(len, stale_jobs.values()))} stale jobs")
+    return reports
+
+
+def _count_rows(db: Session, project_id: int) -> int:
+    return sum(
+        db.execute(select(func.count()).select_from(model).where(model.project_id == project_id)).scalar()
+        for model in (MarketingPlan, SEOAnalysis, ContentGeneration, ProductImage)
+    )
+
+
+def _id_batches(db: Session, id_column, condition) -> Iterator[List[int]]:
+    """Ids of matching rows, a batch at a time; each batch must be deleted before the next is read"""
+    while True:
+        ids = db.execute(select(id_column).where(condition).limit(tuning.PROJECT_DELETE_BATCH_SIZE)).scalars().all()
+        if not ids:
+            db.rollback()
+            return
+        yield ids
+
+
+def _advance(progress: Optional[JobProgress], rows: int):
+    if progress is not None:
+        progress.advance(rows)
+
+
+def _remove_files(project_dir: Path) -> int:
+    """Remove the project's upload directory; returns the number of files removed"""
+    if not project_dir.exists():
+        return 0
+    count = sum(len(names) for _, _, names in os.walk(project_dir))
+
+    def log_error(function, path, exc_info):
+        logger.warning(f"Could not remove {path}: {exc_info[1]}")
+
+    shutil.rmtree(project_dir, onerror=log_error)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Finish deletions of projects marked as deleted")
+    parser.add_argument("--older-than-minutes", type=float, default=60.0,
+                        help="Skip projects whose delete job made progress within this time")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(resume_deletions(timedelta(minutes=args.older_than_minutes)), indent=2))
@@ -0,0 +1,128 @@
+"""
+Per-user daily generation quotas
+
+Each generation request is counted with one atomic UPDATE against
+users.daily_requests_count, which resets on the first request of a new UTC
+day. The limit is DAILY_GENERATION_LIMIT unless an admin set
+users.daily_request_limit. Failed generations are refunded to the day they
+were charged to.
+"""
+import logging
+from typing import Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, case, or_, func
+from sqlalchemy.orm import Session
+
+from ..core.tuning import tuning
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceededError(Exception):
+    """Raised when a user has used up their daily generation quota"""
+
+    def __init__(self, limit: int, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        super().__init__(f"Daily generation limit of {limit} reached")
+
+def _day_start(now: datetime) -> datetime:
+    """Start of the current quota day (UTC midnight)"""
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (e.g. from SQLite) as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def seconds_until_reset(now: Optional[datetime] = None) -> int:
+    """Seconds until the quota day rolls over"""
+    now = now or datetime.now(timezone.utc)
+    next_day = _day_start(now) + timedelta(days=1)
+    return max(1, int((next_day - now).total_seconds()))
+
+def effective_limit(user: User) -> int:
+    """Daily limit for a user; 0 means unlimited"""
+    if user.daily_request_limit is not None:
+        return user.daily_request_limit
+    return tuning.DAILY_GENERATION_LIMIT
+
+def consume_generation_quota(db: Session, user: User, now: Optional[datetime] = None) -> int:
+    """Atomically count one generation against the user's daily quota.
+
+    A single UPDATE ... RETURNING resets the counter on the first request of a
+    new day, increments it otherwise, and matches no row when the limit is
+    already reached - so concurrent requests can never overshoot the limit.
+    Returns the new count for the day. Pass the same `now` to
+    refund_generation_quota.
+    """
+    now = now or datetime.now(timezone.utc)
+    day_start = _day_start(now)
+    is_new_day = or_(User.last_request_date.is_(None), User.last_request_date < day_start)
+    limit = func.coalesce(User.daily_request_limit, tuning.DAILY_GENERATION_LIMIT)
+
+    stmt = (
+        update(User)
+        .where(
+            User.id == user.id,
+            or_(
+                limit <= 0,
+                is_new_day,
+                func.coalesce(User.daily_requests_count, 0) < limit
+            )
+        )
+        .values(
+            daily_requests_count=case((is_new_day, 1), else_=func.coalesce(User.daily_requests_count, 0) + 1),
+            last_request_date=now
+        )
+        .returning(User.daily_requests_count)
+        .execution_options(synchronize_session=False)
+    )
+    count = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+
+    if count is None:
+        limit_value = effective_limit(user)
+        logger.info(f"User {user.id} hit daily generation limit of {limit_value}")
+        raise QuotaExceededError(limit_value, seconds_until_reset(now))
+
+    return count
+
+def refund_generation_quota(db: Session, user_id: int, charged_at: datetime):
+    """Give back one generation, e.g. when the upstream call failed.
+
+    Only refunds while the counter still belongs to the day charged at
+    charged_at; once it has been reset for a new day there is nothing to give back.
+    """
+    day_start = _day_start(charged_at)
+    try:
+        db.execute(
+            update(User)
+            .where(
+                User.id == user_id,
+                User.daily_requests_count > 0,
+                User.last_request_date >= day_start,
+                User.last_request_date < day_start + timedelta(days=1)
+            )
+            .values(daily_requests_count=User.daily_requests_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error refunding generation quota for user {user_id}: {e}")
+        db.rollback()
+
+def get_quota_status(user: User) -> Dict[str, Any]:
+    """Get a summary of the user's quota for today"""
+    now = datetime.now(timezone.utc)
+    limit = effective_limit(user)
+
+    used = user.daily_requests_count or 0
+    if user.last_request_date is None or _as_utc(user.last_request_date) < _day_start(now):
+        used = 0
+
+    return {
+        'daily_limit': limit if limit > 0 else None,
+        'used_today': used,
+        'remaining_today': max(0, limit - used) if limit > 0 else None,
+        'resets_in_seconds': seconds_until_reset(now)
+    }
@@ -0,0 +1,158 @@
+"""
+Parsing of generated JSON results
+
+Models wrap JSON in code fences, add prose around it, or stop mid-document
+when they hit max_tokens. parse_json_result() recovers as much of the
+document as it can: it takes the fenced block (or the first object/array in
+the text) and, when that does not parse, cuts it back to the last complete
+value and closes the open brackets.
+"""
+import json
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+_FENCED_BLOCK = re.compile(r"```[a-zA-Z]*\s*(.*?)(?:```|$)", re.S)
+_HASHTAG = re.compile(r"#(\w[\w-]*)")
+_CLOSERS = {'{': '}', '[': ']'}
+
+# Candidate cut points tried when repairing a truncated document
+MAX_REPAIR_ATTEMPTS = 20
+
+
+def parse_json_result(text: Optional[str]) -> Optional[Any]:
+    """Parse generated JSON, tolerating code fences, surrounding prose and truncation.
+
+    Returns None when no JSON value can be recovered.
+    """
+    if not text:
+        return None
+    fenced = _FENCED_BLOCK.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    text = text[start:].strip()
+
+    try:
+        # raw_decode ignores trailing prose after a complete document
+        return json.JSONDecoder().raw_decode(text)[0]
+    except ValueError:
+        pass
+
+    for end, open_brackets in reversed(_cut_points(text)[-MAX_REPAIR_ATTEMPTS:]):
+        candidate = text[:end] + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _cut_points(text: str) -> List[Tuple[int, str]]:
+    """Positions where the document can be cut and closed, with the brackets open there"""
+    points = []
+    stack = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+            # An empty container is complete once closed
+            points.append((index + 1, "".join(stack)))
+        elif char in '}]':
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                # Document is complete here; anything after it is noise
+                points.append((index + 1, ""))
+                break
+            points.append((index + 1, "".join(stack)))
+        elif char == ',':
+            # Everything before the comma is a complete member
+            points.append((index, "".join(stack)))
+    return points
+
+
+def find_values(document: Any, *names: str) -> List[Any]:
+    """Values of every key (at any depth) whose normalized name contains one of `names`"""
+    wanted = [_normalize_key(name) for name in names]
+    found = []
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if any(name in _normalize_key(key) for name in wanted):
+                    found.append(value)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(document)
+    return found
+
+
+def find_value(document: Any, *names: str) -> Optional[Any]:
+    """First value found by find_values, or None"""
+    values = find_values(document, *names)
+    return values[0] if values else None
+
+
+def strings_in(values: Iterable[Any]) -> List[str]:
+    """Every string in nested lists/dicts, in document order"""
+    strings = []
+
+    def walk(node: Any):
+        if isinstance(node, str):
+            strings.append(node)
+        elif isinstance(node, dict):
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    for value in values:
+        walk(value)
+    return strings
+
+
+def extract_hashtags(document: Any) -> List[str]:
+    """Distinct hashtags (lowercase, without '#') from every hashtag field"""
+    tags = []
+    for text in strings_in(find_values(document, "hashtag")):
+        matches = _HASHTAG.findall(text)
+        if not matches and text.strip() and " " not in text.strip():
+            matches = [text.strip().lstrip('#')]
+        tags.extend(matches)
+    # content_tags.value is String(100)
+    return _distinct(tag.lower() for tag in tags if len(tag) <= 100)
+
+
+def extract_keywords(document: Any) -> List[str]:
+    """Distinct keywords (lowercase) from every keyword field"""
+    keywords = []
+    for text in strings_in(find_values(document, "keyword")):
+        # "a, b, c" in a single string is a list too
+        keywords.extend(part.strip().lower() for part in text.split(','))
+    return _distinct(keyword for keyword in keywords if keyword and len(keyword) <= 100)
+
+
+def _distinct(values: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def _normalize_key(key: Any) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(key).lower())
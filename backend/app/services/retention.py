@@ -0,0 +1,316 @@
+"""
+Retention for content_generations: archival and inline image compaction
+
+Two passes, each in small batches with its own short transaction, so no
+long-held locks and no long-running transactions on the hot table:
+
+* Archive: finished generations older than RETENTION_ARCHIVE_DAYS are copied
+  to content_generations_archive (or appended to a gzipped NDJSON file) and
+  deleted. Their tags go with them. MarketingPlan / SEOAnalysis rows are kept
+  and unlinked.
+* Compact: base64 data URLs in generation_metadata / generated_content older
+  than RETENTION_STRIP_IMAGES_DAYS are written out as files under the uploads
+  directory and replaced by their URL, so nothing is lost.
+
+Reported bytes are what the rows stored (pg_column_size on Postgres,
+character counts elsewhere). Postgres only reuses the space after VACUUM
+(autovacuum does it eventually).
+
+Run it from the admin API (POST /admin/retention/run) or from cron:
+
+    python -m app.services.retention [--dry-run]
+"""
+import argparse
+import base64
+import binascii
+import enum
+import gzip
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Text, cast, delete, func, insert, or_, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import get_engine, open_session
+from ..core.tuning import tuning
+from ..models.content import (
+    ArchivedGeneration, ContentGeneration, ContentTag, GenerationStatus, MarketingPlan, SEOAnalysis
+)
+from .job_service import JobProgress
+
+logger = logging.getLogger(__name__)
+
+RETENTION_JOB = "retention"
+# pg_try_advisory_lock key: a run that finds the lock held does nothing
+RETENTION_LOCK_KEY = 7_302_118_045
+
+GENERATED_DIR = "generated"
+_DATA_URL = re.compile(r"data:image/([a-zA-Z0-9.+-]+);base64,([A-Za-z0-9+/=]+)")
+
+ARCHIVE_COLUMNS = [column.key for column in ArchivedGeneration.__table__.columns if column.key != 'archived_at']
+
+
+@dataclass
+class RetentionReport:
+    """What a retention run did (or, dry-run, would do)"""
+    dry_run: bool = False
+    skipped: bool = False  # Another run held the lock
+    archived_rows: int = 0
+    archived_bytes: int = 0
+    archive_file: Optional[str] = None
+    compacted_rows: int = 0
+    offloaded_images: int = 0
+    compacted_bytes: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.archived_bytes + self.compacted_bytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'bytes_reclaimed': self.bytes_reclaimed}
+
+
+def run_retention(progress: Optional[JobProgress] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """Archive old generations and compact inline images; usable as a background job"""
+    started = time.perf_counter()
+    report = RetentionReport(dry_run=dry_run)
+    # The advisory lock belongs to a connection, and the session returns its connection on every commit
+    with get_engine().connect() as lock_connection:
+        if not _try_lock(lock_connection):
+            logger.info("Retention is already running elsewhere, skipped")
+            report.skipped = True
+            return report.as_dict()
+        db = open_session()
+        try:
+            now = datetime.now(timezone.utc)
+            archive_cutoff = None
+            if tuning.RETENTION_ARCHIVE_DAYS > 0:
+                archive_cutoff = now - timedelta(days=tuning.RETENTION_ARCHIVE_DAYS)
+                if dry_run:
+                    _estimate_archive(db, archive_cutoff, report)
+                else:
+                    _archive(db, archive_cutoff, report, progress)
+            if tuning.RETENTION_STRIP_IMAGES_DAYS > 0:
+                # A dry run leaves the rows to archive in place; don't count them twice
+                newer_than = archive_cutoff if dry_run else None
+                _compact(db, now - timedelta(days=tuning.RETENTION_STRIP_IMAGES_DAYS), newer_than, report, progress, dry_run)
+        finally:
+            db.close()
+            _unlock(lock_connection)
+
+    report.duration_seconds = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Retention{' (dry run)' if dry_run else ''}: archived {report.archived_rows} rows, "
+        f"compacted {report.compacted_rows} rows, {report.bytes_reclaimed} bytes reclaimed "
+        f"in {report.duration_seconds:.1f}s"
+    )
+    return report.as_dict()
+
+
+def _archive(db: Session, cutoff: datetime, report: RetentionReport, progress: Optional[JobProgress]):
+    archive_file = None
+    if tuning.RETENTION_ARCHIVE_TARGET == "files":
+        directory = Path(tuning.RETENTION_ARCHIVE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        archive_file = directory / f"generations-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.ndjson.gz"
+        report.archive_file = str(archive_file)
+
+    while True:
+        # Old rows have the lowest ids, so this stays an index walk from the start of the table
+        batch = db.execute(
+            select(ContentGeneration.id, _stored_size(db))
+            .where(
+                ContentGeneration.created_at < cutoff,
+                ContentGeneration.status.in_([GenerationStatus.COMPLETED, GenerationStatus.FAILED])
+            )
+            .order_by(ContentGeneration.id)
+            .limit(tuning.RETENTION_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not batch:
+            db.rollback()
+            return
+        ids = [row[0] for row in batch]
+
+        if archive_file is not None:
+            _append_to_file(db, archive_file, ids)
+        else:
+            columns = [getattr(ContentGeneration, key) for key in ARCHIVE_COLUMNS]
+            db.execute(insert(ArchivedGeneration).from_select(ARCHIVE_COLUMNS, select(*columns).where(ContentGeneration.id.in_(ids))))
+        db.execute(update(MarketingPlan).where(MarketingPlan.generation_id.in_(ids)).values(generation_id=None))
+        db.execute(update(SEOAnalysis).where(SEOAnalysis.generation_id.in_(ids)).values(generation_id=None))
+        db.execute(delete(ContentTag).where(ContentTag.generation_id.in_(ids)))
+        db.execute(delete(ContentGeneration).where(ContentGeneration.id.in_(ids)))
+        db.commit()
+
+        report.archived_rows += len(ids)
+        report.archived_bytes += sum(int(row[1] or 0) for row in batch)
+        _batch_done(report, progress, len(ids))
+
+
+def _estimate_archive(db: Session, cutoff: datetime, report: RetentionReport):
+    rows, size = db.execute(
+        select(func.count(ContentGeneration.id), func.sum(_stored_size(db)))
+        .where(
+            ContentGeneration.created_at < cutoff,
+            ContentGeneration.status.in_([GenerationStatus.COMPLETED, GenerationStatus.FAILED])
+        )
+    ).one()
+    report.archived_rows = rows
+    report.archived_bytes = int(size or 0)
+
+
+def _compact(
+    db: Session,
+    cutoff: datetime,
+    newer_than: Optional[datetime],
+    report: RetentionReport,
+    progress: Optional[JobProgress],
+    dry_run: bool
+):
+    last_id = 0
+    while True:
+        stmt = select(ContentGeneration.id, ContentGeneration.generation_metadata, ContentGeneration.generated_content).where(
+            ContentGeneration.id > last_id,
+            ContentGeneration.created_at < cutoff,
+            or_(cast(ContentGeneration.generation_metadata, Text).like("%data:image/%"),
+                ContentGeneration.generated_content.like("%data:image/%"))
+        )
+        if newer_than is not None:
+            stmt = stmt.where(ContentGeneration.created_at >= newer_than)
+        batch = db.execute(
+            stmt
+            .order_by(ContentGeneration.id)
+            .limit(tuning.RETENTION_BATCH_SIZE)
+        ).all()
+        if not batch:
+            db.rollback()
+            return
+        last_id = batch[-1][0]
+
+        for generation_id, metadata, content in batch:
+            report.compacted_rows += 1
+            if dry_run:
+                inline = [match.group(0) for value in (json.dumps(metadata), content or "") for match in _DATA_URL.finditer(value)]
+                report.offloaded_images += len(inline)
+                report.compacted_bytes += sum(len(url) for url in inline)
+                continue
+            before = _size(metadata) + len(content or "")
+            images: List[str] = []
+            metadata, content = _offload(metadata, images), _offload(content, images)
+            db.execute(
+                update(ContentGeneration).where(ContentGeneration.id == generation_id)
+                .values(generation_metadata=metadata, generated_content=content)
+            )
+            report.offloaded_images += len(images)
+            report.compacted_bytes += before - (_size(metadata) + len(content or ""))
+        db.commit()
+        _batch_done(report, progress, len(batch))
+
+
+def _offload(value: Any, images: List[str]) -> Any:
+    """`value` with every base64 data URL written to a file and replaced by the file's URL"""
+    if isinstance(value, str):
+        return _DATA_URL.sub(lambda match: _write_image(match, images), value) if "data:image/" in value else value
+    if isinstance(value, dict):
+        offloaded = {key: _offload(item, images) for key, item in value.items()}
+        # Image entries from the AI service are tagged with how their URL is encoded
+        if offloaded.get('type') == 'base64' and isinstance(offloaded.get('url'), str) and not offloaded['url'].startswith("data:"):
+            offloaded['type'] = 'url'
+        return offloaded
+    if isinstance(value, list):
+        return [_offload(item, images) for item in value]
+    return value
+
+
+def _write_image(match: "re.Match", images: List[str]) -> str:
+    try:
+        data = base64.b64decode(match.group(2), validate=True)
+    except (binascii.Error, ValueError):
+        return match.group(0)
+    extension = {"jpeg": "jpg", "svg+xml": "svg"}.get(match.group(1).lower(), match.group(1).lower())
+    directory = Path(settings.UPLOAD_DIR) / GENERATED_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    filename = f"{uuid.uuid4()}.{extension}"
+    (directory / filename).write_bytes(data)
+    images.append(filename)
+    return f"/uploads/{GENERATED_DIR}/{filename}"
+
+
+def _append_to_file(db: Session, path: Path, ids: List[int]):
+    """Append the rows as one gzip member; synced to disk before they are deleted"""
+    columns = [getattr(ContentGeneration, key) for key in ARCHIVE_COLUMNS]
+    rows = db.execute(select(*columns).where(ContentGeneration.id.in_(ids)).order_by(ContentGeneration.id)).mappings()
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(row), ensure_ascii=False, default=_json_default).encode("utf-8"))
+                archive.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _stored_size(db: Session):
+    """Per-row size of the large columns"""
+    columns = (ContentGeneration.prompt, ContentGeneration.generated_content, ContentGeneration.generation_metadata)
+    if db.get_bind().dialect.name == "postgresql":
+        sizes = [func.coalesce(func.pg_column_size(column), 0) for column in columns]
+    else:
+        sizes = [func.coalesce(func.length(cast(column, Text)), 0) for column in columns]
+    return sizes[0] + sizes[1] + sizes[2]
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value)) if value is not None else 0
+
+
+def _batch_done(report: RetentionReport, progress: Optional[JobProgress], rows: int):
+    report.batches += 1
+    if progress is not None:
+        progress.advance(rows)
+    if tuning.RETENTION_BATCH_PAUSE_MS > 0:
+        # Leave room for replication and regular traffic between batches
+        time.sleep(tuning.RETENTION_BATCH_PAUSE_MS / 1000)
+
+
+def _try_lock(connection: Connection) -> bool:
+    """Session-level advisory lock on Postgres; always granted elsewhere"""
+    if connection.dialect.name != "postgresql":
+        return True
+    locked = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}).scalar()
+    connection.commit()
+    return bool(locked)
+
+
+def _unlock(connection: Connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+        connection.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old generations and compact inline images")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived/compacted")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(run_retention(dry_run=args.dry_run), indent=2))
@@ -0,0 +1,188 @@
+"""
+Full-text search over a user's generations and projects
+
+On Postgres, queries go through websearch_to_tsquery against the GIN-indexed
+search_vector columns (see app.models.search). Ranking uses ts_rank_cd
+normalized to 0..1, so generation and project hits can be merged. Highlights
+come from ts_headline, which runs only on the rows of the requested page.
+Other databases fall back to case-insensitive LIKE matching of every term,
+with highlighting done in Python. Compressed generated content (see
+app.models.compression) is matched by its prompt only.
+
+Snippets are HTML-escaped, with matches wrapped in <mark></mark>.
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+
+from ..models.content import ContentGeneration, ContentType
+from ..models.project import Project
+from ..models.search import SEARCH_CONFIG, SEARCH_MAX_CHARS
+from .project_cleanup import not_in_deleted_project
+
+# Deep pages get expensive for every engine; nobody pages this far through search results
+MAX_OFFSET = 1000
+SNIPPET_CHARS = 240
+
+# ts_headline markers: control characters can't occur in the escaped output, so
+# the text is escaped first and the markers swapped for tags afterwards
+_START, _STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=' … '"
+
+_GENERATION_SEARCH = text(f"""
+    WITH hits AS (
+        SELECT g.id, g.content_type, g.project_id, g.created_at, g.prompt, g.generated_content,
+               ts_rank_cd(g.search_vector, q.query, 32) AS rank, q.query
+        FROM content_generations g, websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS q(query)
+        WHERE g.user_id = :user_id AND g.search_vector @@ q.query
+          AND NOT EXISTS (SELECT 1 FROM projects p WHERE p.id = g.project_id AND p.deleted_at IS NOT NULL)
+        ORDER BY rank DESC, g.id DESC
+        LIMIT :limit
+    )
+    SELECT id, content_type, project_id, created_at, rank, left(prompt, 200) AS title,
+           ts_headline('{SEARCH_CONFIG}', CASE WHEN left(generated_content, 1) = chr(30) THEN left(coalesce(prompt, ''), {SEARCH_MAX_CHARS})
+                                               ELSE left(coalesce(generated_content, prompt, ''), {SEARCH_MAX_CHARS}) END,
+                       query, :options) AS snippet
+    FROM hits
+    ORDER BY rank DESC, id DESC
+""")
+
+_PROJECT_SEARCH = text(f"""
+    WITH hits AS (
+        SELECT p.id, p.created_at, p.name, p.description,
+               ts_rank_cd(p.search_vector, q.query, 32) AS rank, q.query
+        FROM projects p, websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS q(query)
+        WHERE p.owner_id = :user_id AND p.deleted_at IS NULL AND p.search_vector @@ q.query
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit
+    )
+    SELECT id, created_at, rank, name AS title,
+           ts_headline('{SEARCH_CONFIG}', coalesce(description, name, ''), query, :options) AS snippet
+    FROM hits
+    ORDER BY rank DESC, id DESC
+""")
+
+
+def search(
+    db: Session,
+    user_id: int,
+    query: str,
+    scope: str = "all",
+    limit: int = 20,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Best matches for `query` among the user's generations and/or projects"""
+    offset = min(offset, MAX_OFFSET)
+    # Each source returns enough rows to fill the page after merging
+    window = offset + limit
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    results: List[Dict[str, Any]] = []
+    if scope in ("all", "generations"):
+        results += _search_generations_pg(db, user_id, query, window) if postgres else _search_generations_like(db, user_id, query, window)
+    if scope in ("all", "projects"):
+        results += _search_projects_pg(db, user_id, query, window) if postgres else _search_projects_like(db, user_id, query, window)
+
+    results.sort(key=lambda result: result['rank'], reverse=True)
+    return results[offset:window]
+
+
+def _search_generations_pg(db: Session, user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+    rows = db.execute(_GENERATION_SEARCH, {
+        'query': query, 'user_id': user_id, 'limit': limit, 'options': HEADLINE_OPTIONS
+    }).mappings()
+    return [
+        _result("generation", row['id'], row['title'], _highlight_markers(row['snippet']), row['rank'],
+                row['created_at'], content_type=ContentType[row['content_type']].value, project_id=row['project_id'])
+        for row in rows
+    ]
+
+
+def _search_projects_pg(db: Session, user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+    rows = db.execute(_PROJECT_SEARCH, {
+        'query': query, 'user_id': user_id, 'limit': limit, 'options': HEADLINE_OPTIONS
+    }).mappings()
+    return [
+        _result("project", row['id'], row['title'], _highlight_markers(row['snippet']), row['rank'],
+                row['created_at'], project_id=row['id'])
+        for row in rows
+    ]
+
+
+def _search_generations_like(db: Session, user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+    terms = _terms(query)
+    if not terms:
+        return []
+    generations = db.query(ContentGeneration).filter(
+        ContentGeneration.user_id == user_id,
+        not_in_deleted_project(),
+        and_(*(or_(ContentGeneration.prompt.ilike(f"%{term}%"),
+                   ContentGeneration.generated_content.ilike(f"%{term}%")) for term in terms))
+    ).order_by(ContentGeneration.id.desc()).limit(limit).all()
+    return [
+        _result("generation", g.id, (g.prompt or "")[:200], _highlight(g.generated_content or g.prompt, terms),
+                _like_rank(terms, g.prompt, g.generated_content), g.created_at,
+                content_type=g.content_type.value, project_id=g.project_id)
+        for g in generations
+    ]
+
+
+def _search_projects_like(db: Session, user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+    terms = _terms(query)
+    if not terms:
+        return []
+    projects = db.query(Project).filter(
+        Project.owner_id == user_id,
+        Project.deleted_at.is_(None),
+        and_(*(or_(Project.name.ilike(f"%{term}%"), Project.description.ilike(f"%{term}%")) for term in terms))
+    ).order_by(Project.id.desc()).limit(limit).all()
+    return [
+        _result("project", p.id, p.name, _highlight(p.description or p.name, terms),
+                _like_rank(terms, p.name, p.description), p.created_at, project_id=p.id)
+        for p in projects
+    ]
+
+
+def _result(kind: str, id: int, title: Optional[str], snippet: str, rank: float, created_at, **extra) -> Dict[str, Any]:
+    return {
+        'kind': kind,
+        'id': id,
+        'title': title,
+        'snippet': snippet,
+        'rank': round(float(rank), 6),
+        'created_at': created_at,
+        'content_type': None,
+        'project_id': None,
+        **extra,
+    }
+
+
+def _terms(query: str) -> List[str]:
+    return [term for term in re.findall(r"\w+", query.lower()) if term][:10]
+
+
+def _like_rank(terms: List[str], title: Optional[str], body: Optional[str]) -> float:
+    """Title matches weigh more than body matches; normalized to 0..1 like ts_rank_cd(..., 32)"""
+    title, body = (title or "").lower(), (body or "").lower()
+    score = sum(2 * title.count(term) + min(body.count(term), 10) * 0.2 for term in terms)
+    return score / (score + 1)
+
+
+def _highlight_markers(snippet: Optional[str]) -> str:
+    return html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _highlight(content: Optional[str], terms: List[str]) -> str:
+    """A window of `content` around the first match, escaped, with matches marked"""
+    content = content or ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.I)
+    first = pattern.search(content)
+    start = max(0, first.start() - SNIPPET_CHARS // 3) if first else 0
+    window = content[start:start + SNIPPET_CHARS]
+    marked = pattern.sub(lambda m: f"{_START}{m.group(0)}{_STOP}", window)
+    prefix = "… " if start > 0 else ""
+    suffix = " …" if start + SNIPPET_CHARS < len(content) else ""
+    return prefix + _highlight_markers(marked) + suffix
@@ -0,0 +1,287 @@
+"""
+Near-duplicate prompt reuse
+
+Prompts are normalized and embedded locally (no network): character
+trigrams are hashed into a signed 256-dimensional vector, which is
+L2-normalized. Each (user, pipeline, parameters) combination gets its own
+in-memory index of previous completed generations. Generations are only
+compared when every other input (style, platform, audience, ...) is
+identical.
+
+Lookups compare 256-bit SimHash codes of the vectors first (XOR + popcount
+over a column-major uint64 array, ~0.35 ms at 100k entries). The exact
+cosine similarity is then computed only for the few candidates within the
+Hamming distance implied by the threshold. A user's indexes for a pipeline
+are loaded from the database (SIMILARITY_LOAD_LIMIT most recent generations,
+read and embedded on a worker thread) the first time they are used, and grow
+as generations complete. All indexes of a worker share one memory budget
+(SIMILARITY_MAX_MEMORY_MB); the least recently used are dropped when it is
+exceeded. Each worker keeps its own indexes, so a near-duplicate produced by
+another worker is only found after this worker reloads that index.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.database import open_session
+from ..core.tuning import tuning
+from ..models.content import ContentGeneration, ContentType, GenerationStatus
+from .project_cleanup import not_in_deleted_project
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 256
+CODE_BITS = 256
+CODE_WORDS = CODE_BITS // 64
+# Exact cosine is computed for at most this many SimHash candidates
+RERANK_CANDIDATES = 16
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Bytes per index slot: SimHash code, float16 vector and generation id
+ENTRY_BYTES = CODE_WORDS * 8 + DIMENSIONS * 2 + 8
+
+IndexKey = Tuple[int, str, str]
+
+_projection = None
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, punctuation-free, single-spaced, padded for edge trigrams"""
+    return f" {_NON_WORD.sub(' ', prompt.lower()).strip()} "
+
+
+def embed(prompt: str):
+    """Unit-length hashed trigram vector (float32, DIMENSIONS) of a prompt"""
+    import numpy as np
+
+    data = np.frombuffer(normalize_prompt(prompt).encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    grams = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+    # Multiplicative hashing: top bits pick the bucket, a low bit picks the sign
+    hashed = grams * np.uint32(2654435761)
+    buckets = hashed >> np.uint32(32 - int(math.log2(DIMENSIONS)))
+    signs = ((hashed >> np.uint32(11)) & np.uint32(1)).astype(np.float32) * 2 - 1
+    vector = np.bincount(buckets, weights=signs, minlength=DIMENSIONS).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def simhash(vector):
+    """CODE_BITS-bit sign code of random projections, as CODE_WORDS uint64 words"""
+    import numpy as np
+
+    global _projection
+    if _projection is None:
+        # Fixed seed: codes must be comparable across calls and workers
+        _projection = np.random.default_rng(1729).standard_normal((DIMENSIONS, CODE_BITS)).astype(np.float32)
+    return np.packbits(vector @ _projection > 0).view(np.uint64)
+
+
+def hamming_bound(threshold: float) -> int:
+    """Largest Hamming distance that can still belong to a match at `threshold`"""
+    # Expected distance for cosine c is bits * arccos(c) / pi; allow four standard deviations
+    p = math.acos(max(-1.0, min(1.0, threshold))) / math.pi
+    return int(CODE_BITS * p + 4 * math.sqrt(CODE_BITS * p * (1 - p))) + 1
+
+
+def parameters_fingerprint(parameters: Optional[Dict[str, Any]]) -> str:
+    """Stable digest of the generation parameters"""
+    canonical = json.dumps(parameters or {}, sort_keys=True, default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+class PromptIndex:
+    """Vectors and SimHash codes of previous generations; the oldest are overwritten once full"""
+
+    def __init__(self, capacity: int):
+        import numpy as np
+
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self._next = 0
+        self._initial = min(self.capacity, 64)
+        # Column-major codes: one contiguous row per 64-bit word keeps the XOR/popcount scan vectorized
+        self.codes = np.zeros((CODE_WORDS, self._initial), dtype=np.uint64)
+        self.vectors = np.zeros((self._initial, DIMENSIONS), dtype=np.float16)
+        self.ids = np.zeros(self._initial, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays"""
+        return self.codes.nbytes + self.vectors.nbytes + self.ids.nbytes
+
+    def add(self, generation_id: int, vector, code=None):
+        """Index a generation's prompt vector (and its SimHash code, if already computed)"""
+        import numpy as np
+
+        if self._next >= self.ids.shape[0] and self.ids.shape[0] < self.capacity:
+            grown = min(self.capacity, self.ids.shape[0] * 2)
+            self.codes = np.concatenate([self.codes, np.zeros((CODE_WORDS, grown - self.codes.shape[1]), np.uint64)], axis=1)
+            self.vectors = np.concatenate([self.vectors, np.zeros((grown - self.vectors.shape[0], DIMENSIONS), np.float16)])
+            self.ids = np.concatenate([self.ids, np.zeros(grown - self.ids.shape[0], np.int64)])
+        slot = self._next % self.capacity
+        self.codes[:, slot] = simhash(vector) if code is None else code
+        self.vectors[slot] = vector
+        self.ids[slot] = generation_id
+        self._next = slot + 1
+        self.size = min(self.size + 1, self.capacity)
+
+    def nearest(self, vector, threshold: float) -> Optional[Tuple[int, float]]:
+        """(generation_id, cosine similarity) of the closest entry at or above `threshold`"""
+        import numpy as np
+
+        if not self.size:
+            return None
+        code = simhash(vector)
+        distance = np.bitwise_count(self.codes[0, :self.size] ^ code[0]).astype(np.uint16)
+        for word in range(1, CODE_WORDS):
+            distance += np.bitwise_count(self.codes[word, :self.size] ^ code[word])
+
+        candidates = np.flatnonzero(distance <= hamming_bound(threshold))
+        if not candidates.size:
+            return None
+        if candidates.size > RERANK_CANDIDATES:
+            candidates = candidates[np.argpartition(distance[candidates], RERANK_CANDIDATES)[:RERANK_CANDIDATES]]
+        scores = self.vectors[candidates].astype(np.float32) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return int(self.ids[candidates[best]]), float(scores[best])
+
+
+class SimilarityCache:
+    """Per-(user, pipeline, parameters) prompt indexes sharing one memory budget, least recently used dropped first"""
+
+    def __init__(self, max_bytes: int, load_limit: int):
+        self.max_bytes = max(ENTRY_BYTES, max_bytes)
+        self.load_limit = max(0, load_limit)
+        self._indexes: "OrderedDict[IndexKey, PromptIndex]" = OrderedDict()
+        self._bytes = 0
+        self._loads: Dict[Tuple[int, str], asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    async def lookup(
+        self,
+        user_id: int,
+        pipeline: str,
+        content_type: ContentType,
+        prompt: str,
+        parameters: Optional[Dict[str, Any]]
+    ) -> Optional[Tuple[int, float]]:
+        """Closest previous generation of this user/pipeline/parameters above SIMILARITY_THRESHOLD"""
+        key = (user_id, pipeline, parameters_fingerprint(parameters))
+        await self._ensure_loaded(user_id, pipeline, content_type)
+        index = self._indexes.get(key)
+        match = index.nearest(embed(prompt), tuning.SIMILARITY_THRESHOLD) if index is not None else None
+        if match is None:
+            self.misses += 1
+        else:
+            self._indexes.move_to_end(key)
+            self.hits += 1
+        return match
+
+    def add(self, user_id: int, pipeline: str, generation_id: int, prompt: str, parameters: Optional[Dict[str, Any]]):
+        """Index a completed generation"""
+        self._add((user_id, pipeline, parameters_fingerprint(parameters)), generation_id, embed(prompt))
+
+    def _add(self, key: IndexKey, generation_id: int, vector, code=None):
+        index = self._indexes.get(key)
+        if index is None:
+            # A single index may use the whole budget; beyond that it overwrites its oldest entries
+            index = self._indexes[key] = PromptIndex(self.max_bytes // ENTRY_BYTES)
+            self._bytes += index.nbytes
+        self._indexes.move_to_end(key)
+        before = index.nbytes
+        index.add(generation_id, vector, code)
+        self._bytes += index.nbytes - before
+        while self._bytes > self.max_bytes and len(self._indexes) > 1:
+            evicted_key, evicted = self._indexes.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evicted += 1
+            # Reload the whole user/pipeline next time so the evicted index comes back complete
+            load = self._loads.get(evicted_key[:2])
+            if load is not None and load.done():
+                del self._loads[evicted_key[:2]]
+
+    async def _ensure_loaded(self, user_id: int, pipeline: str, content_type: ContentType):
+        """Index the user's most recent completed generations of this pipeline, once"""
+        pair = (user_id, pipeline)
+        load = self._loads.get(pair)
+        if load is None:
+            for key in [key for key in self._indexes if key[:2] == pair]:
+                self._bytes -= self._indexes.pop(key).nbytes
+            load = self._loads[pair] = asyncio.get_running_loop().create_task(self._load(pair, content_type))
+        # Concurrent lookups share the load; a cancelled request doesn't cancel it
+        await asyncio.shield(load)
+
+    async def _load(self, pair: Tuple[int, str], content_type: ContentType):
+        try:
+            entries = await asyncio.to_thread(_read_prompts, pair[0], content_type, self.load_limit)
+        except Exception as e:
+            logger.error(f"Error loading similarity index of user {pair[0]} ({pair[1]}): {e}")
+            self._loads.pop(pair, None)
+            return
+        for generation_id, fingerprint, vector, code in entries:
+            self._add((*pair, fingerprint), generation_id, vector, code)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache metrics"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': tuning.SIMILARITY_CACHE_ENABLED,
+            'threshold': tuning.SIMILARITY_THRESHOLD,
+            'indexes': len(self._indexes),
+            'entries': sum(index.size for index in self._indexes.values()),
+            'memory_mb': round(self._bytes / 1024 ** 2, 1),
+            'max_memory_mb': round(self.max_bytes / 1024 ** 2, 1),
+            'evicted_indexes': self.evicted,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+        }
+
+
+def _read_prompts(user_id: int, content_type: ContentType, limit: int) -> List[Tuple[int, str, Any, Any]]:
+    """(id, parameters fingerprint, vector, code) of the user's most recent completed generations, oldest first.
+
+    Runs on a worker thread with its own session.
+    """
+    db = open_session()
+    try:
+        rows = db.query(ContentGeneration.id, ContentGeneration.prompt, ContentGeneration.parameters).filter(
+            ContentGeneration.user_id == user_id,
+            ContentGeneration.content_type == content_type,
+            ContentGeneration.status == GenerationStatus.COMPLETED,
+            ContentGeneration.prompt.isnot(None),
+            not_in_deleted_project()
+        ).order_by(ContentGeneration.id.desc()).limit(limit).all()
+    finally:
+        db.close()
+    entries = []
+    # Oldest first, so the newest survive if an index overflows
+    for generation_id, prompt, parameters in reversed(rows):
+        vector = embed(prompt)
+        entries.append((generation_id, parameters_fingerprint(parameters), vector, simhash(vector)))
+    return entries
+
+
+# Global instance, created on first use
+_similarity_cache: Optional[SimilarityCache] = None
+
+def get_similarity_cache() -> SimilarityCache:
+    """Get the shared similarity cache"""
+    global _similarity_cache
+    if _similarity_cache is None:
+        _similarity_cache = SimilarityCache(
+            max_bytes=tuning.SIMILARITY_MAX_MEMORY_MB * 1024 ** 2,
+            load_limit=tuning.SIMILARITY_LOAD_LIMIT,
+        )
+    return _similarity_cache
@@ -0,0 +1,123 @@
+"""
+Structured storage of parsed generation results
+
+Runs once after a text generation completes: the generated JSON is parsed
+and written to MarketingPlan / SEOAnalysis rows plus one ContentTag row per
+hashtag and keyword, so clients can query them as indexed SQL instead of
+re-parsing generated_content.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.content import ContentTag, MarketingGoal, MarketingPlan, SEOAnalysis, TagKind
+from .generation_repository import GenerationRecord
+from .result_parser import (
+    extract_hashtags, extract_keywords, find_value, find_values, parse_json_result, strings_in
+)
+
+logger = logging.getLogger(__name__)
+
+
+def store_tags(db: Session, generation: GenerationRecord, inputs: Dict[str, Any]):
+    """Store the hashtags and keywords of a generated document"""
+    document = _parse(generation)
+    if document is None:
+        return
+    _add_tags(db, generation, document)
+    db.commit()
+
+
+def store_marketing_plan(db: Session, generation: GenerationRecord, inputs: Dict[str, Any]):
+    """Store a generated marketing plan as a MarketingPlan row plus its tags"""
+    document = _parse(generation)
+    if document is None:
+        return
+
+    goal = _marketing_goal(inputs.get('goal'))
+    if goal is None:
+        logger.info(f"Generation {generation.id}: goal '{inputs.get('goal')}' is not a MarketingGoal, plan row skipped")
+    else:
+        db.add(MarketingPlan(
+            user_id=generation.user_id,
+            project_id=generation.project_id,
+            generation_id=generation.id,
+            goal=goal,
+            target_audience=inputs.get('target_audience'),
+            budget_range=inputs.get('budget_range'),
+            timeline=inputs.get('timeline'),
+            strategy=_as_text(find_value(document, "strategy", "positioning")),
+            tactics=strings_in(find_values(document, "tactic")) or None,
+            content_calendar=find_value(document, "calendar", "timeline", "schedule"),
+            seo_keywords=extract_keywords(document) or None,
+        ))
+    _add_tags(db, generation, document)
+    db.commit()
+
+
+def store_seo_analysis(db: Session, generation: GenerationRecord, inputs: Dict[str, Any]):
+    """Store generated SEO content as an SEOAnalysis row plus its tags"""
+    document = _parse(generation)
+    if document is None:
+        return
+
+    suggestions = {
+        "title": find_value(document, "title"),
+        "description": find_value(document, "productdescription"),
+        "captions": find_value(document, "caption"),
+        "alt_text": find_value(document, "alttext"),
+    }
+    db.add(SEOAnalysis(
+        user_id=generation.user_id,
+        project_id=generation.project_id,
+        generation_id=generation.id,
+        keywords=extract_keywords(document) or None,
+        content_suggestions={key: value for key, value in suggestions.items() if value is not None} or None,
+        meta_descriptions=strings_in(find_values(document, "metadescription")) or None,
+        hashtag_recommendations=extract_hashtags(document) or None,
+    ))
+    _add_tags(db, generation, document)
+    db.commit()
+
+
+def _parse(generation: GenerationRecord) -> Optional[Any]:
+    document = parse_json_result(generation.generated_content)
+    if document is None:
+        logger.warning(f"Generation {generation.id}: no JSON found in the generated content")
+    return document
+
+
+def _add_tags(db: Session, generation: GenerationRecord, document: Any):
+    rows: List[Dict[str, Any]] = [
+        {
+            'user_id': generation.user_id,
+            'project_id': generation.project_id,
+            'generation_id': generation.id,
+            'kind': kind,
+            'value': value,
+        }
+        for kind, values in (
+            (TagKind.HASHTAG, extract_hashtags(document)),
+            (TagKind.KEYWORD, extract_keywords(document)),
+        )
+        for value in values
+    ]
+    if rows:
+        # One executemany for all tags of the generation
+        db.execute(insert(ContentTag), rows)
+
+
+def _marketing_goal(goal: Optional[str]) -> Optional[MarketingGoal]:
+    try:
+        return MarketingGoal((goal or "").strip().lower())
+    except ValueError:
+        return None
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,128 @@
+"""
+Training of per-content-type compression dictionaries, and recompression
+
+Dictionaries are trained from the most recent completed generations of each
+content type and stored in compression_dictionaries (see
+app.models.compression). Training again adds a newer dictionary; rows
+encoded with older ones stay readable.
+
+Existing plain rows are only compressed when rewritten; `recompress` does
+that in small batches for the whole table. It compares with the stored
+form, so it also decompresses rows that should be plain (compression off,
+or inline images compressed before they were excluded):
+
+    python -m app.services.text_compression train
+    python -m app.services.text_compression recompress
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Text, type_coerce, update
+from sqlalchemy.orm import Session
+
+from ..core.database import open_session
+from ..core.tuning import tuning
+from ..models.compression import CompressionDictionary, decode_text, encode_text, load_dictionaries
+from ..models.content import ContentGeneration, ContentType, GenerationStatus
+
+logger = logging.getLogger(__name__)
+
+# Fewer samples than this make a dictionary that doesn't beat plain zstd
+MIN_TRAINING_SAMPLES = 20
+# Content types whose output is long text (image types store short captions)
+TEXT_CONTENT_TYPES = [ContentType.SEO_CAPTION, ContentType.CONTENT_PLAN, ContentType.MARKETING_PLAN]
+
+
+def train_dictionaries(db: Session, content_types: Optional[List[ContentType]] = None) -> List[Dict[str, Any]]:
+    """Train and store a new dictionary per content type; returns one report per type"""
+    import zstandard
+
+    reports = []
+    for content_type in content_types or TEXT_CONTENT_TYPES:
+        samples = [
+            content.encode("utf-8") for (content,) in db.query(ContentGeneration.generated_content).filter(
+                ContentGeneration.content_type == content_type,
+                ContentGeneration.status == GenerationStatus.COMPLETED,
+                ContentGeneration.generated_content.isnot(None)
+            ).order_by(ContentGeneration.id.desc()).limit(tuning.TEXT_COMPRESSION_TRAINING_SAMPLES)
+            if content
+        ]
+        report: Dict[str, Any] = {'content_type': content_type.value, 'samples': len(samples)}
+        reports.append(report)
+        if len(samples) < MIN_TRAINING_SAMPLES:
+            report['skipped'] = f"Fewer than {MIN_TRAINING_SAMPLES} samples"
+            continue
+
+        started = time.perf_counter()
+        dictionary = zstandard.train_dictionary(tuning.TEXT_COMPRESSION_DICT_SIZE, samples)
+        row = CompressionDictionary(content_type=content_type.value, data=dictionary.as_bytes(), sample_count=len(samples))
+        db.add(row)
+        db.commit()
+
+        # In-sample ratio; a rough guide, new content compresses slightly worse
+        plain = zstandard.ZstdCompressor(level=tuning.TEXT_COMPRESSION_LEVEL)
+        trained = zstandard.ZstdCompressor(level=tuning.TEXT_COMPRESSION_LEVEL, dict_data=dictionary)
+        total = sum(len(sample) for sample in samples)
+        report.update({
+            'dictionary_id': row.id,
+            'dictionary_bytes': len(row.data),
+            'ratio_without_dictionary': round(total / sum(len(plain.compress(s)) for s in samples), 2),
+            'ratio_with_dictionary': round(total / sum(len(trained.compress(s)) for s in samples), 2),
+            'training_ms': round((time.perf_counter() - started) * 1000),
+        })
+        logger.info(f"Trained compression dictionary {row.id} for {content_type.value} from {len(samples)} samples")
+
+    load_dictionaries(reload=True)
+    return reports
+
+
+def recompress(batch_size: int = 500) -> Dict[str, int]:
+    """Rewrite generated_content of all rows with the current codec settings, in batches"""
+    rows = changed = 0
+    last_id = 0
+    db = open_session()
+    try:
+        while True:
+            # The stored form, not decoded by the column type
+            stored_content = type_coerce(ContentGeneration.generated_content, Text)
+            batch = db.query(ContentGeneration.id, stored_content).filter(
+                ContentGeneration.id > last_id,
+                ContentGeneration.generated_content.isnot(None)
+            ).order_by(ContentGeneration.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            # Only rows whose stored form changes are written
+            updates = []
+            for generation_id, stored in batch:
+                target = encode_text(decode_text(stored))
+                if target != stored:
+                    updates.append({'id': generation_id, 'generated_content': target})
+            if updates:
+                db.execute(update(ContentGeneration), updates)
+            db.commit()
+            rows += len(batch)
+            changed += len(updates)
+    finally:
+        db.close()
+    logger.info(f"Rewrote {changed} of {rows} generations")
+    return {'rows': rows, 'rewritten': changed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compression dictionaries for generated content")
+    parser.add_argument("command", choices=["train", "recompress"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "train":
+        session = open_session()
+        try:
+            print(json.dumps(train_dictionaries(session), indent=2))
+        finally:
+            session.close()
+    else:
+        print(json.dumps(recompress(args.batch_size), indent=2))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Instrumented API server for benchmarks
+
+Runs app.main:app on a single uvicorn worker with extra measurement that the
+load generator reads between scenarios:
+
+    GET  /_bench/stats    event-loop lag, DB statements, requests served, memory
+    POST /_bench/reset    start a new measurement window
+
+Started by benchmarks.api_throughput; configure it through the usual
+environment variables (DATABASE_URL, OPENROUTER_BASE_URL, ...).
+
+Usage:
+    python -m benchmarks.bench_server --port 8001
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+from typing import List
+
+from .common import latency_summary
+
+LOOP_LAG_INTERVAL = 0.01
+
+
+class BenchStats:
+    """Counters for the current measurement window"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.statements = 0
+        self.loop_lag: List[float] = []
+        _reset_peak_rss()
+
+    def snapshot(self) -> dict:
+        requests = self.requests or 1
+        return {
+            'window_s': round(time.perf_counter() - self.started, 2),
+            'requests': self.requests,
+            'db_statements': self.statements,
+            'db_statements_per_request': round(self.statements / requests, 2),
+            'loop_lag': latency_summary(self.loop_lag),
+            'rss_mb': round(_current_rss_bytes() / 2**20, 1),
+            'peak_rss_mb': round(_peak_rss_bytes() / 2**20, 1),
+        }
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def _peak_rss_bytes() -> int:
+    """Peak RSS since the last reset (Linux VmHWM), else since process start"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux only)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def instrument(app, stats: BenchStats):
+    """Wrap the ASGI app with request counting, loop-lag sampling and /_bench routes"""
+    from sqlalchemy import event
+    from starlette.responses import JSONResponse
+
+    from app.core.database import get_engine
+
+    @event.listens_for(get_engine(), "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        stats.statements += 1
+
+    async def sample_loop_lag():
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            stats.loop_lag.append(max(0.0, time.perf_counter() - expected))
+
+    lag_task = None
+
+    async def bench_app(scope, receive, send):
+        nonlocal lag_task
+        if scope["type"] == "lifespan":
+            await app(scope, receive, send)
+            return
+        if lag_task is None:
+            lag_task = asyncio.get_running_loop().create_task(sample_loop_lag())
+        if scope["type"] == "http" and scope["path"].startswith("/_bench/"):
+            if scope["path"] == "/_bench/reset" and scope["method"] == "POST":
+                stats.reset()
+                response = JSONResponse({"reset": True})
+            elif scope["path"] == "/_bench/stats":
+                response = JSONResponse(stats.snapshot())
+            else:
+                response = JSONResponse({"detail": "Not Found"}, status_code=404)
+            await response(scope, receive, send)
+            return
+        if scope["type"] == "http":
+            stats.requests += 1
+        await app(scope, receive, send)
+
+    return bench_app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Instrumented API server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    from app.main import app
+
+    uvicorn.run(instrument(app, BenchStats()), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Shared helpers for benchmark scripts
+"""
+import json
+import math
+import socket
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(samples_seconds: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds"""
+    return {
+        'count': len(samples_seconds),
+        'p50_ms': round(percentile(samples_seconds, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples_seconds, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples_seconds, 99) * 1000, 2),
+        'max_ms': round(max(samples_seconds, default=0.0) * 1000, 2),
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    """Write benchmark results as JSON"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {path}")
+
+
+def free_port() -> int:
+    """An unused localhost TCP port for a helper server"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for per-request AIService and APIKeyManager functions
+
+Times image encoding (_encode_image_to_base64 across sizes and formats),
+image extraction from responses with large inline base64 (the regex path),
+key selection/rotation/error marking with 1-100 keys, and the model display
+name lookup done after every upstream call, plus prompt embedding and
+near-duplicate lookups in the similarity index at 10k and 100k entries.
+
+Results are compared against a tracked baseline (benchmarks/baselines/
+hot_paths.json) on the fastest round, which is the least noisy statistic for
+micro-benchmarks; a case slower than the baseline by more than the tolerance
+fails the run. Timings are absolute, so the baseline records the host it was
+measured on (see host_fingerprint). On another host the ratios are printed
+but do not fail the run unless --strict is given; refresh the baseline with
+--update-baseline on the machine that runs the comparison.
+
+Usage:
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --filter key_manager --tolerance 0.3
+    python -m benchmarks.hot_paths --update-baseline
+    python -m benchmarks.hot_paths --strict
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .common import write_results
+from .mock_openrouter import make_png_data_url
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+
+IMAGE_SIDES = [256, 1024, 2048]
+IMAGE_FORMATS = ["PNG", "JPEG", "WEBP"]
+INLINE_IMAGE_KB = [64, 1024, 4096]
+KEY_COUNTS = [1, 10, 100]
+SIMILARITY_INDEX_SIZES = [10_000, 100_000]
+
+
+def _image_bytes(side: int, fmt: str) -> bytes:
+    """A photo-like test image: a gradient with noise, saved in the given format"""
+    from PIL import Image
+
+    rng = random.Random(side)
+    gradient = Image.linear_gradient("L").resize((side, side))
+    noise = Image.frombytes("L", (side, side), rng.randbytes(side * side))
+    image = Image.merge("RGB", (gradient, noise, gradient.rotate(90)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _inline_response(size_kb: int) -> Dict[str, Any]:
+    data_url = make_png_data_url(size_kb * 1024)
+    content = "Here is your product render.\n\n" + f"![render]({data_url})\n\n" + "Lighting: soft studio. " * 50
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+def _message_images_response(size_kb: int) -> Dict[str, Any]:
+    data_url = make_png_data_url(size_kb * 1024)
+    return {"choices": [{"message": {
+        "role": "assistant",
+        "content": "Here is your product render.",
+        "images": [{"type": "image_url", "image_url": {"url": data_url}}],
+    }}]}
+
+
+def _key_manager(count: int, benched: int = 0):
+    """A manager with `count` keys, the first `benched` of them rate limited for a day"""
+    from app.services.api_key_manager import APIKeyManager
+
+    manager = APIKeyManager([f"sk-or-bench-{i:04d}" for i in range(count)])
+    for index in range(benched):
+        manager.key_status[index]['active'] = False
+        manager.key_status[index]['rate_limit_reset'] = datetime.now() + timedelta(days=1)
+    return manager
+
+
+def _random_prompt(rng: random.Random, vocabulary: List[str]) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(10, 40)))
+
+
+def _similarity_index(size: int, rng: random.Random, vocabulary: List[str]):
+    """An index of `size` distinct random prompts"""
+    from app.services.similarity_cache import PromptIndex, embed
+
+    index = PromptIndex(size)
+    for generation_id in range(size):
+        index.add(generation_id, embed(_random_prompt(rng, vocabulary)))
+    return index
+
+
+def build_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) for every benchmark case"""
+    from app.core.config import FREE_VISION_MODELS
+    from app.services.ai_service import AIService
+
+    service = AIService()
+    cases: List[Tuple[str, Callable[[], Any]]] = []
+
+    for fmt in IMAGE_FORMATS:
+        for side in IMAGE_SIDES:
+            data = _image_bytes(side, fmt)
+            cases.append((f"encode_image/{fmt.lower()}/{side}px", lambda data=data: service._encode_image_to_base64(data)))
+
+    for size_kb in INLINE_IMAGE_KB:
+        inline = _inline_response(size_kb)
+        cases.append((f"extract_images/inline/{size_kb}kb", lambda r=inline: service._extract_images(r)))
+        attached = _message_images_response(size_kb)
+        cases.append((f"extract_images/message/{size_kb}kb", lambda r=attached: service._extract_images(r)))
+
+    for count in KEY_COUNTS:
+        healthy = _key_manager(count)
+        cases.append((f"key_manager/get_current_key/{count}_keys", healthy.get_current_key))
+        cases.append((f"key_manager/get_next_key/{count}_keys", healthy.get_next_key))
+        # Worst case: every key but the last is benched, so each selection scans them all
+        benched = _key_manager(count, benched=count - 1)
+
+        def select_from_start(manager=benched):
+            manager.current_key_index = 0
+            return manager.get_current_key()
+
+        cases.append((f"key_manager/get_current_key_benched/{count}_keys", select_from_start))
+        erroring = _key_manager(count)
+        last_key = erroring.api_keys[-1]
+
+        def mark_error(manager=erroring, key=last_key):
+            manager.mark_key_error(key, "HTTP 502")
+            manager.key_status[len(manager.api_keys) - 1].update(error_count=0, active=True)
+
+        cases.append((f"key_manager/mark_key_error/{count}_keys", mark_error))
+
+    for name, model in FREE_VISION_MODELS.items():
+        cases.append((f"model_display_name/{model.split('/')[0]}", lambda m=model: service._model_display_name(m)))
+    cases.append(("model_display_name/unknown", lambda: service._model_display_name("vendor/unknown-model")))
+
+    from app.services.similarity_cache import embed
+
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    prompt = _random_prompt(rng, vocabulary)
+    cases.append(("similarity/embed", lambda: embed(prompt)))
+    query = embed(prompt)
+    for size in SIMILARITY_INDEX_SIZES:
+        index = _similarity_index(size, rng, vocabulary)
+        cases.append((f"similarity/nearest/{size}_entries", lambda index=index: index.nearest(query, 0.92)))
+    return cases
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """Per-call timings in microseconds over `repeat` rounds of at least `min_time` seconds"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    rounds = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'median_us': round(statistics.median(rounds), 3),
+        'min_us': round(min(rounds), 3),
+        'max_us': round(max(rounds), 3),
+        'loops': number,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Names of cases slower than baseline by more than the tolerance"""
+    regressions = []
+    for name, timing in results.items():
+        reference = baseline.get('cases', {}).get(name)
+        if not reference:
+            continue
+        ratio = timing['min_us'] / reference['min_us']
+        timing['baseline_min_us'] = reference['min_us']
+        timing['ratio'] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def host_fingerprint() -> Dict[str, Any]:
+    """What makes absolute timings comparable: machine, CPU and interpreter"""
+    return {
+        'node': platform.node(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def _load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for AIService and APIKeyManager hot paths")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail on regressions even when the baseline was measured on another host")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    import logging
+    logging.basicConfig(level=logging.CRITICAL)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in build_cases():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.repeat, args.min_time)
+
+    baseline = None if args.update_baseline else _load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    same_host = baseline is not None and baseline.get('host') == host_fingerprint()
+
+    width = max(len(name) for name in results) if results else 0
+    for name, timing in results.items():
+        line = f"{name:<{width}}  {timing['min_us']:>12.3f} us  (median {timing['median_us']:.3f})"
+        if 'ratio' in timing:
+            line += f"  x{timing['ratio']:.2f} vs baseline"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+    if regressions and not (same_host or args.strict):
+        print(f"Baseline was measured on another host ({(baseline.get('host') or {}).get('node', 'unknown')}); "
+              f"ratios are informational, use --strict to enforce them or --update-baseline to refresh")
+
+    report = {
+        'benchmark': 'hot_paths', 'host': host_fingerprint(), 'baseline_same_host': same_host,
+        'tolerance': args.tolerance, 'cases': results, 'regressions': regressions,
+    }
+    if args.update_baseline:
+        # Keep cases that were filtered out of this run
+        existing = _load_baseline(args.baseline) or {'cases': {}}
+        if existing.get('host') != host_fingerprint():
+            # Timings from another host are not comparable with these
+            existing['cases'] = {}
+        existing['cases'].update({
+            name: {'min_us': t['min_us'], 'median_us': t['median_us']} for name, t in results.items()
+        })
+        existing['benchmark'] = 'hot_paths'
+        existing['host'] = host_fingerprint()
+        write_results(args.baseline, existing)
+    if args.output:
+        write_results(args.output, report)
+    if regressions and (same_host or args.strict):
+        raise SystemExit(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check
+
+Imports the application in a fresh interpreter with `-X importtime`, reports
+the slowest modules and fails (exit code 1) when the total exceeds the budget
+or when a module that should only load on first use is imported eagerly.
+
+The repo has no test suite, so this is the CI gate for lazy imports. Timing
+depends on the machine; `--budget-ms 0` checks only the eager imports, which
+is deterministic.
+
+Usage:
+    python -m benchmarks.import_time --budget-ms 1500
+    python -m benchmarks.import_time --budget-ms 0
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from .common import write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of the import path of the app
+LAZY_MODULES = ["PIL", "httpx", "passlib", "bcrypt", "jose", "asyncpg", "alembic"]
+
+
+def measure(target: str) -> Tuple[List[Tuple[str, int, int]], int]:
+    """Return (module, self_us, cumulative_us) rows and the top-level cumulative time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit(f"Importing {target} failed")
+
+    rows = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        module = name.rstrip()
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+        # Top-level imports are not indented
+        if not module.startswith("  ") and module.strip() == target:
+            total_us = int(cumulative_us)
+    return rows, total_us
+
+
+def eager_imports(rows: List[Tuple[str, int, int]]) -> List[str]:
+    """LAZY_MODULES (or any of their submodules) that were imported"""
+    imported = {name.split(".")[0] for name, _, _ in rows}
+    return [m for m in LAZY_MODULES if m in imported]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--target", default="app.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="0 disables the time budget")
+    parser.add_argument("--top", type=int, default=15, help="Show the N slowest modules")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    rows, total_us = measure(args.target)
+    eager = eager_imports(rows)
+
+    print(f"Import of {args.target}: {total_us / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Slowest {args.top} modules by cumulative time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failures: Dict[str, object] = {}
+    if args.budget_ms > 0 and total_us / 1000 > args.budget_ms:
+        failures['budget_exceeded_ms'] = round(total_us / 1000 - args.budget_ms, 1)
+    if eager:
+        failures['eager_imports'] = eager
+        print(f"Modules that should load lazily were imported: {', '.join(eager)}")
+
+    if args.output:
+        write_results(args.output, {
+            'benchmark': 'import_time',
+            'target': args.target,
+            'total_ms': round(total_us / 1000, 1),
+            'budget_ms': args.budget_ms,
+            'failures': failures,
+        })
+
+    if failures:
+        raise SystemExit(1)
+    print("Import-time budget OK")
+
+
+if __name__ == "__main__":
+    main()
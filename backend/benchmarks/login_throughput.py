@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark
+
+Drives concurrent logins against a running API while a steady stream of
+project-list requests runs alongside, and reports logins per second together
+with the project API latency seen during the burst.
+
+Usage:
+    python -m benchmarks.login_throughput --base-url http://localhost:8000 \\
+        --username bench --password bench-password --concurrency 32 --duration 20
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+from .common import latency_summary, write_results
+
+
+async def _get_token(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _login_worker(client, args, deadline: float, latencies: List[float], errors: List[int]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/v1/auth/login",
+            data={"username": args.username, "password": args.password}
+        )
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(response.status_code)
+
+
+async def _project_load(client, token: str, rate: float, deadline: float, latencies: List[float], errors: List[int]):
+    """Issue project-list requests at a fixed rate, independent of response time"""
+    headers = {"Authorization": f"Bearer {token}"}
+    interval = 1.0 / rate
+    in_flight = set()
+
+    async def one_request():
+        started = time.perf_counter()
+        response = await client.get("/api/v1/projects/", headers=headers)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(response.status_code)
+
+    next_tick = time.perf_counter()
+    while next_tick < deadline:
+        task = asyncio.create_task(one_request())
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        next_tick += interval
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency + 64)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        token = await _get_token(client, args.username, args.password)
+
+        login_latencies: List[float] = []
+        login_errors: List[int] = []
+        project_latencies: List[float] = []
+        project_errors: List[int] = []
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            _project_load(client, token, args.project_rps, deadline, project_latencies, project_errors),
+            *[
+                _login_worker(client, args, deadline, login_latencies, login_errors)
+                for _ in range(args.concurrency)
+            ]
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        'benchmark': 'login_throughput',
+        'concurrency': args.concurrency,
+        'duration_s': round(elapsed, 2),
+        'logins_per_second': round(len(login_latencies) / elapsed, 2),
+        'login_latency': latency_summary(login_latencies),
+        'login_errors': len(login_errors),
+        'project_rps_target': args.project_rps,
+        'project_latency': latency_summary(project_latencies),
+        'project_errors': len(project_errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent login workers")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run")
+    parser.add_argument("--project-rps", type=float, default=20.0, help="Steady project API request rate")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for key, value in results.items():
+        print(f"{key}: {value}")
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
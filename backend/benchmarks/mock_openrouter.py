@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Local OpenRouter stand-in
+
+Serves the chat-completions shape read by AIService._extract_content and
+_extract_images, with configurable latency, streaming, per-key daily limits
+(429 `free-models-per-day` plus X-RateLimit-* headers), model outages, 5xx
+bursts and base64 image payloads. Point the app at it with
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8099/api/v1/chat/completions
+
+Behaviour comes from a named scenario (see SCENARIOS) or a JSON file, and can
+be changed at runtime through the /_mock endpoints:
+
+    GET  /_mock/config    current configuration
+    PUT  /_mock/config    replace it (body: config JSON or {"scenario": name})
+    GET  /_mock/stats     requests per key / model / status
+    POST /_mock/reset     clear counters and per-key usage
+
+Usage:
+    python -m benchmarks.mock_openrouter --port 8099 --scenario key_exhaustion
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import struct
+import time
+import uuid
+import zlib
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_COMPLETIONS_PATH = "/api/v1/chat/completions"
+
+PRIMARY_MODEL = "google/gemini-2.5-flash-image-preview:free"
+BACKUP_MODEL = "qwen/qwen2.5-vl-72b-instruct:free"
+
+FREE_MODELS_PER_DAY_MESSAGE = (
+    "Rate limit exceeded: free-models-per-day. "
+    "Add 10 credits to unlock 1000 free model requests per day"
+)
+
+
+@dataclass
+class MockConfig:
+    """Upstream behaviour; every field can be set from a scenario or JSON file"""
+    # Latency: {"dist": "fixed", "ms": 200} | {"dist": "uniform", "min_ms": .., "max_ms": ..}
+    #          {"dist": "normal", "mean_ms": .., "stddev_ms": ..} | {"dist": "lognormal", "median_ms": .., "sigma": ..}
+    latency: Dict[str, Any] = field(default_factory=lambda: {"dist": "lognormal", "median_ms": 300, "sigma": 0.4})
+    model_latency: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Streaming (request "stream": true)
+    stream_chunk_chars: int = 40
+    stream_chunk_delay_ms: float = 20.0
+    # Per-key requests per UTC day before 429 free-models-per-day; 0 = unlimited
+    key_daily_limit: int = 0
+    exhausted_keys: List[str] = field(default_factory=list)
+    # Model id -> status returned for every request (429 = provider rate limit, 5xx = outage)
+    down_models: Dict[str, int] = field(default_factory=dict)
+    # Random 5xx probability, plus deterministic bursts: burst_length errors every burst_every requests
+    error_rate: float = 0.0
+    error_status: int = 502
+    burst_every: int = 0
+    burst_length: int = 0
+    # Images: "none", "message" (message.images) or "inline" (data URL in content)
+    image_mode: str = "none"
+    image_bytes: int = 256 * 1024
+    image_count: int = 1
+    content_chars: int = 600
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MockConfig":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown mock config fields: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "healthy": {},
+    "slow": {"latency": {"dist": "lognormal", "median_ms": 2500, "sigma": 0.6}},
+    "streaming": {"stream_chunk_chars": 20, "stream_chunk_delay_ms": 50},
+    # Each key answers 3 requests, then 429 free-models-per-day until tomorrow
+    "key_exhaustion": {"latency": {"dist": "fixed", "ms": 20}, "key_daily_limit": 3},
+    # Primary model is down (503); the backup model answers
+    "model_outage": {"latency": {"dist": "fixed", "ms": 20}, "down_models": {PRIMARY_MODEL: 503}},
+    # Primary model is rate limited by its provider (429 without free-models-per-day)
+    "model_rate_limited": {"latency": {"dist": "fixed", "ms": 20}, "down_models": {PRIMARY_MODEL: 429}},
+    "error_bursts": {"latency": {"dist": "fixed", "ms": 20}, "burst_every": 10, "burst_length": 3},
+    "flaky": {"error_rate": 0.1, "error_status": 500},
+    "image_heavy": {"image_mode": "message", "image_bytes": 1536 * 1024},
+    "image_inline": {"image_mode": "inline", "image_bytes": 512 * 1024},
+}
+
+
+def load_config(scenario: Optional[str] = None, path: Optional[str] = None, **overrides) -> MockConfig:
+    """Build a config from a named scenario and/or JSON file, then overrides"""
+    data: Dict[str, Any] = {}
+    if scenario:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{scenario}', choose from: {', '.join(SCENARIOS)}")
+        data.update(SCENARIOS[scenario])
+    if path:
+        with open(path) as f:
+            data.update(json.load(f))
+    data.update(overrides)
+    return MockConfig.from_dict(data)
+
+
+def sample_latency(spec: Dict[str, Any], rng: random.Random) -> float:
+    """Draw a latency in seconds from a distribution spec"""
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        ms = spec.get("ms", 0)
+    elif dist == "uniform":
+        ms = rng.uniform(spec.get("min_ms", 0), spec.get("max_ms", 0))
+    elif dist == "normal":
+        ms = rng.gauss(spec.get("mean_ms", 0), spec.get("stddev_ms", 0))
+    elif dist == "lognormal":
+        ms = rng.lognormvariate(math.log(max(spec.get("median_ms", 1), 1e-3)), spec.get("sigma", 0.0))
+    else:
+        raise ValueError(f"Unknown latency distribution '{dist}'")
+    return max(0.0, ms) / 1000
+
+
+def _png_chunk(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+
+@lru_cache(maxsize=8)
+def make_png_data_url(target_bytes: int) -> str:
+    """A valid noise PNG of roughly target_bytes, as a data URL (cached per size)"""
+    side = max(1, int(math.sqrt(max(target_bytes, 3) / 3)))
+    rng = random.Random(target_bytes)
+    rows = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(rows, 1))
+        + _png_chunk(b"IEND", b"")
+    )
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def _next_utc_midnight() -> datetime:
+    now = datetime.now(timezone.utc)
+    return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class MockState:
+    """Mutable server state: config, per-key usage and counters"""
+
+    def __init__(self, config: MockConfig):
+        self.configure(config)
+
+    def configure(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.reset()
+
+    def reset(self):
+        self.request_count = 0
+        self.key_usage: Dict[str, int] = {}
+        self.by_key: Dict[str, Dict[str, int]] = {}
+        self.by_model: Dict[str, Dict[str, int]] = {}
+        self.by_status: Dict[str, int] = {}
+
+    def record(self, key: str, model: str, status: int):
+        self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+        for bucket, name in ((self.by_key, key), (self.by_model, model)):
+            counts = bucket.setdefault(name, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.request_count,
+            'by_status': self.by_status,
+            'by_key': {_mask(k): v for k, v in self.by_key.items()},
+            'by_model': self.by_model,
+        }
+
+
+def _mask(key: str) -> str:
+    return key[-8:]
+
+
+def _error(status: int, message: str, response_headers: Dict[str, str], **metadata) -> JSONResponse:
+    body: Dict[str, Any] = {"error": {"message": message, "code": status}}
+    if metadata:
+        body["error"]["metadata"] = metadata
+    return JSONResponse(body, status_code=status, headers=response_headers)
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    """Text of the last user message, whether plain or multi-part"""
+    for message in reversed(messages or []):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return ""
+
+
+def _completion_text(prompt: str, config: MockConfig, rng: random.Random) -> str:
+    """Deterministic-length filler; a fenced JSON object when the prompt asks for JSON"""
+    words = ["campaign", "audience", "brand", "launch", "engagement", "content", "growth", "story"]
+    filler = ""
+    while len(filler) < config.content_chars:
+        filler += rng.choice(words) + " "
+    filler = filler[:config.content_chars].strip()
+    if "JSON" in prompt:
+        items = filler.split()[:10]
+        document = {
+            "summary": filler,
+            "items": items,
+            "keywords": list(dict.fromkeys(items[:4])),
+            "hashtags": [f"#{word}" for word in dict.fromkeys(items[4:])],
+        }
+        return "```json\n" + json.dumps(document, indent=2) + "\n```"
+    return filler
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Build the mock app; state lives on app.state.mock"""
+    app = FastAPI(title="Mock OpenRouter")
+    app.state.mock = MockState(config or MockConfig())
+
+    @app.post(CHAT_COMPLETIONS_PATH)
+    async def chat_completions(request: Request):
+        state: MockState = app.state.mock
+        config = state.config
+        body = await request.json()
+        model = body.get("model", "")
+        key = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+
+        state.request_count += 1
+        sequence = state.request_count
+
+        await asyncio.sleep(sample_latency(config.model_latency.get(model, config.latency), state.rng))
+
+        if not key:
+            state.record(key, model, 401)
+            return _error(401, "No auth credentials found", {})
+
+        # Per-key daily quota, reported the way OpenRouter does
+        reset_ms = str(int(_next_utc_midnight().timestamp() * 1000))
+        used = state.key_usage.get(key, 0)
+        exhausted = key in config.exhausted_keys or (config.key_daily_limit and used >= config.key_daily_limit)
+        limit = config.key_daily_limit or 1000
+        remaining = 0 if exhausted else max(0, limit - used - 1)
+        rate_headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": reset_ms,
+        }
+        if exhausted:
+            state.record(key, model, 429)
+            return _error(429, FREE_MODELS_PER_DAY_MESSAGE, rate_headers, headers=rate_headers)
+        state.key_usage[key] = used + 1
+
+        if model in config.down_models:
+            status = config.down_models[model]
+            state.record(key, model, status)
+            if status == 429:
+                return _error(
+                    429, "Provider returned error", rate_headers,
+                    raw=f"{model} is temporarily rate-limited upstream. Please retry shortly.",
+                    provider_name="Mock",
+                )
+            return _error(status, f"{model} is currently unavailable", rate_headers)
+
+        in_burst = config.burst_every and (sequence - 1) % config.burst_every < config.burst_length
+        if in_burst or (config.error_rate and state.rng.random() < config.error_rate):
+            state.record(key, model, config.error_status)
+            return _error(config.error_status, "Upstream provider error", rate_headers)
+
+        state.record(key, model, 200)
+        text = _completion_text(_prompt_text(body.get("messages")), config, state.rng)
+        images = []
+        if config.image_mode != "none":
+            data_url = make_png_data_url(config.image_bytes)
+            if config.image_mode == "inline":
+                text += "".join(f"\n![image]({data_url})" for _ in range(config.image_count))
+            else:
+                images = [{"type": "image_url", "image_url": {"url": data_url}} for _ in range(config.image_count)]
+
+        completion_id = f"gen-mock-{uuid.uuid4().hex[:16]}"
+        usage = {
+            "prompt_tokens": len(_prompt_text(body.get("messages"))) // 4,
+            "completion_tokens": len(text) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(completion_id, model, text, images, usage, config),
+                media_type="text/event-stream",
+                headers=rate_headers,
+            )
+
+        message: Dict[str, Any] = {"role": "assistant", "content": text}
+        if images:
+            message["images"] = images
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "provider": "Mock",
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": usage,
+        }, headers=rate_headers)
+
+    @app.get("/_mock/config")
+    async def get_config():
+        return asdict(app.state.mock.config)
+
+    @app.put("/_mock/config")
+    async def put_config(request: Request):
+        data = await request.json()
+        try:
+            if "scenario" in data:
+                scenario = data.pop("scenario")
+                config = load_config(scenario, **data)
+            else:
+                config = MockConfig.from_dict(data)
+        except (TypeError, ValueError) as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+        app.state.mock.configure(config)
+        return asdict(config)
+
+    @app.get("/_mock/stats")
+    async def get_stats():
+        return app.state.mock.stats()
+
+    @app.post("/_mock/reset")
+    async def reset():
+        app.state.mock.reset()
+        return {"reset": True}
+
+    return app
+
+
+async def _stream(completion_id: str, model: str, text: str, images: List[Dict], usage: Dict, config: MockConfig):
+    """OpenAI-style SSE chunks followed by [DONE]"""
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    size = max(1, config.stream_chunk_chars)
+    for start in range(0, len(text), size):
+        await asyncio.sleep(config.stream_chunk_delay_ms / 1000)
+        yield chunk({"content": text[start:start + size]})
+    if images:
+        yield chunk({"images": images})
+    yield chunk({}, "stop", usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenRouter stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--scenario", default="healthy", help=f"One of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--config", help="JSON file with MockConfig fields (applied over the scenario)")
+    parser.add_argument("--seed", type=int, help="Seed for latency and error sampling")
+    args = parser.parse_args()
+
+    overrides = {"seed": args.seed} if args.seed is not None else {}
+    app = create_app(load_config(args.scenario, args.config, **overrides))
+    print(f"Mock OpenRouter ({args.scenario}): OPENROUTER_BASE_URL=http://{args.host}:{args.port}{CHAT_COMPLETIONS_PATH}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Serialization CPU time and bytes on the wire for a generations page
+
+Builds a page of ContentGenerationResponse items like GET
+/content/generations returns (marketing plans, content plans, SEO copy and
+image generations, with metadata). It then measures:
+
+* serialization: the validated page rendered by JSONResponse (json.dumps),
+  by FastAPI's response-model fast path (pydantic dump_json) and by
+  ORJSONResponse. The JSON documents must be equal, and the page must
+  validate back into the response models.
+* wire: the page served by a small app with the API's default response
+  class behind CompressionMiddleware, requested with identity, gzip and br.
+  Reports body bytes, compression ratio and request latency.
+
+Usage:
+    python -m benchmarks.response_encoding --items 50 --output results/response_encoding.json
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from .common import latency_summary, write_results
+from .text_compression import PRODUCTS, content_plan, marketing_plan, seo_content
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def generation_page(rng: random.Random, items: int) -> List[Dict[str, Any]]:
+    """Generation rows shaped like the API returns them, newest first"""
+    builders = [
+        ("marketing_plan", marketing_plan), ("content_plan", content_plan), ("seo_caption", seo_content),
+        ("text_to_image", None), ("product_render", None),
+    ]
+    created = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    page = []
+    for index in range(items):
+        content_type, build = rng.choice(builders)
+        product, audience = rng.choice(PRODUCTS)
+        metadata: Dict[str, Any] = {
+            'prompt': f"Create {content_type.replace('_', ' ')} for a {product} aimed at {audience}",
+            'parameters': {'platform': rng.choice(["instagram", "linkedin", "general"]), 'timeframe': "monthly"},
+            'usage': {'prompt_tokens': rng.randint(80, 400), 'completion_tokens': rng.randint(200, 3000)},
+        }
+        if build is None:
+            content = f"Generated image of a {product} for {audience}"
+            image_path = f"/uploads/generated/{uuid.UUID(int=rng.getrandbits(128)).hex}.png"
+            metadata['parameters'].update({'style': "Realistic", 'aspect_ratio': "Square (1:1)"})
+        else:
+            content, image_path = build(rng), None
+        page.append({
+            'id': items - index,
+            'content_type': content_type,
+            'status': "completed",
+            'generated_content': content,
+            'generated_image_path': image_path,
+            'generation_metadata': metadata,
+            'model_used': "google/gemini-2.5-flash-image-preview:free",
+            'processing_time': rng.randint(1500, 20000),
+            'total_tokens': sum(metadata['usage'].values()),
+            'created_at': created - timedelta(minutes=7 * index),
+        })
+    return page
+
+
+def _cpu_per_call(fn: Callable[[], bytes], repeat: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization CPU and compressed size")
+    parser.add_argument("--items", type=int, default=50, help="Generations per page")
+    parser.add_argument("--repeat", type=int, default=500, help="Serializations per variant")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per encoding")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    from fastapi import APIRouter, FastAPI
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+    from pydantic import TypeAdapter
+
+    from app.api.v1.content import ContentGenerationResponse
+    from app.core.responses import CompressionMiddleware, ORJSONResponse
+    from app.core.tuning import tuning
+
+    rng = random.Random(args.seed)
+    rows = generation_page(rng, args.items)
+    adapter = TypeAdapter(List[ContentGenerationResponse])
+    page = adapter.validate_python(rows)
+
+    # Serialization only, the way FastAPI renders a response_model route per response class
+    variants = {
+        'json_response': lambda: JSONResponse(adapter.dump_python(page, mode="json")).body,
+        'pydantic_dump_json': lambda: adapter.dump_json(page),
+        'orjson_response': lambda: ORJSONResponse(adapter.dump_python(page, mode="json")).body,
+    }
+    reference = json.loads(variants['json_response']())
+    serialization: Dict[str, Any] = {}
+    for name, render in variants.items():
+        body = render()
+        assert json.loads(body) == reference, f"{name} renders a different document"
+        assert adapter.validate_json(body) == page, f"{name} does not round-trip through the response model"
+        serialization[name] = {
+            'bytes': len(body),
+            'cpu_us': round(_cpu_per_call(render, args.repeat) * 1e6, 1),
+        }
+    baseline = serialization['json_response']['cpu_us']
+    for name in variants:
+        serialization[name]['speedup'] = round(baseline / serialization[name]['cpu_us'], 2)
+
+    # Bytes on the wire through the API's response class and compression middleware
+    router = APIRouter(default_response_class=ORJSONResponse)
+
+    @router.get("/generations", response_model=List[ContentGenerationResponse])
+    def generations():
+        return rows
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(CompressionMiddleware)
+    wire: Dict[str, Any] = {}
+    with TestClient(app) as client:
+        for encoding in ENCODINGS:
+            headers = {'Accept-Encoding': encoding}
+            latencies = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = client.get("/generations", headers=headers)
+                latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+            assert response.headers.get('content-encoding', "identity") == encoding
+            assert response.json() == reference
+            wire[encoding] = {
+                'bytes': int(response.headers['content-length']),
+                'request': latency_summary(latencies),
+            }
+    for encoding in ENCODINGS:
+        wire[encoding]['ratio'] = round(wire['identity']['bytes'] / wire[encoding]['bytes'], 2)
+
+    results = {
+        'items': args.items,
+        'gzip_level': tuning.RESPONSE_GZIP_LEVEL,
+        'brotli_quality': tuning.RESPONSE_BROTLI_QUALITY,
+        'serialization': serialization,
+        'wire': wire,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
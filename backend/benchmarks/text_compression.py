@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Storage size and read latency of compressed generated content
+
+Builds a corpus of marketing plans, content plans and SEO documents shaped
+like real model output: fenced, indented JSON with recurring section keys,
+boilerplate phrasing and per-product details. A dictionary is trained per
+content type on one part of the corpus through the app's own training code.
+The benchmark then compares, on the held-out part:
+
+* bytes per document: plain, zstd without a dictionary, zstd with the
+  trained dictionary (as stored, i.e. base64 envelope included)
+* table size with plain vs CompressedText columns
+* point-read and full-scan latency through SQLAlchemy, decoding included
+* encode time per document (paid once per generation write)
+
+Usage:
+    python -m benchmarks.text_compression --documents 1500 --output results/compression.json
+
+--database-url must point at a scratch database: the app's tables are
+created there and filled with the corpus. Defaults to a temporary SQLite file.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from .common import latency_summary, write_results
+
+PRODUCTS = [
+    ("bamboo toothbrush", "eco-conscious millennials"), ("standing desk", "remote software engineers"),
+    ("cold brew coffee kit", "busy urban professionals"), ("trail running shoes", "weekend adventurers"),
+    ("organic baby food", "first-time parents"), ("noise-cancelling earbuds", "frequent travelers"),
+    ("vegan protein powder", "fitness enthusiasts"), ("smart plant pot", "apartment gardeners"),
+    ("leather notebook", "creative professionals"), ("yoga mat", "home workout beginners"),
+]
+CHANNELS = ["Instagram", "TikTok", "Facebook", "LinkedIn", "Pinterest", "YouTube", "Email", "Google Ads"]
+FORMATS = ["carousel", "reel", "story", "short video", "blog post", "newsletter", "live stream", "infographic"]
+THEMES = ["sustainability", "behind the scenes", "customer stories", "how-to tips", "seasonal offers",
+          "product education", "community highlights", "founder story"]
+VERBS = ["Increase", "Grow", "Improve", "Build", "Drive", "Boost", "Strengthen", "Expand"]
+METRICS = ["engagement rate", "click-through rate", "conversion rate", "follower growth", "email sign-ups",
+           "return on ad spend", "average order value", "brand awareness"]
+SENTENCES = [
+    "Position the {product} as the go-to choice for {audience} who value quality and convenience.",
+    "Highlight how the {product} solves everyday pain points for {audience}.",
+    "Use authentic user-generated content to build trust with {audience}.",
+    "Partner with micro-influencers whose followers overlap with {audience}.",
+    "Run A/B tests on creative and copy to find the messaging that resonates most.",
+    "Allocate {share}% of the budget to {channel} where {audience} are most active.",
+    "Publish {count} {fmt} posts per week focused on {theme}.",
+    "Track {metric} weekly and adjust spend based on performance.",
+    "Retarget website visitors with dynamic ads featuring the {product}.",
+    "Offer a limited-time {share}% discount to drive first purchases.",
+]
+
+
+def _sentence(rng: random.Random, product: str, audience: str) -> str:
+    return rng.choice(SENTENCES).format(
+        product=product, audience=audience, share=rng.choice([10, 15, 20, 25, 30, 40]),
+        channel=rng.choice(CHANNELS), count=rng.randint(2, 7), fmt=rng.choice(FORMATS),
+        theme=rng.choice(THEMES), metric=rng.choice(METRICS),
+    )
+
+
+def _paragraph(rng: random.Random, product: str, audience: str, sentences: int) -> str:
+    return " ".join(_sentence(rng, product, audience) for _ in range(sentences))
+
+
+def _hashtags(rng: random.Random, product: str) -> List[str]:
+    words = product.split() + rng.sample(THEMES, 2)
+    return [f"#{word.replace(' ', '').replace('-', '')}" for word in words] + [f"#{rng.choice(CHANNELS).lower()}"]
+
+
+def marketing_plan(rng: random.Random) -> str:
+    product, audience = rng.choice(PRODUCTS)
+    document = {
+        "situation_analysis": {
+            "market_overview": _paragraph(rng, product, audience, 3),
+            "competitor_analysis": [_paragraph(rng, product, audience, 1) for _ in range(3)],
+            "swot": {key: [_sentence(rng, product, audience) for _ in range(2)]
+                     for key in ("strengths", "weaknesses", "opportunities", "threats")},
+        },
+        "marketing_objectives": [
+            {"goal": f"{rng.choice(VERBS)} {rng.choice(METRICS)} by {rng.randint(10, 60)}%",
+             "kpi": rng.choice(METRICS), "timeline": f"{rng.randint(1, 12)} months"}
+            for _ in range(4)
+        ],
+        "target_audience": {"primary": audience, "personas": [_paragraph(rng, product, audience, 2) for _ in range(2)]},
+        "strategy": _paragraph(rng, product, audience, 4),
+        "tactics": [{"channel": rng.choice(CHANNELS), "tactic": _sentence(rng, product, audience),
+                     "budget_share": f"{rng.randint(5, 40)}%"} for _ in range(6)],
+        "timeline": {f"month_{month}": _sentence(rng, product, audience) for month in range(1, 7)},
+        "keywords": [product] + rng.sample(THEMES, 3),
+        "hashtags": _hashtags(rng, product),
+    }
+    return "```json\n" + json.dumps(document, indent=2) + "\n```"
+
+
+def content_plan(rng: random.Random) -> str:
+    product, audience = rng.choice(PRODUCTS)
+    document = {
+        "content_calendar": [
+            {"week": week, "theme": rng.choice(THEMES), "posts": [
+                {"day": rng.choice(["Monday", "Wednesday", "Friday", "Sunday"]), "channel": rng.choice(CHANNELS),
+                 "format": rng.choice(FORMATS), "idea": _sentence(rng, product, audience)}
+                for _ in range(3)
+            ]}
+            for week in range(1, 5)
+        ],
+        "posting_schedule": {channel: f"{rng.randint(1, 5)} posts per week" for channel in rng.sample(CHANNELS, 4)},
+        "engagement_strategies": [_sentence(rng, product, audience) for _ in range(4)],
+        "metrics": rng.sample(METRICS, 4),
+        "keywords": [product] + rng.sample(THEMES, 2),
+        "hashtags": _hashtags(rng, product),
+    }
+    return "```json\n" + json.dumps(document, indent=2) + "\n```"
+
+
+def seo_content(rng: random.Random) -> str:
+    product, audience = rng.choice(PRODUCTS)
+    document = {
+        "title": f"The Best {product.title()} for {audience.title()}"[:60],
+        "meta_description": _sentence(rng, product, audience)[:160],
+        "product_description": _paragraph(rng, product, audience, 5),
+        "hashtags": _hashtags(rng, product),
+        "alt_text": f"{product} photographed for {audience}",
+        "captions": {channel: _sentence(rng, product, audience) for channel in rng.sample(CHANNELS, 3)},
+        "keywords": [product] + rng.sample(THEMES, 3),
+    }
+    return "```json\n" + json.dumps(document, indent=2) + "\n```"
+
+
+GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    "marketing_plan": marketing_plan,
+    "content_plan": content_plan,
+    "seo_caption": seo_content,
+}
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _table_bytes(engine, table: str) -> int:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            return connection.execute(text("SELECT pg_total_relation_size(:table)"), {"table": table}).scalar()
+        return connection.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = :table"), {"table": table}).scalar() or 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed generated content: storage size and read latency")
+    parser.add_argument("--documents", type=int, default=1500, help="Documents per content type")
+    parser.add_argument("--train-fraction", type=float, default=0.5, help="Share of documents used for training")
+    parser.add_argument("--reads", type=int, default=2000, help="Point reads per table")
+    parser.add_argument("--database-url", help="Scratch database (default: temporary SQLite file)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="compression-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{scratch}/bench.db"
+
+    import zstandard
+    from sqlalchemy import Column, Integer, MetaData, Table, Text, insert, select
+
+    from app.core.database import Base, get_engine, open_session
+    from app.core.tuning import tuning
+    import app.models  # noqa: F401  (registers all tables)
+    from app.models.compression import CompressedText, decode_text, encode_text
+    from app.models.content import ContentGeneration, ContentType, GenerationStatus
+    from app.services.text_compression import train_dictionaries
+
+    rng = random.Random(args.seed)
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    held_out: List[Tuple[str, str]] = []
+    training_rows = []
+    split = int(args.documents * args.train_fraction)
+    for content_type, generate in GENERATORS.items():
+        documents = [generate(rng) for _ in range(args.documents)]
+        training_rows += [
+            {'content_type': ContentType(content_type), 'status': GenerationStatus.COMPLETED, 'generated_content': document}
+            for document in documents[:split]
+        ]
+        held_out += [(content_type, document) for document in documents[split:]]
+
+    tuning.TEXT_COMPRESSION_ENABLED = False
+    db = open_session()
+    db.execute(insert(ContentGeneration), training_rows)
+    db.commit()
+    training = train_dictionaries(db)
+    db.close()
+
+    # Codec only: bytes per held-out document
+    tuning.TEXT_COMPRESSION_ENABLED = True
+    plain_zstd = zstandard.ZstdCompressor(level=tuning.TEXT_COMPRESSION_LEVEL)
+    sizes: Dict[str, Dict[str, Any]] = {}
+    encode_times: List[float] = []
+    for content_type in GENERATORS:
+        documents = [document for kind, document in held_out if kind == content_type]
+        plain = sum(len(document.encode()) for document in documents)
+        without_dictionary = sum(len(plain_zstd.compress(document.encode())) for document in documents)
+        stored = 0
+        for document in documents:
+            started = time.perf_counter()
+            encoded = encode_text(document)
+            encode_times.append(time.perf_counter() - started)
+            assert decode_text(encoded) == document
+            stored += len(encoded.encode())
+        sizes[content_type] = {
+            'documents': len(documents),
+            'avg_plain_bytes': round(plain / len(documents)),
+            'ratio_zstd_no_dictionary': round(plain / without_dictionary, 2),
+            'ratio_stored_with_dictionary': round(plain / stored, 2),
+        }
+
+    # Tables: plain TEXT vs CompressedText, same rows
+    metadata = MetaData()
+    tables = {
+        'plain': Table("bench_plain_content", metadata, Column("id", Integer, primary_key=True), Column("content", Text)),
+        'compressed': Table("bench_compressed_content", metadata, Column("id", Integer, primary_key=True), Column("content", CompressedText)),
+    }
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    rows = [{'id': index + 1, 'content': document} for index, (_, document) in enumerate(held_out)]
+    read_ids = [rng.randint(1, len(rows)) for _ in range(args.reads)]
+    storage: Dict[str, Any] = {}
+    for name, table in tables.items():
+        with engine.begin() as connection:
+            connection.execute(insert(table), rows)
+        point_reads: List[float] = []
+        with engine.connect() as connection:
+            for row_id in read_ids:
+                point_reads.append(_timed(lambda: connection.execute(select(table.c.content).where(table.c.id == row_id)).scalar()))
+            scans = [_timed(lambda: connection.execute(select(table.c.content)).scalars().all()) for _ in range(3)]
+        storage[name] = {
+            'table_bytes': _table_bytes(engine, table.name),
+            'point_read': latency_summary(point_reads),
+            'full_scan_ms': round(statistics.median(scans) * 1000, 1),
+        }
+    storage['table_size_ratio'] = round(storage['plain']['table_bytes'] / max(1, storage['compressed']['table_bytes']), 2)
+    metadata.drop_all(engine)
+
+    results = {
+        'database': engine.dialect.name,
+        'level': tuning.TEXT_COMPRESSION_LEVEL,
+        'dictionary_bytes': tuning.TEXT_COMPRESSION_DICT_SIZE,
+        'training': training,
+        'documents': sizes,
+        'encode': latency_summary(encode_times),
+        'tables': storage,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
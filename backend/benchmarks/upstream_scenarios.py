@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Upstream failure scenarios
+
+Starts the mock OpenRouter in-process, points AIService at it through
+OPENROUTER_BASE_URL and drives _make_api_call through each scenario with a
+fresh key manager, reporting which models and keys answered, the errors
+returned and the upstream traffic seen by the mock. Scenarios with a known
+expected outcome (key exhaustion, model outage, ...) are checked and the
+script exits with code 1 when one does not hold.
+
+Usage:
+    python -m benchmarks.upstream_scenarios --keys 2
+    python -m benchmarks.upstream_scenarios --scenario key_exhaustion --scenario model_outage --output results/upstream.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .common import free_port, latency_summary, write_results
+from .mock_openrouter import (
+    BACKUP_MODEL, CHAT_COMPLETIONS_PATH, PRIMARY_MODEL, SCENARIOS, create_app, load_config
+)
+
+DEFAULT_SCENARIOS = [
+    "healthy", "key_exhaustion", "model_outage", "model_rate_limited", "error_bursts", "image_heavy", "streaming"
+]
+
+
+def _all_succeeded(outcome: Dict[str, Any], keys: int) -> Optional[str]:
+    if outcome['successes'] != outcome['calls']:
+        return f"expected every call to succeed, got errors {outcome['errors']}"
+    return None
+
+
+def _key_exhaustion(outcome: Dict[str, Any], keys: int) -> Optional[str]:
+    limit = SCENARIOS["key_exhaustion"]["key_daily_limit"]
+    if outcome['successes'] != keys * limit:
+        return f"expected {keys * limit} successes ({keys} keys x {limit}), got {outcome['successes']}"
+    # The call that exhausts the last key reports it; later calls find no key at all
+    if set(outcome['errors']) - {'All API keys rate limited', 'No available API keys'}:
+        return f"unexpected errors {outcome['errors']}"
+    if any(count != limit for count in outcome['keys_used'].values()):
+        return f"expected each key to serve {limit} calls, got {outcome['keys_used']}"
+    return None
+
+
+def _backup_model_answers(outcome: Dict[str, Any], keys: int) -> Optional[str]:
+    failure = _all_succeeded(outcome, keys)
+    if failure:
+        return failure
+    if set(outcome['models_used']) != {BACKUP_MODEL}:
+        return f"expected only {BACKUP_MODEL} to answer, got {outcome['models_used']}"
+    return None
+
+
+def _images_extracted(outcome: Dict[str, Any], keys: int) -> Optional[str]:
+    failure = _all_succeeded(outcome, keys)
+    if failure:
+        return failure
+    if outcome['images_extracted'] != outcome['successes']:
+        return f"expected one image per call, got {outcome['images_extracted']}"
+    return None
+
+
+# Scenario -> (default number of calls given the key count, expectation or None)
+PLANS: Dict[str, Any] = {
+    "healthy": (lambda keys: 10, _all_succeeded),
+    "slow": (lambda keys: 5, _all_succeeded),
+    "key_exhaustion": (lambda keys: keys * SCENARIOS["key_exhaustion"]["key_daily_limit"] + 2, _key_exhaustion),
+    "model_outage": (lambda keys: 3, _backup_model_answers),
+    "model_rate_limited": (lambda keys: 5, _backup_model_answers),
+    "error_bursts": (lambda keys: 10, None),
+    "flaky": (lambda keys: 20, None),
+    "image_heavy": (lambda keys: 5, _images_extracted),
+    "image_inline": (lambda keys: 5, _images_extracted),
+}
+
+
+async def _stream_check(client, base_url: str) -> Dict[str, Any]:
+    """Stream one completion straight from the mock and reassemble it"""
+    import json
+
+    started = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    content = ""
+    done = False
+    async with client.stream(
+        "POST", base_url,
+        headers={"Authorization": "Bearer mock-stream-key"},
+        json={"model": PRIMARY_MODEL, "messages": [{"role": "user", "content": "Write a tagline"}], "stream": True},
+    ) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            payload = line[len("data: "):]
+            if payload == "[DONE]":
+                done = True
+                break
+            chunks += 1
+            first_chunk = first_chunk or time.perf_counter() - started
+            delta = json.loads(payload)["choices"][0]["delta"]
+            content += delta.get("content") or ""
+    return {
+        'chunks': chunks,
+        'chars': len(content),
+        'time_to_first_chunk_ms': round((first_chunk or 0) * 1000, 2),
+        'total_ms': round((time.perf_counter() - started) * 1000, 2),
+        'done_marker': done,
+        'failure': None if done and content else "stream did not complete",
+    }
+
+
+async def run_scenario(name: str, mock_app, base_url: str, keys: List[str], calls: Optional[int]) -> Dict[str, Any]:
+    import httpx
+    from app.services import api_key_manager as key_manager_module
+    from app.services.ai_service import get_ai_service
+
+    mock_app.state.mock.configure(load_config(name, seed=1))
+    if name == "streaming":
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            outcome = await _stream_check(client, base_url)
+        return {'scenario': name, **outcome}
+
+    make_calls, expectation = PLANS.get(name, (lambda k: 5, None))
+    calls = calls or make_calls(len(keys))
+
+    # Fresh key state per scenario
+    manager = key_manager_module.APIKeyManager(keys)
+    key_manager_module._api_key_manager = manager
+    ai_service = get_ai_service()
+
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    models_used: Counter = Counter()
+    keys_used: Counter = Counter()
+    images_extracted = 0
+    messages = [{"role": "user", "content": "Write a short product tagline for a reusable water bottle"}]
+
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = await ai_service._make_api_call(messages)
+        latencies.append(time.perf_counter() - started)
+        if result.get('success'):
+            models_used[result['model_used']] += 1
+            keys_used[str(manager.get_key_index(next(k for k in keys if k.endswith(result['api_key_used']))))] += 1
+            images_extracted += len(result.get('images') or [])
+        else:
+            errors[result.get('error')] += 1
+
+    outcome = {
+        'scenario': name,
+        'calls': calls,
+        'successes': sum(models_used.values()),
+        'errors': dict(errors),
+        'models_used': dict(models_used),
+        'keys_used': dict(keys_used),
+        'images_extracted': images_extracted,
+        'latency': latency_summary(latencies),
+        'upstream': mock_app.state.mock.stats(),
+        'key_manager': manager.get_status_summary(),
+    }
+    outcome['failure'] = expectation(outcome, len(keys)) if expectation else None
+    return outcome
+
+
+async def run(args) -> Dict[str, Any]:
+    import uvicorn
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}{CHAT_COMPLETIONS_PATH}"
+    # Must be set before app.core.config is imported
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+
+    mock_app = create_app(load_config("healthy"))
+    server = uvicorn.Server(uvicorn.Config(mock_app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    keys = [f"sk-or-mock-{i:04d}-{os.urandom(4).hex()}" for i in range(1, args.keys + 1)]
+    results = []
+    try:
+        for name in args.scenario or DEFAULT_SCENARIOS:
+            started = time.perf_counter()
+            outcome = await run_scenario(name, mock_app, base_url, keys, args.calls)
+            outcome['duration_s'] = round(time.perf_counter() - started, 2)
+            results.append(outcome)
+            status = "FAIL" if outcome['failure'] else "ok"
+            print(f"[{status}] {name}: {outcome.get('successes', outcome.get('chunks'))} "
+                  f"{'successes' if 'successes' in outcome else 'chunks'} in {outcome['duration_s']}s"
+                  + (f" - {outcome['failure']}" if outcome['failure'] else ""))
+    finally:
+        server.should_exit = True
+        await server_task
+
+    return {
+        'benchmark': 'upstream_scenarios',
+        'keys': args.keys,
+        'scenarios': results,
+        'failed': [r['scenario'] for r in results if r['failure']],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive AIService through mock upstream failure scenarios")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable, default: a representative set)")
+    parser.add_argument("--keys", type=int, default=2, help="Number of fake API keys")
+    parser.add_argument("--calls", type=int, help="Calls per scenario (default depends on the scenario)")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's own logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    results = asyncio.run(run(args))
+    if args.output:
+        write_results(args.output, results)
+    if results['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Gunicorn configuration for production
+
+Runs the FastAPI app on uvicorn workers sized from the CPU count. Migrations
+run once in the master before workers are forked, so workers boot with
+RUN_MIGRATIONS disabled. Tuning comes from app/core/tuning.py (env / .env).
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+# Workers share metric files so /metrics aggregates across processes; this
+# must be set before any worker imports prometheus_client
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "ai-marketing-metrics")
+)
+
+from app.core.tuning import tuning
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def _worker_count() -> int:
+    if tuning.WEB_CONCURRENCY > 0:
+        return tuning.WEB_CONCURRENCY
+    return max(1, min(multiprocessing.cpu_count() * 2 + 1, tuning.MAX_WORKERS))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "app.core.workers.TunedUvicornWorker"
+workers = _worker_count()
+
+backlog = tuning.BACKLOG
+keepalive = tuning.KEEPALIVE_SECONDS
+
+# In-flight generations may wait on the upstream AI call, so give them that
+# long to finish when a worker is recycled or the server is stopped
+graceful_timeout = int(tuning.UPSTREAM_TIMEOUT_SECONDS) + 10
+timeout = graceful_timeout + 30
+
+max_requests = tuning.MAX_REQUESTS
+max_requests_jitter = tuning.MAX_REQUESTS_JITTER if tuning.MAX_REQUESTS else 0
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+
+
+def on_starting(server):
+    """Run migrations and job recovery once in the master, then disable them for the workers"""
+    # Start each server with fresh metric files
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    if tuning.RUN_MIGRATIONS:
+        from app.core.database import dispose_engines
+        from app.core.migrations import run_migrations
+
+        started = time.perf_counter()
+        run_migrations()
+        dispose_engines()
+        logger.info(f"Master migrations took {(time.perf_counter() - started) * 1000:.0f} ms")
+    if tuning.RECOVER_INTERRUPTED_JOBS:
+        from app.core.database import dispose_engines
+        from app.services.job_service import recover_interrupted_jobs
+
+        started = time.perf_counter()
+        recover_interrupted_jobs()
+        dispose_engines()
+        logger.info(f"Master job recovery took {(time.perf_counter() - started) * 1000:.0f} ms")
+    # Workers inherit both the environment and the already-imported settings
+    os.environ["RUN_MIGRATIONS"] = "false"
+    tuning.RUN_MIGRATIONS = False
+    os.environ["RECOVER_INTERRUPTED_JOBS"] = "false"
+    tuning.RECOVER_INTERRUPTED_JOBS = False
+    logger.info(
+        f"Starting {workers} x {worker_class} "
+        f"(graceful_timeout={graceful_timeout}s, max_requests={max_requests})"
+    )
+
+
+def post_fork(server, worker):
+    from app.core.workers import init_worker_after_fork
+
+    init_worker_after_fork()
+
+
+def post_worker_init(worker):
+    from app.core.workers import warm_worker_pools
+
+    warm_worker_pools()
+
+
+def child_exit(server, worker):
+    from app.core.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)
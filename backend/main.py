@@ -13,6 +13,11 @@ logger = logging.getLogger(__name__)
 
 def main():
     """Main entry point for the application"""
+    # Rolling restarts: skip the migration check, the schema is already current
+    if "--no-migrate" in sys.argv:
+        os.environ["RUN_MIGRATIONS"] = "false"
+        logger.info("Database migrations disabled (--no-migrate)")
+    
     # Get the directory where this script is located
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """
 Render deployment startup script
-Handles Python path and module imports correctly for Render's environment
+Handles Python path and module imports correctly for Render's environment,
+then hands over to gunicorn with uvicorn workers (see gunicorn.conf.py)
 """
 import os
 import sys
-import uvicorn
 
 def setup_python_path():
     """Setup Python path for Render deployment"""
@@ -30,18 +30,22 @@ def main():
     # Setup paths
     setup_python_path()
     
-    # Get port from environment (Render sets this)
+    # Rolling restarts: skip the migration check, the schema is already current
+    if "--no-migrate" in sys.argv:
+        os.environ["RUN_MIGRATIONS"] = "false"
+        print("⏭️  Database migrations disabled (--no-migrate)")
+    
+    # Get port from environment (Render sets this, gunicorn.conf.py binds to it)
     port = int(os.environ.get("PORT", 8000))
     
     print(f"🚀 Starting AI Marketing Platform on port {port}")
     
-    # Start uvicorn with the correct module path
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=port,
-        log_level="info"
-    )
+    # Replace this process with the gunicorn master
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn",
+        "--config", "gunicorn.conf.py",
+        "app.main:app"
+    ])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file